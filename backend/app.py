@@ -1,6 +1,6 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import requests
+import json
 import os
 import time
 
@@ -9,8 +9,17 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 
 # Register eval blueprint
 from eval_routes import eval_bp
+from eval.llm_client import (chat_completion, chat_completion_stream, chunk_content, completion_from_chunks,
+                             usage_from_response)
+from eval.workflow_parser import PartialWorkflowParser
 app.register_blueprint(eval_bp)
 
+# Pick up background eval runs interrupted by a previous worker
+from eval import jobs, retention
+jobs.resume_abandoned()
+# Archive traces past the retention budgets (TRACE_RETENTION_*) in the background
+retention.start()
+
 # System prompt constant (shared with eval pipeline)
 SYSTEM_PROMPT = '''You MUST respond with ONLY valid JSON. No markdown, no code blocks, no explanations.
 
@@ -44,25 +53,16 @@ def generate_workflow():
         if not api_key:
             return jsonify({'error': 'No API key available. Please provide your own Groq API key.'}), 400
 
+        messages = [
+            {'role': 'system', 'content': SYSTEM_PROMPT},
+            {'role': 'user', 'content': user_message}
+        ]
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            return _generate_stream(api_key, user_message, messages)
+
         start = time.time()
 
-        response = requests.post(
-            'https://api.groq.com/openai/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama-3.3-70b-versatile',
-                'response_format': {'type': 'json_object'},
-                'messages': [
-                    {'role': 'system', 'content': SYSTEM_PROMPT},
-                    {'role': 'user', 'content': user_message}
-                ],
-                'temperature': 0.5,
-                'max_tokens': 2000
-            }
-        )
+        response = chat_completion(api_key, messages=messages, temperature=0.5, max_tokens=2000)
 
         latency_ms = int((time.time() - start) * 1000)
 
@@ -70,34 +70,89 @@ def generate_workflow():
             return jsonify({'error': f'Groq API error: {response.text}'}), response.status_code
 
         response_data = response.json()
-
-        # Capture trace for eval pipeline
-        try:
-            from eval.traces import save_trace, parse_workflow_from_response
-            from eval.models import Trace
-
-            parsed_workflow, parse_success = parse_workflow_from_response(response_data)
-
-            trace = Trace(
-                user_message=user_message,
-                system_prompt=SYSTEM_PROMPT,
-                model='llama-3.3-70b-versatile',
-                temperature=0.5,
-                raw_response=response_data,
-                parsed_workflow=parsed_workflow,
-                parse_success=parse_success,
-                latency_ms=latency_ms
-            )
-            save_trace(trace)
-        except Exception:
-            pass  # Don't let trace capture break the main endpoint
-
+        _capture_trace(user_message, response_data, latency_ms)
         return jsonify(response_data)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _sse(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _generate_stream(api_key, user_message, messages):
+    """Proxy Groq's token stream as server-sent events.
+
+    Emits name, trigger and step events as each part of the workflow is
+    complete, then a done event with the parsed workflow and the full
+    response (the same body the non-streamed endpoint returns).
+    """
+    start = time.time()
+    response, chunks = chat_completion_stream(api_key, messages=messages, temperature=0.5, max_tokens=2000)
+    if response.status_code != 200:
+        return jsonify({'error': f'Groq API error: {response.text}'}), response.status_code
+
+    def generate():
+        parser = PartialWorkflowParser()
+        received = []
+        # Stays set if the client goes away (GeneratorExit) before the stream ends
+        error = 'Client disconnected before the response finished'
+        try:
+            for chunk in chunks:
+                received.append(chunk)
+                for event in parser.feed(chunk_content(chunk)):
+                    yield _sse(event)
+            error = None
+        except Exception as e:
+            error = str(e)
+            yield _sse({'event': 'error', 'error': error})
+        finally:
+            chunks.close()
+            # Cut-short generations are traced too, with what arrived and why it stopped
+            response_data = completion_from_chunks(received)
+            workflow = _capture_trace(user_message, response_data, int((time.time() - start) * 1000), error)
+        if error is None:
+            yield _sse({'event': 'done', 'workflow': workflow, 'response': response_data})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _capture_trace(user_message, response_data, latency_ms, error=None):
+    """Queue a trace for the eval pipeline (written in the background); returns the parsed workflow.
+
+    error records why a streamed generation stopped early.
+    """
+    parsed_workflow = None
+    try:
+        from eval.traces import parse_workflow_from_response
+        from eval.trace_writer import get_writer
+        from eval.models import Trace
+
+        parsed_workflow, parse_success = parse_workflow_from_response(response_data)
+
+        trace = Trace(
+            user_message=user_message,
+            system_prompt=SYSTEM_PROMPT,
+            model='llama-3.3-70b-versatile',
+            temperature=0.5,
+            raw_response=response_data,
+            parsed_workflow=parsed_workflow,
+            parse_success=parse_success,
+            latency_ms=latency_ms,
+            error=error,
+            usage=usage_from_response(response_data)
+        )
+        get_writer().submit(trace)
+    except Exception:
+        pass  # Don't let trace capture break the main endpoint
+    return parsed_workflow
+
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'})
@@ -0,0 +1,286 @@
+"""Latency, parse and grader analytics over NumPy columns.
+
+Traces and eval results are loaded once into parallel arrays and kept up
+to date from the stores' change feeds, so each query only has to pull in
+records written since the last one. Aggregation is vectorized: records are
+grouped by (time bucket, model) with np.unique and reduced with bincount /
+sorted indexing instead of per-record Python loops.
+"""
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .graders.schema_grader import CHECKS
+from .graders.intent_grader import SCORE_KEYS
+from .results import get_result_changes
+from .traces import epoch_seconds, get_trace_changes
+
+WINDOWS = {'minute': 60, 'hour': 3600, 'day': 86400}
+PERCENTILES = (50, 90, 99)
+UNKNOWN_MODEL = 'unknown'
+
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class _Table:
+    """Parallel NumPy columns grown in batches; rows are addressed by record id."""
+
+    def __init__(self, columns):
+        self.columns = columns  # name -> (dtype, trailing shape)
+        self.reset()
+
+    def reset(self):
+        self.data = {name: np.empty((0, *shape), dtype=dtype) for name, (dtype, shape) in self.columns.items()}
+        self.alive = np.empty(0, dtype=bool)
+        self.rows = {}
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.alive)
+
+    def upsert(self, ids, values):
+        """Append new ids and overwrite rows of ids already present."""
+        values = {name: np.asarray(values[name], dtype=dtype).reshape(-1, *shape)
+                  for name, (dtype, shape) in self.columns.items()}
+        existing = [(i, self.rows[record_id]) for i, record_id in enumerate(ids) if record_id in self.rows]
+        if existing:
+            positions, rows = map(list, zip(*existing))
+            for name in self.columns:
+                self.data[name][rows] = values[name][positions]
+            self.alive[rows] = True
+        fresh = [i for i, record_id in enumerate(ids) if record_id not in self.rows]
+        if fresh:
+            start = len(self.alive)
+            for offset, i in enumerate(fresh):
+                self.rows[ids[i]] = start + offset
+            for name in self.columns:
+                self.data[name] = np.concatenate([self.data[name], values[name][fresh]])
+            self.alive = np.concatenate([self.alive, np.ones(len(fresh), dtype=bool)])
+
+    def delete(self, ids):
+        rows = [self.rows[record_id] for record_id in ids if record_id in self.rows]
+        self.alive[rows] = False
+
+
+class _Analytics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.models = [UNKNOWN_MODEL]
+        self._model_codes = {UNKNOWN_MODEL: 0}
+        self.traces = _Table({
+            'ts': (np.float64, ()),
+            'model': (np.int32, ()),
+            'latency_ms': (np.float64, ()),
+            'parse_success': (np.bool_, ()),
+            'error': (np.bool_, ()),
+        })
+        self.schema = _Table({
+            'ts': (np.float64, ()),
+            'model': (np.int32, ()),
+            'passed': (np.bool_, ()),
+            'checks': (np.bool_, (len(CHECKS),)),
+        })
+        self.intent = _Table({
+            'ts': (np.float64, ()),
+            'model': (np.int32, ()),
+            'passed': (np.bool_, ()),
+            'scores': (np.float64, (len(SCORE_KEYS),)),
+        })
+        self._result_seq = 0
+
+    def _model_code(self, model):
+        model = model or UNKNOWN_MODEL
+        if model not in self._model_codes:
+            self._model_codes[model] = len(self.models)
+            self.models.append(model)
+        return self._model_codes[model]
+
+    def _trace_model(self, trace_id):
+        row = self.traces.rows.get(trace_id)
+        return int(self.traces.data['model'][row]) if row is not None else 0
+
+    def refresh(self):
+        with self._lock:
+            self._refresh_traces()
+            self._refresh_results()
+
+    def _refresh_traces(self, verify=True):
+        cursor, records, deleted, total = get_trace_changes(self.traces.cursor)
+        if records:
+            self.traces.upsert([r['id'] for r in records], {
+                'ts': [_epoch(r.get('timestamp')) for r in records],
+                'model': [self._model_code(r.get('model')) for r in records],
+                'latency_ms': [r.get('latency_ms') or 0 for r in records],
+                'parse_success': [bool(r.get('parse_success')) for r in records],
+                'error': [bool(r.get('error')) for r in records],
+            })
+        self.traces.delete(deleted)
+        self.traces.cursor = cursor
+        if verify and int(self.traces.alive.sum()) != total:
+            # Deletes the store could not report (sqlite backend): start over
+            self.traces.reset()
+            self._refresh_traces(verify=False)
+
+    def _refresh_results(self):
+        cursor, results = get_result_changes(self._result_seq)
+        schema = [r for r in results if r.get('grader_name') == 'schema']
+        intent = [r for r in results if r.get('grader_name') == 'intent']
+        if schema:
+            self.schema.upsert(_row_ids(self.schema, len(schema)), {
+                'ts': [_epoch(r.get('timestamp')) for r in schema],
+                'model': [self._trace_model(r.get('trace_id')) for r in schema],
+                'passed': [bool(r.get('passed')) for r in schema],
+                'checks': [[bool(r.get('details', {}).get('checks', {}).get(c)) for c in CHECKS] for r in schema],
+            })
+        if intent:
+            self.intent.upsert(_row_ids(self.intent, len(intent)), {
+                'ts': [_epoch(r.get('timestamp')) for r in intent],
+                'model': [self._trace_model(r.get('trace_id')) for r in intent],
+                'passed': [bool(r.get('passed')) for r in intent],
+                'scores': [[(r.get('details', {}).get('scores') or {}).get(k, np.nan) for k in SCORE_KEYS]
+                           for r in intent],
+            })
+        self._result_seq = cursor
+
+
+def _row_ids(table, count):
+    # Results are append-only and have no id of their own
+    return list(range(len(table), len(table) + count))
+
+
+def _group_keys(table, window, since, until, model_code, by_model, n_models):
+    """Row mask plus (bucket, model) group keys for the selected rows."""
+    ts = table.data['ts']
+    mask = table.alive & ~np.isnan(ts)
+    if since is not None:
+        mask &= ts >= since
+    if until is not None:
+        mask &= ts < until
+    if model_code is not None:
+        mask &= table.data['model'] == model_code
+    buckets = np.floor(ts[mask] / window).astype(np.int64)
+    models = table.data['model'][mask].astype(np.int64) if by_model else np.zeros(int(mask.sum()), dtype=np.int64)
+    return mask, buckets * n_models + models
+
+
+def _percentiles(values, inverse, counts):
+    """Nearest-rank percentiles of values within each group (inverse: group index per value)."""
+    # Sort by value, then stably by group: faster than np.lexsort on large float columns
+    by_value = np.argsort(values)
+    ranked = values[by_value[np.argsort(inverse[by_value], kind='stable')]]
+    starts = np.cumsum(counts) - counts
+    return {
+        f'p{p}': ranked[starts + np.round(p / 100 * (counts - 1)).astype(np.int64)]
+        for p in PERCENTILES
+    }
+
+
+def _mean(inverse, values, counts):
+    return np.bincount(inverse, weights=values, minlength=len(counts)) / counts
+
+
+def _nanmean(inverse, values, counts):
+    present = ~np.isnan(values)
+    sums = np.bincount(inverse, weights=np.where(present, values, 0.0), minlength=len(counts))
+    seen = np.bincount(inverse, weights=present, minlength=len(counts))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / seen
+
+
+def _round(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+def _trace_stats(columns, inverse, counts):
+    latency = columns['latency_ms']
+    pct = _percentiles(latency, inverse, counts)
+    mean = _mean(inverse, latency, counts)
+    parse_rate = _mean(inverse, columns['parse_success'], counts)
+    error_rate = _mean(inverse, columns['error'], counts)
+    return [{
+        'count': int(counts[g]),
+        'latency_ms': {**{name: _round(values[g]) for name, values in pct.items()}, 'mean': _round(mean[g])},
+        'parse_success_rate': _round(parse_rate[g]),
+        'error_rate': _round(error_rate[g]),
+    } for g in range(len(counts))]
+
+
+def _schema_stats(columns, inverse, counts):
+    pass_rate = _mean(inverse, columns['passed'], counts)
+    failed = ~columns['checks']
+    failure_rates = [_mean(inverse, failed[:, j], counts) for j in range(len(CHECKS))]
+    return [{
+        'count': int(counts[g]),
+        'pass_rate': _round(pass_rate[g]),
+        'check_failure_rates': {check: _round(failure_rates[j][g]) for j, check in enumerate(CHECKS)},
+    } for g in range(len(counts))]
+
+
+def _intent_stats(columns, inverse, counts):
+    pass_rate = _mean(inverse, columns['passed'], counts)
+    scores = columns['scores']
+    dimensions = [_nanmean(inverse, scores[:, j], counts) for j in range(len(SCORE_KEYS))]
+    return [{
+        'count': int(counts[g]),
+        'pass_rate': _round(pass_rate[g]),
+        'dimension_scores': {key: _round(dimensions[j][g]) for j, key in enumerate(SCORE_KEYS)},
+    } for g in range(len(counts))]
+
+
+def _section(table, stats_fn, window, since, until, model_code, by_model, models):
+    n_models = len(models)
+    mask, keys = _group_keys(table, window, since, until, model_code, by_model, n_models)
+    if not mask.any():
+        return {'overall': {'count': 0}, 'buckets': []}
+    columns = {name: values[mask] for name, values in table.data.items()}
+    overall = stats_fn(columns, np.zeros(len(keys), dtype=np.int64), np.array([len(keys)]))[0]
+    groups, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    buckets = []
+    for group, group_stats in zip(groups, stats_fn(columns, inverse.reshape(-1), counts)):
+        bucket, model = divmod(int(group), n_models)
+        entry = {'start': datetime.fromtimestamp(bucket * window, timezone.utc).isoformat()}
+        if by_model:
+            entry['model'] = models[model]
+        buckets.append({**entry, **group_stats})
+    return {'overall': overall, 'buckets': buckets}
+
+
+_analytics = _Analytics()
+
+
+def window_seconds(window):
+    """Seconds in a named ('minute', 'hour', 'day') or numeric window. Raises ValueError."""
+    seconds = WINDOWS[window] if window in WINDOWS else int(window)
+    if seconds <= 0:
+        raise ValueError('window must be positive')
+    return seconds
+
+
+def get_analytics(window='day', since=None, until=None, model=None, by_model=True):
+    """Trace latency/parse stats and schema/intent grader stats per time bucket (and model).
+
+    since/until are ISO timestamps (naive ones are UTC); model restricts to
+    one model. Raises ValueError for an invalid window or timestamp.
+    """
+    seconds = window_seconds(window)
+    since_ts = epoch_seconds('since', since) if since else None
+    until_ts = epoch_seconds('until', until) if until else None
+    _analytics.refresh()
+    with _analytics._lock:
+        models = list(_analytics.models)
+        model_code = _analytics._model_codes.get(model, -1) if model else None
+        args = (seconds, since_ts, until_ts, model_code, by_model, models)
+        return {
+            'window': window,
+            'window_seconds': seconds,
+            'traces': _section(_analytics.traces, _trace_stats, *args),
+            'schema': _section(_analytics.schema, _schema_stats, *args),
+            'intent': _section(_analytics.intent, _intent_stats, *args),
+        }
@@ -0,0 +1,137 @@
+"""Grader cascade: cheap deterministic checks decide whether the LLM judge has to run.
+
+A cascade is an ordered list of 'condition:action' rules, e.g.
+'schema_failed:fail'. For each trace the first rule whose condition holds
+decides the intent verdict without a judge call (action pass or fail), or
+sends it to the judge anyway (action judge); when no rule matches the
+judge runs as usual.
+
+Conditions:
+  no_workflow             the response didn't parse into a workflow
+  schema_failed           any schema check failed
+  exact_match             the workflow equals the golden's, ignoring step ids and key order
+  structure_below=S       structure score against the golden is below S
+  structure_at_least=S    structure score against the golden is at least S
+
+Golden conditions never match when there is no golden.
+"""
+import json
+import os
+
+from .graders import schema_grader, structure_grader
+from .models import EvalResult
+
+DEFAULT_RULES = 'no_workflow:fail,schema_failed:fail,exact_match:pass'
+# Comma-separated rules applied when a run doesn't pass its own; 'off' disables the cascade
+RULES = os.environ.get('GRADER_CASCADE', DEFAULT_RULES)
+
+CONDITIONS = ('no_workflow', 'schema_failed', 'exact_match', 'structure_below', 'structure_at_least')
+ACTIONS = ('pass', 'fail', 'judge')
+_SCORE_CONDITIONS = ('structure_below', 'structure_at_least')
+
+_REASONS = {
+    'no_workflow': 'no workflow was parsed from the response',
+    'schema_failed': 'the workflow failed the schema checks',
+    'exact_match': 'the workflow matches the golden exactly',
+    'structure_below': 'the structure score is below {arg}',
+    'structure_at_least': 'the structure score is at least {arg}',
+}
+
+
+def parse_rules(spec=None):
+    """Normalize a cascade spec into a list of 'condition[=arg]:action' strings. Raises ValueError.
+
+    spec is a comma-separated string or a list of rules; None means the
+    GRADER_CASCADE default, and False, 'off' or an empty list disable it.
+    """
+    if spec is None:
+        spec = RULES
+    if spec is False or spec == 'off':
+        return []
+    if isinstance(spec, str):
+        spec = [rule for rule in spec.split(',') if rule.strip()]
+    if not isinstance(spec, list) or not all(isinstance(rule, str) for rule in spec):
+        raise ValueError('cascade must be a list of "condition:action" rules')
+    rules = []
+    for rule in spec:
+        condition, _, action = rule.strip().partition(':')
+        name, _, arg = condition.partition('=')
+        if name not in CONDITIONS:
+            raise ValueError(f"unknown cascade condition '{name}' (expected one of {', '.join(CONDITIONS)})")
+        if action not in ACTIONS:
+            raise ValueError(f"unknown cascade action '{action}' (expected one of {', '.join(ACTIONS)})")
+        if name in _SCORE_CONDITIONS:
+            try:
+                arg = f'{float(arg):g}'
+            except ValueError:
+                raise ValueError(f'{name} needs a score, e.g. {name}=0.5') from None
+        elif arg:
+            raise ValueError(f'{name} takes no argument')
+        rules.append(f'{name}={arg}:{action}' if arg else f'{name}:{action}')
+    return rules
+
+
+def _canonical(workflow):
+    """Workflow JSON without step ids (in sub_workflows too), with sorted keys.
+
+    Only the steps lose their ids; an 'id' inside a config is compared as is.
+    """
+    def strip(container):
+        steps = container.get('steps')
+        if not isinstance(steps, list):
+            return container
+        return {**container, 'steps': [
+            strip({k: v for k, v in step.items() if k != 'id'}) if isinstance(step, dict) else step
+            for step in steps
+        ]}
+    return json.dumps(strip(workflow) if isinstance(workflow, dict) else workflow, sort_keys=True)
+
+
+def decide(rules, trace_data, golden_data, graded):
+    """The first rule matching a trace, as (rule, action), or None to run the judge.
+
+    graded maps grader names to EvalResults already computed for the trace;
+    schema and structure results a rule needs are computed (and added) if
+    missing.
+    """
+    workflow = trace_data.get('parsed_workflow')
+    golden_workflow = golden_data.get('expected_workflow') if golden_data else None
+    golden_id = golden_data['id'] if golden_data else None
+    for rule in rules:
+        condition, action = rule.rsplit(':', 1)
+        name, _, arg = condition.partition('=')
+        if name == 'no_workflow':
+            matched = workflow is None
+        elif name == 'schema_failed':
+            if 'schema' not in graded:
+                graded['schema'] = schema_grader.grade(trace_data['id'], workflow, golden_id)
+            matched = not graded['schema'].passed
+        elif not isinstance(golden_workflow, dict):
+            matched = False
+        elif name == 'exact_match':
+            matched = workflow is not None and _canonical(workflow) == _canonical(golden_workflow)
+        else:
+            if 'structure' not in graded:
+                graded['structure'] = structure_grader.grade(trace_data['id'], workflow, golden_workflow, golden_id)
+            score = graded['structure'].score
+            matched = score < float(arg) if name == 'structure_below' else score >= float(arg)
+        if matched:
+            return None if action == 'judge' else (rule, action)
+    return None
+
+
+def skipped_result(trace_id, golden_id, rule, action):
+    """The intent verdict a cascade rule gives in place of the LLM judge."""
+    condition = rule.rsplit(':', 1)[0]
+    name, _, arg = condition.partition('=')
+    return EvalResult(
+        trace_id=trace_id,
+        grader_name='intent',
+        passed=action == 'pass',
+        score=1.0 if action == 'pass' else 0.0,
+        details={
+            'cascade': {'rule': rule, 'action': action},
+            'reasoning': f"LLM judge skipped: {_REASONS[name].format(arg=arg)}",
+        },
+        golden_id=golden_id
+    )
@@ -0,0 +1,251 @@
+"""Near-duplicate detection for goldens with MinHash and LSH.
+
+Each golden gets two MinHash signatures: one over the words of its
+user_message, one over its canonical workflow shape (trigger type and the
+path of step types down every sub-workflow). Text signatures are banded
+into an LSH index, so candidates for a new golden, and candidate pairs for
+the dataset report, come from shared buckets instead of comparing every
+pair. Candidates are then checked on estimated Jaccard similarity: a pair
+is a near-duplicate when the prompts are very similar, or fairly similar
+and asking for the same workflow shape.
+"""
+import hashlib
+import os
+import threading
+import time
+from itertools import combinations
+
+import numpy as np
+
+from .search import tokenize
+
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.42 Jaccard usually share a bucket
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# flag (return near-duplicates with the new golden), reject, or off
+MODE = os.environ.get('GOLDEN_DEDUPE_MODE', 'flag').lower()
+TEXT_THRESHOLD = float(os.environ.get('GOLDEN_DEDUPE_TEXT_THRESHOLD', 0.7))
+# Prompts this similar are duplicates when their workflow shapes are at least SHAPE_THRESHOLD similar
+SHAPE_TEXT_THRESHOLD = float(os.environ.get('GOLDEN_DEDUPE_SHAPE_TEXT_THRESHOLD', 0.4))
+SHAPE_THRESHOLD = float(os.environ.get('GOLDEN_DEDUPE_SHAPE_THRESHOLD', 0.9))
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(42)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from i if in into is it me my of on or our so that the then this to us we when '
+    'with you your please should would can could will'.split()
+)
+
+
+class DuplicateGoldenError(ValueError):
+    """Raised in reject mode when a new golden nearly duplicates stored ones."""
+
+    def __init__(self, duplicates):
+        super().__init__('near-duplicate of existing goldens: ' + ', '.join(d['id'] for d in duplicates))
+        self.duplicates = duplicates
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little') % _PRIME
+
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def text_shingles(text):
+    """Content words of a prompt (plurals folded), so reordered paraphrases still overlap."""
+    words = tokenize(text or '')
+    return {_stem(w) for w in words if w not in STOPWORDS} or set(words)
+
+
+def shape_shingles(workflow):
+    """Trigger type, step types by depth, and parent > child / sibling step type pairs."""
+    if not isinstance(workflow, dict):
+        return set()
+    trigger = workflow.get('trigger')
+    shingles = {f"trigger:{trigger.get('type') if isinstance(trigger, dict) else None}"}
+    stack = [(workflow.get('steps'), 'root', 0)]
+    while stack:
+        steps, parent, depth = stack.pop()
+        if not isinstance(steps, list):
+            continue
+        previous = 'start'
+        for step in steps:
+            if not isinstance(step, dict):
+                continue
+            step_type = str(step.get('type'))
+            shingles.update((f'{depth}:{step_type}', f'{parent}>{step_type}', f'{previous}~{step_type}'))
+            previous = step_type
+            stack.append((step.get('steps'), step_type, depth + 1))
+    return shingles
+
+
+def signature(shingles):
+    """MinHash signature (NUM_PERM uint64 values); all-max for an empty set."""
+    if not shingles:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    hashes = np.fromiter((_hash(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _bands(sig):
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class GoldenIndex:
+    """Signatures and LSH buckets for goldens, synced from the golden list."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # id -> (content fingerprint, text signature, shape signature)
+        self._buckets = {}  # (band, rows bytes) -> set of ids
+
+    @staticmethod
+    def _fingerprint(golden):
+        return (golden.get('user_message'), repr(golden.get('expected_workflow')))
+
+    @staticmethod
+    def signatures(golden):
+        return (signature(text_shingles(golden.get('user_message'))),
+                signature(shape_shingles(golden.get('expected_workflow'))))
+
+    def _add(self, golden_id, fingerprint, text_sig, shape_sig):
+        self._entries[golden_id] = (fingerprint, text_sig, shape_sig)
+        for bucket in _bands(text_sig):
+            self._buckets.setdefault(bucket, set()).add(golden_id)
+
+    def _remove(self, golden_id):
+        entry = self._entries.pop(golden_id, None)
+        if entry is None:
+            return
+        for bucket in _bands(entry[1]):
+            members = self._buckets.get(bucket)
+            if members is not None:
+                members.discard(golden_id)
+                if not members:
+                    del self._buckets[bucket]
+
+    def sync(self, goldens):
+        """Bring the index in line with the stored goldens; only new or edited ones are re-hashed."""
+        with self._lock:
+            seen = set()
+            for golden in goldens:
+                golden_id = golden['id']
+                seen.add(golden_id)
+                fingerprint = self._fingerprint(golden)
+                entry = self._entries.get(golden_id)
+                if entry is not None and entry[0] == fingerprint:
+                    continue
+                self._remove(golden_id)
+                self._add(golden_id, fingerprint, *self.signatures(golden))
+            for golden_id in set(self._entries) - seen:
+                self._remove(golden_id)
+
+    def _candidates(self, text_sig):
+        ids = set()
+        for bucket in _bands(text_sig):
+            ids.update(self._buckets.get(bucket, ()))
+        return ids
+
+    def near_duplicates(self, golden, exclude=None):
+        """Stored goldens that golden nearly duplicates, most similar first."""
+        text_sig, shape_sig = self.signatures(golden)
+        with self._lock:
+            matches = []
+            for golden_id in self._candidates(text_sig):
+                if golden_id == exclude:
+                    continue
+                _, other_text, other_shape = self._entries[golden_id]
+                match = _match(golden_id, text_sig, shape_sig, other_text, other_shape)
+                if match:
+                    matches.append(match)
+        return sorted(matches, key=lambda m: (m['text_similarity'], m['shape_similarity']), reverse=True)
+
+    def report(self):
+        """Clusters of near-duplicate goldens, from LSH candidate pairs only."""
+        started = time.perf_counter()
+        with self._lock:
+            pairs = set()
+            for members in self._buckets.values():
+                if len(members) > 1:
+                    pairs.update(combinations(sorted(members), 2))
+            confirmed = []
+            for a, b in pairs:
+                _, a_text, a_shape = self._entries[a]
+                _, b_text, b_shape = self._entries[b]
+                match = _match(b, a_text, a_shape, b_text, b_shape)
+                if match:
+                    confirmed.append({'a': a, 'b': b, 'text_similarity': match['text_similarity'],
+                                      'shape_similarity': match['shape_similarity']})
+            total = len(self._entries)
+
+        parent = {}
+
+        def find(x):
+            while parent.get(x, x) != x:
+                x = parent[x]
+            return x
+
+        for pair in confirmed:
+            root_a, root_b = find(pair['a']), find(pair['b'])
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+        clusters = {}
+        for pair in confirmed:
+            cluster = clusters.setdefault(find(pair['a']), {'ids': set(), 'pairs': []})
+            cluster['ids'].update((pair['a'], pair['b']))
+            cluster['pairs'].append(pair)
+        clusters = sorted(({'ids': sorted(c['ids']), 'pairs': c['pairs']} for c in clusters.values()),
+                          key=lambda c: len(c['ids']), reverse=True)
+        return {
+            'goldens': total,
+            'candidate_pairs': len(pairs),
+            'duplicate_pairs': len(confirmed),
+            # Goldens that could go while keeping one per cluster
+            'redundant_goldens': sum(len(c['ids']) - 1 for c in clusters),
+            'clusters': clusters,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+def _match(other_id, text_sig, shape_sig, other_text, other_shape):
+    text_sim = similarity(text_sig, other_text)
+    if text_sim < SHAPE_TEXT_THRESHOLD:
+        return None
+    shape_sim = similarity(shape_sig, other_shape)
+    if text_sim >= TEXT_THRESHOLD or shape_sim >= SHAPE_THRESHOLD:
+        return {'id': other_id, 'text_similarity': round(text_sim, 3), 'shape_similarity': round(shape_sim, 3)}
+    return None
+
+
+def flag_batch(examples, index):
+    """Mark generated examples with their near-duplicates among stored goldens and earlier examples.
+
+    Each example gets a 'near_duplicates' list of {'id' or 'index',
+    text_similarity, shape_similarity}.
+    """
+    seen = []
+    for i, example in enumerate(examples):
+        if not isinstance(example, dict):
+            continue
+        duplicates = index.near_duplicates(example)
+        text_sig, shape_sig = GoldenIndex.signatures(example)
+        for j, other_text, other_shape in seen:
+            match = _match(j, text_sig, shape_sig, other_text, other_shape)
+            if match:
+                match['index'] = match.pop('id')
+                duplicates.append(match)
+        example['near_duplicates'] = duplicates
+        seen.append((i, text_sig, shape_sig))
+    return examples
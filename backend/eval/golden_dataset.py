@@ -3,82 +3,99 @@ import os
 import requests
 from .models import GoldenExample
 from .traces import get_trace
+from .json_store import JSONGoldenStore
+from .storage import DATA_DIR, use_sqlite, get_database
+from .llm_client import chat_completion
+from . import search
+from . import dedupe
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 GOLDENS_FILE = os.path.join(DATA_DIR, 'goldens.json')
 
+if use_sqlite():
+    from .sqlite_store import SQLiteGoldenStore
+    _store = SQLiteGoldenStore(get_database(), legacy=JSONGoldenStore(GOLDENS_FILE))
+else:
+    _store = JSONGoldenStore(GOLDENS_FILE)
 
-def _ensure_data_dir():
-    os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(GOLDENS_FILE):
-        with open(GOLDENS_FILE, 'w') as f:
-            json.dump([], f)
+_dedupe_index = dedupe.GoldenIndex()
 
 
-def _load_goldens():
-    _ensure_data_dir()
-    try:
-        with open(GOLDENS_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+def get_goldens(tags=None):
+    return _store.list(tags=tags)
 
 
-def _save_goldens(goldens):
-    _ensure_data_dir()
-    with open(GOLDENS_FILE, 'w') as f:
-        json.dump(goldens, f, indent=2)
+def get_golden(golden_id):
+    return _store.get(golden_id)
 
 
-def get_goldens(tags=None):
-    goldens = _load_goldens()
-    if tags:
-        goldens = [g for g in goldens if any(t in g.get('tags', []) for t in tags)]
-    return goldens
+def get_goldens_by_ids(golden_ids):
+    """The goldens among golden_ids that exist, in dataset order."""
+    return _store.get_many(golden_ids)
 
 
-def get_golden(golden_id):
-    goldens = _load_goldens()
-    for g in goldens:
-        if g['id'] == golden_id:
-            return g
-    return None
+def _synced_dedupe_index():
+    # Goldens may have been written by another process; only changed ones are re-hashed
+    _dedupe_index.sync(_store.list())
+    return _dedupe_index
+
 
+def find_near_duplicates(user_message, expected_workflow, exclude=None):
+    """Stored goldens nearly duplicating this prompt and workflow; see dedupe.GoldenIndex."""
+    return _synced_dedupe_index().near_duplicates(
+        {'user_message': user_message, 'expected_workflow': expected_workflow}, exclude=exclude
+    )
 
-def add_golden(user_message, expected_workflow, tags=None, notes=""):
+
+def duplicate_report():
+    return _synced_dedupe_index().report()
+
+
+def add_golden(user_message, expected_workflow, tags=None, notes="", source_trace_id=None,
+               allow_duplicate=False):
+    """Store a golden. Raises dedupe.DuplicateGoldenError for a near-duplicate in reject mode.
+
+    In flag mode the returned dict lists them under 'near_duplicates'.
+    """
+    duplicates = []
+    if dedupe.MODE != 'off':
+        duplicates = find_near_duplicates(user_message, expected_workflow)
+        if duplicates and dedupe.MODE == 'reject' and not allow_duplicate:
+            raise dedupe.DuplicateGoldenError(duplicates)
     golden = GoldenExample(
         user_message=user_message,
         expected_workflow=expected_workflow,
         tags=tags or [],
-        notes=notes
+        notes=notes,
+        source_trace_id=source_trace_id
     )
-    goldens = _load_goldens()
-    goldens.append(golden.to_dict())
-    _save_goldens(goldens)
-    return golden.to_dict()
+    record = golden.to_dict()
+    _store.put(record)
+    search.index_records('golden', [record])
+    if duplicates:
+        return {**record, 'near_duplicates': duplicates}
+    return record
 
 
 def update_golden(golden_id, updates):
-    goldens = _load_goldens()
-    for i, g in enumerate(goldens):
-        if g['id'] == golden_id:
-            for key, value in updates.items():
-                if key != 'id':
-                    g[key] = value
-            goldens[i] = g
-            _save_goldens(goldens)
-            return g
-    return None
+    def apply(g):
+        for key, value in updates.items():
+            if key != 'id':
+                g[key] = value
+
+    g = _store.update(golden_id, apply)
+    if g is None:
+        return None
+    search.index_records('golden', [g])
+    return g
 
 
 def delete_golden(golden_id):
-    goldens = _load_goldens()
-    goldens = [g for g in goldens if g['id'] != golden_id]
-    _save_goldens(goldens)
+    _store.delete(golden_id)
+    search.remove_records('golden', [golden_id])
     return True
 
 
-def promote_trace_to_golden(trace_id, tags=None, notes=""):
+def promote_trace_to_golden(trace_id, tags=None, notes="", allow_duplicate=False):
     trace = get_trace(trace_id)
     if not trace:
         return None
@@ -89,7 +106,9 @@ def promote_trace_to_golden(trace_id, tags=None, notes=""):
         user_message=trace['user_message'],
         expected_workflow=trace['parsed_workflow'],
         tags=tags or [],
-        notes=notes or f"Promoted from trace {trace_id}"
+        notes=notes or f"Promoted from trace {trace_id}",
+        source_trace_id=trace_id,
+        allow_duplicate=allow_duplicate
     )
 
 
@@ -98,7 +117,7 @@ def generate_synthetic(count, api_key, categories=None):
     if not api_key:
         return {'error': 'No API key available'}
 
-    existing = _load_goldens()
+    existing = _store.list()
     examples_text = ""
     for g in existing[:3]:
         examples_text += f"\nPrompt: {g['user_message']}\nWorkflow: {json.dumps(g['expected_workflow'], indent=2)}\n---"
@@ -122,24 +141,23 @@ Respond with ONLY valid JSON in this format:
 {{"examples": [{{"user_message": "...", "expected_workflow": {{...}}, "tags": ["simple"|"complex"|"edge_case"|"sub_workflow"]}}]}}"""
 
     try:
-        response = requests.post(
-            'https://api.groq.com/openai/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama-3.3-70b-versatile',
-                'messages': [{'role': 'user', 'content': prompt}],
-                'response_format': {'type': 'json_object'},
-                'temperature': 0.7,
-                'max_tokens': 4000
-            }
+        response = chat_completion(
+            api_key,
+            messages=[{'role': 'user', 'content': prompt}],
+            temperature=0.7,
+            max_tokens=4000
         )
         response.raise_for_status()
         result = response.json()
         content = result['choices'][0]['message']['content']
         data = json.loads(content)
-        return data.get('examples', [])
+        examples = data.get('examples', [])
     except (requests.RequestException, json.JSONDecodeError, KeyError) as e:
         return {'error': str(e)}
+    if dedupe.MODE == 'off' or not isinstance(examples, list):
+        return examples
+    # Flag examples that repeat a stored golden or an earlier example; reject mode drops them
+    examples = dedupe.flag_batch(examples, _synced_dedupe_index())
+    if dedupe.MODE == 'reject':
+        examples = [e for e in examples if not (isinstance(e, dict) and e['near_duplicates'])]
+    return examples
@@ -1,7 +1,21 @@
 import json
-import os
 import requests
 from ..models import EvalResult
+from ..llm_client import chat_completion, DEFAULT_MODEL
+from .. import judge_cache
+
+JUDGE_MODEL = DEFAULT_MODEL
+JUDGE_TEMPERATURE = 0.1
+# Bump when the rubric or prompts change so incremental evals re-grade stored results
+VERSION = 1
+
+RUBRIC = """1. INTENT_MATCH: Does the workflow address what the user asked for?
+2. STEP_COMPLETENESS: Does it include all necessary steps to fulfill the request?
+3. STEP_TYPES: Are the step types appropriate (e.g., email for sending emails, slack_message for Slack notifications)?
+4. TRIGGER_MATCH: Is the trigger type logical for the request (schedule for recurring tasks, webhook for event-driven, manual for one-time)?
+5. STRUCTURE: Is the nesting/grouping of steps logical? Are related steps grouped into sub_workflows when appropriate?"""
+
+SCORE_KEYS = ('intent_match', 'step_completeness', 'step_types', 'trigger_match', 'structure')
 
 JUDGE_PROMPT = """You are evaluating whether an AI-generated workflow correctly fulfills a user's request.
 
@@ -14,52 +28,100 @@ Generated Workflow:
 
 Score the workflow on these dimensions. Each dimension is binary (0 = fail, 1 = pass):
 
-1. INTENT_MATCH: Does the workflow address what the user asked for?
-2. STEP_COMPLETENESS: Does it include all necessary steps to fulfill the request?
-3. STEP_TYPES: Are the step types appropriate (e.g., email for sending emails, slack_message for Slack notifications)?
-4. TRIGGER_MATCH: Is the trigger type logical for the request (schedule for recurring tasks, webhook for event-driven, manual for one-time)?
-5. STRUCTURE: Is the nesting/grouping of steps logical? Are related steps grouped into sub_workflows when appropriate?
+""" + RUBRIC + """
 
 Respond with ONLY valid JSON in this format:
 {{"scores": {{"intent_match": 0 or 1, "step_completeness": 0 or 1, "step_types": 0 or 1, "trigger_match": 0 or 1, "structure": 0 or 1}}, "reasoning": "Brief explanation of your scoring"}}"""
 
+BATCH_JUDGE_PROMPT = """You are evaluating whether AI-generated workflows correctly fulfill users' requests. There are {count} independent items below.
+
+{items}
+
+Score EACH item separately on these dimensions. Each dimension is binary (0 = fail, 1 = pass):
 
-def grade(trace_id, user_message, workflow, api_key, golden_workflow=None, golden_id=None):
-    """Use LLM-as-Judge to evaluate workflow quality."""
+""" + RUBRIC + """
+
+Respond with ONLY valid JSON containing exactly one entry per item, in item order:
+{{"results": [{{"item": 1, "scores": {{"intent_match": 0 or 1, "step_completeness": 0 or 1, "step_types": 0 or 1, "trigger_match": 0 or 1, "structure": 0 or 1}}, "reasoning": "Brief explanation"}}]}}"""
+
+BATCH_ITEM = """### Item {n}
+User Request: {user_message}
+Generated Workflow: {workflow_json}
+{golden_section}"""
+
+
+def _cache_key(user_message, workflow, golden_workflow, prompt=JUDGE_PROMPT):
+    return judge_cache.make_key(
+        workflow=workflow,
+        user_message=user_message,
+        golden_workflow=golden_workflow,
+        prompt=prompt,
+        model=JUDGE_MODEL,
+        temperature=JUDGE_TEMPERATURE
+    )
+
+
+def _verdict_result(trace_id, golden_id, scores, reasoning, **extra):
+    score_values = list(scores.values())
+    return EvalResult(
+        trace_id=trace_id,
+        grader_name='intent',
+        passed=all(v == 1 for v in score_values),
+        score=sum(score_values) / len(score_values) if score_values else 0,
+        details={'scores': scores, 'reasoning': reasoning, **extra},
+        golden_id=golden_id
+    )
+
+
+def _cached_result(trace_id, golden_id, cached):
+    return EvalResult(
+        trace_id=trace_id,
+        grader_name='intent',
+        passed=cached['passed'],
+        score=cached['score'],
+        details={**cached['details'], 'cached': True},
+        golden_id=golden_id
+    )
+
+
+def _error_result(trace_id, golden_id, message):
+    return EvalResult(
+        trace_id=trace_id,
+        grader_name='intent',
+        passed=False,
+        score=0.0,
+        details={'error': message},
+        golden_id=golden_id
+    )
+
+
+def grade(trace_id, user_message, workflow, api_key, golden_workflow=None, golden_id=None, use_cache=True):
+    """Use LLM-as-Judge to evaluate workflow quality.
+
+    Verdicts are cached by content, so re-grading an unchanged workflow
+    returns the stored result (details['cached'] = True) without a Groq call.
+    """
     if not api_key:
-        return EvalResult(
-            trace_id=trace_id,
-            grader_name='intent',
-            passed=False,
-            score=0.0,
-            details={'error': 'No API key available for LLM judge'},
-            golden_id=golden_id
-        )
+        return _error_result(trace_id, golden_id, 'No API key available for LLM judge')
 
-    golden_section = ""
-    if golden_workflow:
-        golden_section = f"Reference (expected) Workflow:\n{json.dumps(golden_workflow, indent=2)}"
+    cache_key = _cache_key(user_message, workflow, golden_workflow) if use_cache else None
+    cached = judge_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        return _cached_result(trace_id, golden_id, cached)
 
     prompt = JUDGE_PROMPT.format(
         user_message=user_message,
         workflow_json=json.dumps(workflow, indent=2),
-        golden_section=golden_section
+        golden_section=_golden_section(golden_workflow, indent=2)
     )
 
     try:
-        response = requests.post(
-            'https://api.groq.com/openai/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama-3.3-70b-versatile',
-                'messages': [{'role': 'user', 'content': prompt}],
-                'response_format': {'type': 'json_object'},
-                'temperature': 0.1,
-                'max_tokens': 500
-            }
+        response = chat_completion(
+            api_key,
+            messages=[{'role': 'user', 'content': prompt}],
+            temperature=JUDGE_TEMPERATURE,
+            max_tokens=500,
+            model=JUDGE_MODEL
         )
 
         response.raise_for_status()
@@ -70,28 +132,117 @@ def grade(trace_id, user_message, workflow, api_key, golden_workflow=None, golde
         scores = judge_output.get('scores', {})
         reasoning = judge_output.get('reasoning', '')
 
-        score_values = list(scores.values())
-        avg_score = sum(score_values) / len(score_values) if score_values else 0
-        all_passed = all(v == 1 for v in score_values)
-
-        return EvalResult(
-            trace_id=trace_id,
-            grader_name='intent',
-            passed=all_passed,
-            score=avg_score,
-            details={
-                'scores': scores,
-                'reasoning': reasoning
-            },
-            golden_id=golden_id
-        )
+        result = _verdict_result(trace_id, golden_id, scores, reasoning)
+        if cache_key:
+            judge_cache.put(cache_key, {'passed': result.passed, 'score': result.score, 'details': result.details})
+        return result
 
     except (requests.RequestException, json.JSONDecodeError, KeyError) as e:
-        return EvalResult(
-            trace_id=trace_id,
-            grader_name='intent',
-            passed=False,
-            score=0.0,
-            details={'error': str(e)},
-            golden_id=golden_id
+        return _error_result(trace_id, golden_id, str(e))
+
+
+def _golden_section(golden_workflow, indent=None):
+    if not golden_workflow:
+        return ""
+    return f"Reference (expected) Workflow:\n{json.dumps(golden_workflow, indent=indent)}"
+
+
+def _valid_scores(scores):
+    return (
+        isinstance(scores, dict) and
+        set(scores) == set(SCORE_KEYS) and
+        all(v in (0, 1) for v in scores.values())
+    )
+
+
+def _parse_batch_output(content, count):
+    """Map item position -> (scores, reasoning) for every well-formed entry."""
+    try:
+        entries = json.loads(content).get('results', [])
+    except (json.JSONDecodeError, AttributeError):
+        return {}
+    if not isinstance(entries, list):
+        return {}
+    verdicts = {}
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        item = entry.get('item', position + 1)
+        if isinstance(item, int) and 1 <= item <= count and _valid_scores(entry.get('scores')):
+            verdicts.setdefault(item - 1, (entry['scores'], entry.get('reasoning', '')))
+    return verdicts
+
+
+def grade_batch(items, api_key, use_cache=True):
+    """Grade several workflows with a single judge request.
+
+    Each item is a dict with trace_id, user_message, workflow and optionally
+    golden_workflow / golden_id. The rubric is sent once for the whole batch.
+    Items whose verdict is missing or malformed in the batched output are
+    re-graded individually with grade(). Returns EvalResults in item order.
+    """
+    if not api_key:
+        return [_error_result(i['trace_id'], i.get('golden_id'), 'No API key available for LLM judge')
+                for i in items]
+
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        key = (_cache_key(item['user_message'], item['workflow'], item.get('golden_workflow'),
+                          prompt=BATCH_JUDGE_PROMPT) if use_cache else None)
+        cached = judge_cache.get(key) if key else None
+        if cached is not None:
+            results[index] = _cached_result(item['trace_id'], item.get('golden_id'), cached)
+        else:
+            pending.append((index, item, key))
+
+    if pending:
+        prompt = BATCH_JUDGE_PROMPT.format(
+            count=len(pending),
+            items='\n\n'.join(
+                BATCH_ITEM.format(
+                    n=n,
+                    user_message=item['user_message'],
+                    workflow_json=json.dumps(item['workflow']),
+                    golden_section=_golden_section(item.get('golden_workflow'))
+                )
+                for n, (_, item, _) in enumerate(pending, start=1)
+            )
         )
+        verdicts = {}
+        try:
+            response = chat_completion(
+                api_key,
+                messages=[{'role': 'user', 'content': prompt}],
+                temperature=JUDGE_TEMPERATURE,
+                max_tokens=min(8000, 150 * len(pending) + 100),
+                model=JUDGE_MODEL
+            )
+            response.raise_for_status()
+            verdicts = _parse_batch_output(response.json()['choices'][0]['message']['content'], len(pending))
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            for index, item, _ in pending:
+                results[index] = _error_result(item['trace_id'], item.get('golden_id'), str(e))
+            return results
+
+        for position, (index, item, key) in enumerate(pending):
+            if position in verdicts:
+                scores, reasoning = verdicts[position]
+                result = _verdict_result(item['trace_id'], item.get('golden_id'), scores, reasoning,
+                                         batched=True)
+                if key:
+                    judge_cache.put(key, {'passed': result.passed, 'score': result.score,
+                                          'details': result.details})
+            else:
+                result = grade(
+                    trace_id=item['trace_id'],
+                    user_message=item['user_message'],
+                    workflow=item['workflow'],
+                    api_key=api_key,
+                    golden_workflow=item.get('golden_workflow'),
+                    golden_id=item.get('golden_id'),
+                    use_cache=use_cache
+                )
+            results[index] = result
+
+    return results
@@ -1,100 +1,110 @@
 from ..models import EvalResult
 
-VALID_TRIGGER_TYPES = {'schedule', 'webhook', 'manual'}
-VALID_STEP_TYPES = {'filter', 'slack_message', 'email', 'http_request', 'delay', 'sub_workflow'}
+# Bump when the checks change so incremental evals re-grade stored results
+VERSION = 1
 
+CHECKS = ('valid_json', 'has_required_keys', 'valid_trigger_type', 'trigger_has_config',
+          'valid_step_types', 'steps_have_required_fields', 'sub_workflows_have_steps',
+          'has_at_least_one_step')
 
-def _collect_all_steps(steps, collected=None):
-    """Recursively collect all steps from nested structure."""
-    if collected is None:
-        collected = []
-    for step in steps:
-        collected.append(step)
-        if step.get('type') == 'sub_workflow' and isinstance(step.get('steps'), list):
-            _collect_all_steps(step['steps'], collected)
-    return collected
+VALID_TRIGGER_TYPES = frozenset({'schedule', 'webhook', 'manual'})
+VALID_STEP_TYPES = frozenset({'filter', 'slack_message', 'email', 'http_request', 'delay', 'sub_workflow'})
 
+_NOT_PARSED = (False,) * len(CHECKS)
+_NOT_AN_OBJECT = (True,) + (False,) * (len(CHECKS) - 1)
 
-def grade(trace_id, workflow, golden_id=None):
-    """Run 8 structural validation checks on a workflow."""
-    checks = {}
-
-    # Check 1: Valid JSON (parse succeeded - if we got here, it did)
-    checks['valid_json'] = workflow is not None
-
-    if not checks['valid_json']:
-        # Can't run remaining checks
-        for key in ['has_required_keys', 'valid_trigger_type', 'trigger_has_config',
-                     'valid_step_types', 'steps_have_required_fields',
-                     'sub_workflows_have_steps', 'has_at_least_one_step']:
-            checks[key] = False
-        passed_count = sum(1 for v in checks.values() if v)
-        return EvalResult(
-            trace_id=trace_id,
-            grader_name='schema',
-            passed=False,
-            score=passed_count / len(checks),
-            details={'checks': checks},
-            golden_id=golden_id
-        )
-
-    # Check 2: Has required top-level keys
-    checks['has_required_keys'] = (
-        isinstance(workflow.get('name'), str) and
-        isinstance(workflow.get('trigger'), dict) and
-        isinstance(workflow.get('steps'), list)
-    )
 
-    # Check 3: Trigger type is valid
-    trigger = workflow.get('trigger', {})
-    checks['valid_trigger_type'] = trigger.get('type') in VALID_TRIGGER_TYPES
+def check(workflow):
+    """Run the 8 structural checks; returns booleans in CHECKS order.
 
-    # Check 4: Trigger has config object
-    checks['trigger_has_config'] = isinstance(trigger.get('config'), dict)
+    The step tree is walked once with an explicit stack, so arbitrarily
+    deep sub_workflow nesting does not hit the recursion limit.
+    """
+    # Check 1: Valid JSON (parse succeeded)
+    if workflow is None:
+        return _NOT_PARSED
+    if not isinstance(workflow, dict):
+        return _NOT_AN_OBJECT
 
-    # Check 5: All step types are valid
-    steps = workflow.get('steps', [])
-    all_steps = _collect_all_steps(steps)
+    trigger = workflow.get('trigger')
+    steps = workflow.get('steps')
+    steps_is_list = isinstance(steps, list)
+    trigger_is_dict = isinstance(trigger, dict)
 
-    if all_steps:
-        checks['valid_step_types'] = all(
-            s.get('type') in VALID_STEP_TYPES for s in all_steps
-        )
-    else:
-        checks['valid_step_types'] = True  # No steps to validate
-
-    # Check 6: All steps have required fields
-    if all_steps:
-        checks['steps_have_required_fields'] = all(
-            isinstance(s.get('id'), str) and
-            isinstance(s.get('type'), str) and
-            isinstance(s.get('name'), str) and
-            isinstance(s.get('config'), dict)
-            for s in all_steps
-        )
-    else:
-        checks['steps_have_required_fields'] = True
-
-    # Check 7: sub_workflow steps have nested steps array
-    sub_workflows = [s for s in all_steps if s.get('type') == 'sub_workflow']
-    if sub_workflows:
-        checks['sub_workflows_have_steps'] = all(
-            isinstance(s.get('steps'), list) for s in sub_workflows
-        )
-    else:
-        checks['sub_workflows_have_steps'] = True  # No sub_workflows to validate
+    # Check 2: Has required top-level keys
+    has_required_keys = isinstance(workflow.get('name'), str) and trigger_is_dict and steps_is_list
+
+    # Checks 3-4: Trigger type is valid, trigger has config object
+    trigger_type = trigger.get('type') if trigger_is_dict else None
+    valid_trigger_type = isinstance(trigger_type, str) and trigger_type in VALID_TRIGGER_TYPES
+    trigger_has_config = trigger_is_dict and isinstance(trigger.get('config'), dict)
+
+    # Checks 5-7 over every step, nested ones included
+    valid_step_types = steps_have_fields = sub_workflows_have_steps = True
+    stack = [steps] if steps_is_list else []
+    while stack and (valid_step_types or steps_have_fields or sub_workflows_have_steps):
+        for step in stack.pop():
+            if not isinstance(step, dict):
+                valid_step_types = steps_have_fields = False
+                continue
+            step_type = step.get('type')
+            if not isinstance(step_type, str):
+                valid_step_types = steps_have_fields = False
+            elif step_type not in VALID_STEP_TYPES:
+                valid_step_types = False
+            if steps_have_fields and not (isinstance(step.get('id'), str) and
+                                          isinstance(step.get('name'), str) and
+                                          isinstance(step.get('config'), dict)):
+                steps_have_fields = False
+            if step_type == 'sub_workflow':
+                nested = step.get('steps')
+                if isinstance(nested, list):
+                    stack.append(nested)
+                else:
+                    sub_workflows_have_steps = False
 
     # Check 8: At least one step exists
-    checks['has_at_least_one_step'] = len(steps) > 0
+    has_at_least_one_step = steps_is_list and len(steps) > 0
+
+    return (True, has_required_keys, valid_trigger_type, trigger_has_config, valid_step_types,
+            steps_have_fields, sub_workflows_have_steps, has_at_least_one_step)
 
-    passed_count = sum(1 for v in checks.values() if v)
-    total = len(checks)
 
+def check_many(workflows):
+    """check() over a list of workflows (the unit of work sent to pool processes)."""
+    return [check(workflow) for workflow in workflows]
+
+
+def _result(trace_id, results, golden_id=None):
+    passed_count = sum(results)
     return EvalResult(
         trace_id=trace_id,
         grader_name='schema',
-        passed=passed_count == total,
-        score=passed_count / total,
-        details={'checks': checks},
+        passed=passed_count == len(CHECKS),
+        score=passed_count / len(CHECKS),
+        details={'checks': dict(zip(CHECKS, results))},
         golden_id=golden_id
     )
+
+
+def grade(trace_id, workflow, golden_id=None):
+    """Run 8 structural validation checks on a workflow."""
+    return _result(trace_id, check(workflow), golden_id)
+
+
+def grade_many(items, executor=None, chunk_size=500):
+    """Grade (trace_id, workflow, golden_id) tuples; returns result dicts in input order.
+
+    The dicts match EvalResult.to_dict() but skip its deep copy. With a
+    process pool executor the checks run in chunks across its workers;
+    otherwise they run in this process.
+    """
+    items = list(items)
+    workflows = [workflow for _, workflow, _ in items]
+    if executor is None:
+        results = map(check, workflows)
+    else:
+        chunks = [workflows[i:i + chunk_size] for i in range(0, len(workflows), chunk_size)]
+        results = (checked for chunk in executor.map(check_many, chunks) for checked in chunk)
+    return [dict(vars(_result(trace_id, checked, golden_id)))
+            for (trace_id, _, golden_id), checked in zip(items, results)]
@@ -0,0 +1,484 @@
+"""Deterministic structural similarity between a generated workflow and its golden.
+
+Both workflows become ordered trees (a root, the trigger, then the steps,
+with sub_workflow steps as parents of their nested steps) and are compared
+with tree edit distance. Deleting or inserting a node costs its type
+weight; relabelling costs the larger weight when the types differ,
+otherwise a fraction of the weight for the config keys that differ.
+
+The exact distance is Zhang-Shasha: pairs involving a leaf come from a
+closed form, so the keyroot passes only run for the root and sub_workflow
+steps, and each forest table is filled a row at a time with numpy. Its
+cost grows with the keyroot pairs times their subtree sizes, which blows
+up on deep nesting, so when the estimated work is over
+STRUCTURE_EXACT_MAX_WORK forest rows the grader falls back to a top-down
+alignment (see _TopDown) whose distance is an upper bound, and the result
+is marked approximate. Workflows are cut at STRUCTURE_MAX_NODES nodes.
+"""
+import os
+
+import numpy as np
+
+from ..models import EvalResult
+
+# Bump when the tree model or costs change so incremental evals re-grade stored results
+VERSION = 2
+
+PASS_THRESHOLD = float(os.environ.get('STRUCTURE_PASS_THRESHOLD', 0.8))
+# Edit operations listed in the result details; the count covers all of them
+MAX_SCRIPT = 50
+# Nodes kept per workflow; steps past this are left out and the result is marked truncated
+MAX_NODES = int(os.environ.get('STRUCTURE_MAX_NODES', 1000))
+# Estimated forest-table rows above which the exact distance gives way to the top-down one
+EXACT_MAX_WORK = int(os.environ.get('STRUCTURE_EXACT_MAX_WORK', 3000))
+
+TYPE_WEIGHTS = {'trigger': 2.0, 'sub_workflow': 1.5}
+DEFAULT_WEIGHT = 1.0
+# Share of a node's weight charged when its type matches but its config keys don't
+CONFIG_WEIGHT = 0.5
+
+_EPS = 1e-9
+# Fixed overhead of one keyroot pass, in forest-table rows
+_PASS_ROWS = 4
+
+
+class _Tree:
+    """Nodes of a workflow in postorder, with leftmost-leaf indexes and costs."""
+
+    def __init__(self, workflow, max_nodes=MAX_NODES):
+        self.types, self.paths, self.positions, self.config_keys = [], [], [], []
+        self.children = []
+        self.truncated = False
+        # Room left for steps once the root and trigger are counted
+        self._room = max_nodes - 2
+        root_children = []
+        if isinstance(workflow, dict):
+            trigger = workflow.get('trigger')
+            trigger = trigger if isinstance(trigger, dict) else {}
+            root_children.append((f"trigger:{trigger.get('type')}", 'trigger', (-1,), trigger, []))
+            root_children += self._steps(workflow.get('steps'), 'steps', ())
+        # Iterative postorder: (node, child nodes still to visit, indexes of visited children)
+        stack = [(('workflow', '$', (), {}, root_children), list(reversed(root_children)), [])]
+        while stack:
+            node, pending, visited = stack[-1]
+            if pending:
+                child = pending.pop()
+                stack.append((child, list(reversed(child[4])), []))
+                continue
+            stack.pop()
+            node_type, path, position, source, _ = node
+            config = source.get('config')
+            self.types.append(node_type)
+            self.paths.append(path)
+            self.positions.append(position)
+            self.config_keys.append(frozenset(config) if isinstance(config, dict) else frozenset())
+            self.children.append(visited)
+            if stack:
+                stack[-1][2].append(len(self.types) - 1)
+
+        n = len(self.types)
+        self.leftmost = np.empty(n, dtype=np.intp)
+        for i, children in enumerate(self.children):
+            self.leftmost[i] = self.leftmost[children[0]] if children else i
+        self.weights = np.array([_weight(t) for t in self.types])
+        # Weight of each node's whole subtree
+        self.subtree_weights = self.weights.copy()
+        for i, children in enumerate(self.children):
+            for child in children:
+                self.subtree_weights[i] += self.subtree_weights[child]
+        # Keyroots that aren't leaves: the root and the highest node of each non-leftmost branch
+        last_with_leftmost = {}
+        for i in range(n):
+            last_with_leftmost[self.leftmost[i]] = i
+        self.keyroots = sorted(i for i in last_with_leftmost.values() if self.children[i])
+
+    def _steps(self, steps, path, position):
+        """(type, path, position, step, child nodes) for a step list and, level by level, its sub-workflows."""
+        nodes = []
+        pending = [(steps, path, position, nodes)]
+        while pending:
+            steps, path, position, out = pending.pop()
+            if not isinstance(steps, list):
+                continue
+            for i, step in enumerate(steps):
+                if self._room <= 0:
+                    self.truncated = True
+                    break
+                self._room -= 1
+                step = step if isinstance(step, dict) else {}
+                node = (str(step.get('type')), f'{path}[{i}]', position + (i,), step, [])
+                out.append(node)
+                if step.get('type') == 'sub_workflow':
+                    pending.append((step.get('steps'), f'{path}[{i}].steps', node[2], node[4]))
+        return nodes
+
+    def __len__(self):
+        return len(self.types)
+
+    def describe(self, i):
+        return {'path': self.paths[i], 'type': self.types[i]}
+
+
+def _weight(node_type):
+    return TYPE_WEIGHTS.get(node_type.split(':', 1)[0], DEFAULT_WEIGHT)
+
+
+def _rename_costs(a, b, xs=None, ys=None):
+    """Matrix of relabel costs between nodes xs of a and nodes ys of b (default: all of them).
+
+    The cost only depends on a node's type and config keys, so it is worked
+    out once per pair of distinct labels and then spread over the nodes.
+    """
+    xs = range(len(a)) if xs is None else xs
+    ys = range(len(b)) if ys is None else ys
+    a_labels, b_labels = {}, {}
+    a_index = np.array([a_labels.setdefault((a.types[x], a.config_keys[x]), len(a_labels)) for x in xs], dtype=np.intp)
+    b_index = np.array([b_labels.setdefault((b.types[y], b.config_keys[y]), len(b_labels)) for y in ys], dtype=np.intp)
+    vocabulary, type_ids = {}, {}
+    for _, keys in list(a_labels) + list(b_labels):
+        for key in keys:
+            vocabulary.setdefault(key, len(vocabulary))
+
+    def key_matrix(labels):
+        matrix = np.zeros((len(labels), max(len(vocabulary), 1)))
+        for i, (_, keys) in enumerate(labels):
+            matrix[i, [vocabulary[k] for k in keys]] = 1.0
+        return matrix
+
+    ka, kb = key_matrix(a_labels), key_matrix(b_labels)
+    shared = ka @ kb.T
+    union = ka.sum(axis=1)[:, None] + kb.sum(axis=1)[None, :] - shared
+    key_distance = np.where(union > 0, 1.0 - shared / np.maximum(union, 1.0), 0.0)
+
+    ta = np.array([type_ids.setdefault(t, len(type_ids)) for t, _ in a_labels], dtype=np.intp)
+    tb = np.array([type_ids.setdefault(t, len(type_ids)) for t, _ in b_labels], dtype=np.intp)
+    wa = np.array([_weight(t) for t, _ in a_labels])
+    wb = np.array([_weight(t) for t, _ in b_labels])
+    costs = np.where(ta[:, None] == tb[None, :], CONFIG_WEIGHT * wa[:, None] * key_distance,
+                     np.maximum(wa[:, None], wb[None, :]))
+    return costs[np.ix_(a_index, b_index)]
+
+
+def _exact_work(a, b):
+    """Forest-table rows the Zhang-Shasha distance and its edit script would fill, plus a fixed charge per pass."""
+    sa = np.sort([i - a.leftmost[i] + 1 for i in a.keyroots]).astype(float)
+    sb = np.sort([j - b.leftmost[j] + 1 for j in b.keyroots]).astype(float)
+    # Each pass fills as many rows as the smaller of its two subtrees
+    smaller_b = np.searchsorted(sb, sa)
+    prefix = np.concatenate(([0.0], np.cumsum(sb)))
+    rows = prefix[smaller_b].sum() + (sa * (len(sb) - smaller_b)).sum()
+    # The edit script recomputes a forest table for each mapped pair of inner nodes
+    backtrace = min(sum(i - a.leftmost[i] + 1 for i in range(len(a)) if a.children[i]),
+                    sum(j - b.leftmost[j] + 1 for j in range(len(b)) if b.children[j]))
+    return rows + backtrace + _PASS_ROWS * len(sa) * len(sb)
+
+
+class _Distance:
+    """Zhang-Shasha tree edit distance between two _Trees, with backtracking for the edit script."""
+
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+        self.rename = _rename_costs(a, b)
+        n, m = len(a), len(b)
+        # Best single node of sub(x) to map onto each node y, deleting the rest of sub(x)
+        map_into = self.rename - a.weights[:, None]
+        for x in range(n):
+            if a.children[x]:
+                np.minimum(map_into[x], map_into[a.children[x]].min(axis=0), out=map_into[x])
+
+        # Tree distances: closed form wherever one side is a single node, the keyroot passes fill the rest
+        self.tree = np.minimum(map_into, b.weights[None, :])
+        self.tree += a.subtree_weights[:, None]
+        a_leaves = [x for x in range(n) if not a.children[x]]
+        b_inner = [y for y in range(m) if b.children[y]]
+        if a_leaves and b_inner:
+            # Best single node of sub(y) for each node x to map onto, inserting the rest of sub(y)
+            map_from = np.empty((n, len(b_inner)))
+            column = {y: k for k, y in enumerate(b_inner)}
+            for k, y in enumerate(b_inner):
+                direct = [y] + [child for child in b.children[y] if child not in column]
+                map_from[:, k] = (self.rename[:, direct] - b.weights[direct]).min(axis=1)
+                for child in b.children[y]:
+                    if child in column:
+                        np.minimum(map_from[:, k], map_from[:, column[child]], out=map_from[:, k])
+            self.tree[np.ix_(a_leaves, b_inner)] = b.subtree_weights[b_inner] + np.minimum(
+                a.weights[a_leaves, None], map_from[a_leaves])
+        self._root_table = None
+        for i in a.keyroots:
+            for j in b.keyroots:
+                table = self._forest(i, j)
+        if a.keyroots and b.keyroots:
+            # The last pair is the two roots, where the edit script starts
+            self._root_table = table
+
+    @property
+    def distance(self):
+        return float(self.tree[-1, -1])
+
+    def relabel_cost(self, x, y):
+        return float(self.rename[x, y])
+
+    def _forest(self, i, j):
+        """Forest distance table between sub(i) and sub(j); fills tree distances along their leftmost paths.
+
+        Rows are filled one at a time, so the pair is computed transposed
+        when sub(j) is the smaller side.
+        """
+        if j - self.b.leftmost[j] < i - self.a.leftmost[i]:
+            return _forest_table(self.b, self.a, self.rename.T, self.tree.T, j, i).T
+        return _forest_table(self.a, self.b, self.rename, self.tree, i, j)
+
+    def script(self):
+        """Edit operations (relabel, delete, insert) turning a into b, in tree order."""
+        a, b = self.a, self.b
+        operations = []
+        stack = [(len(a) - 1, len(b) - 1)]
+        while stack:
+            i, j = stack.pop()
+            if not a.children[i] or not b.children[j]:
+                self._leaf_script(i, j, operations)
+                continue
+            table = self._root_table if (i, j) == (len(a) - 1, len(b) - 1) else self._forest(i, j)
+            li, lj = a.leftmost[i], b.leftmost[j]
+            r, c = i - li + 1, j - lj + 1
+            while r > 0 or c > 0:
+                x, y = li + r - 1, lj + c - 1
+                if r > 0 and abs(table[r, c] - (table[r - 1, c] + a.weights[x])) < _EPS:
+                    operations.append(('delete', x, None))
+                    r -= 1
+                elif c > 0 and abs(table[r, c] - (table[r, c - 1] + b.weights[y])) < _EPS:
+                    operations.append(('insert', None, y))
+                    c -= 1
+                elif a.leftmost[x] == li and b.leftmost[y] == lj:
+                    operations.append(('relabel', x, y))
+                    r, c = r - 1, c - 1
+                else:
+                    stack.append((x, y))
+                    r, c = a.leftmost[x] - li, b.leftmost[y] - lj
+        return operations
+
+    def _leaf_script(self, i, j, operations):
+        """Edit operations when sub(i) or sub(j) is a single node: map at most one pair, drop the rest."""
+        a, b = self.a, self.b
+        xs, ys = range(a.leftmost[i], i + 1), range(b.leftmost[j], j + 1)
+        if not b.children[j]:
+            x = min(xs, key=lambda x: self.rename[x, j] - a.weights[x])
+            y = j
+        else:
+            x = i
+            y = min(ys, key=lambda y: self.rename[i, y] - b.weights[y])
+        mapped = self.rename[x, y] - a.weights[x] - b.weights[y] < -_EPS
+        operations += [('delete', other, None) for other in xs if not mapped or other != x]
+        operations += [('insert', None, other) for other in ys if not mapped or other != y]
+        if mapped:
+            operations.append(('relabel', x, y))
+
+
+def _forest_table(a, b, rename, tree, i, j):
+    li, lj = a.leftmost[i], b.leftmost[j]
+    rows, cols = i - li + 1, j - lj + 1
+    ys = slice(lj, j + 1)
+    on_path_b = b.leftmost[ys] == lj
+    path_cols = np.flatnonzero(on_path_b) + lj
+    # Column of the forest table just left of each y's subtree
+    jump_cols = b.leftmost[ys] - lj
+    cumulative = np.concatenate(([0.0], np.cumsum(b.weights[ys])))
+
+    table = np.empty((rows + 1, cols + 1))
+    table[0] = cumulative
+    jump_from_start = table[0, jump_cols]
+    for r in range(1, rows + 1):
+        x = li + r - 1
+        delete_cost = a.weights[x]
+        previous = table[r - 1]
+        on_path_a = a.leftmost[x] == li
+        if on_path_a:
+            diagonal = np.where(on_path_b, previous[:-1] + rename[x, ys], jump_from_start + tree[x, ys])
+        else:
+            diagonal = table[a.leftmost[x] - li, jump_cols] + tree[x, ys]
+        candidates = np.empty(cols + 1)
+        candidates[0] = previous[0] + delete_cost
+        np.minimum(previous[1:] + delete_cost, diagonal, out=candidates[1:])
+        # Left-to-right inserts: table[r][c] = min over k <= c of (candidates[k] + inserts k+1..c)
+        candidates -= cumulative
+        np.minimum.accumulate(candidates, out=table[r])
+        table[r] += cumulative
+        if on_path_a:
+            tree[x, path_cols] = table[r, path_cols - lj + 1]
+    return table
+
+
+class _TopDown:
+    """Top-down tree edit distance: a node only maps onto a node whose parent its own parent maps onto.
+
+    Starting from the roots, the children of each mapped pair are aligned
+    as sequences (delete a child's subtree, insert one, or map the pair and
+    recurse). A pair's alignment cost is its relabel cost plus half the gap
+    between the weighted type counts below the two children, since one
+    relabel can close a gap of two. The distance is the exact cost of the
+    resulting edit script, so it never undercounts the true edit distance;
+    the work is bounded by the sum over mapped pairs of their child counts
+    multiplied together.
+    """
+
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+        type_ids = {}
+        for node_type in a.types + b.types:
+            type_ids.setdefault(node_type, len(type_ids))
+        self._below_a, self._below_b = _weight_below(a, type_ids), _weight_below(b, type_ids)
+        self._relabel = {(len(a) - 1, len(b) - 1): 0.0}
+        self._operations = self._align_children()
+        self.distance = sum(
+            float(a.weights[x]) if op == 'delete' else float(b.weights[y]) if op == 'insert'
+            else self._relabel[x, y]
+            for op, x, y in self._operations
+        )
+
+    def relabel_cost(self, x, y):
+        return self._relabel[x, y]
+
+    def script(self):
+        """Edit operations (relabel, delete, insert) turning a into b."""
+        return self._operations
+
+    def _align_children(self):
+        a, b = self.a, self.b
+        operations = [('relabel', len(a) - 1, len(b) - 1)]
+        stack = [(len(a) - 1, len(b) - 1)]
+        while stack:
+            x, y = stack.pop()
+            xs, ys = a.children[x], b.children[y]
+            if not xs or not ys:
+                operations += [('delete', node, None) for node in range(a.leftmost[x], x)]
+                operations += [('insert', None, node) for node in range(b.leftmost[y], y)]
+                continue
+            rename = _rename_costs(a, b, xs, ys)
+            below_a, below_b = self._below_a[xs], self._below_b[ys]
+            total_a, total_b = below_a.sum(axis=1), below_b.sum(axis=1)
+            match = rename + 0.5 * (total_a[:, None] + total_b[None, :])
+            inner_a, inner_b = np.flatnonzero(total_a), np.flatnonzero(total_b)
+            if len(inner_a) and len(inner_b):
+                # Only children with descendants on both sides need the per-type gap
+                gap = -(total_a[inner_a, None] + total_b[None, inner_b])
+                for t in np.flatnonzero(below_a[inner_a].any(axis=0) | below_b[inner_b].any(axis=0)):
+                    gap += np.abs(below_a[inner_a, t, None] - below_b[None, inner_b, t])
+                match[np.ix_(inner_a, inner_b)] += 0.5 * gap
+            deletes, inserts = a.subtree_weights[xs], b.subtree_weights[ys]
+            table = _align(deletes, inserts, match)
+            r, c = len(xs), len(ys)
+            while r > 0 or c > 0:
+                if r > 0 and c > 0 and abs(table[r, c] - (table[r - 1, c - 1] + match[r - 1, c - 1])) < _EPS:
+                    r, c = r - 1, c - 1
+                    self._relabel[xs[r], ys[c]] = float(rename[r, c])
+                    operations.append(('relabel', xs[r], ys[c]))
+                    stack.append((xs[r], ys[c]))
+                elif r > 0 and abs(table[r, c] - (table[r - 1, c] + deletes[r - 1])) < _EPS:
+                    r -= 1
+                    operations += [('delete', node, None) for node in range(a.leftmost[xs[r]], xs[r] + 1)]
+                else:
+                    c -= 1
+                    operations += [('insert', None, node) for node in range(b.leftmost[ys[c]], ys[c] + 1)]
+        return operations
+
+
+def _weight_below(tree, type_ids):
+    """Per node, the total weight of each type among its descendants."""
+    below = np.zeros((len(tree), len(type_ids)))
+    for i, children in enumerate(tree.children):
+        for child in children:
+            below[i] += below[child]
+            below[i, type_ids[tree.types[child]]] += tree.weights[child]
+    return below
+
+
+def _align(deletes, inserts, match):
+    """Sequence alignment table: drop row items, add column items, or pair them at match[r, c]."""
+    if len(deletes) > len(inserts):
+        return _align(inserts, deletes, match.T).T
+    cumulative = np.concatenate(([0.0], np.cumsum(inserts)))
+    table = np.empty((len(deletes) + 1, len(inserts) + 1))
+    table[0] = cumulative
+    candidates = np.empty(len(inserts) + 1)
+    for r in range(1, len(deletes) + 1):
+        previous = table[r - 1]
+        candidates[0] = previous[0] + deletes[r - 1]
+        np.minimum(previous[1:] + deletes[r - 1], previous[:-1] + match[r - 1], out=candidates[1:])
+        # Same left-to-right insert trick as the forest tables
+        candidates -= cumulative
+        np.minimum.accumulate(candidates, out=table[r])
+        table[r] += cumulative
+    return table
+
+
+def compare(workflow, golden_workflow):
+    """Weighted tree edit distance from workflow to golden_workflow.
+
+    Returns a dict with the distance, the normalized similarity in [0, 1]
+    (score), the edit operations with non-zero cost as dicts in tree order
+    (edits), the method used ('exact' or 'top_down') and whether either
+    workflow was cut at MAX_NODES (truncated).
+    """
+    a, b = _Tree(workflow), _Tree(golden_workflow)
+    truncated = a.truncated or b.truncated
+    if a.types == b.types and a.config_keys == b.config_keys and a.children == b.children:
+        return {'distance': 0.0, 'score': 1.0, 'edits': [], 'method': 'exact', 'truncated': truncated}
+    exact = _exact_work(a, b) <= EXACT_MAX_WORK
+    result = _Distance(a, b) if exact else _TopDown(a, b)
+    distance = result.distance
+    # The roots always match, so they don't count towards the size of either tree
+    size = max(a.subtree_weights[-1] - a.weights[-1], b.subtree_weights[-1] - b.weights[-1])
+    score = 1.0 if size == 0 else max(0.0, 1.0 - distance / float(size))
+
+    edits = []
+    for op, x, y in result.script():
+        if op == 'delete':
+            edit = {'op': 'delete', 'from': a.describe(x), 'cost': float(a.weights[x])}
+        elif op == 'insert':
+            edit = {'op': 'insert', 'to': b.describe(y), 'cost': float(b.weights[y])}
+        elif result.relabel_cost(x, y) > _EPS:
+            edit = {'op': 'relabel', 'from': a.describe(x), 'to': b.describe(y),
+                    'cost': round(result.relabel_cost(x, y), 4)}
+            if a.types[x] == b.types[y]:
+                edit['missing_config_keys'] = sorted(b.config_keys[y] - a.config_keys[x])
+                edit['extra_config_keys'] = sorted(a.config_keys[x] - b.config_keys[y])
+        else:
+            continue
+        edits.append((a.positions[x] if x is not None else b.positions[y], edit))
+    edits.sort(key=lambda item: item[0])
+    return {'distance': distance, 'score': score, 'edits': [edit for _, edit in edits],
+            'method': 'exact' if exact else 'top_down', 'truncated': truncated}
+
+
+def grade(trace_id, workflow, golden_workflow, golden_id=None):
+    """Score a workflow's structure against the golden workflow (no LLM call)."""
+    if not isinstance(golden_workflow, dict):
+        return EvalResult(
+            trace_id=trace_id,
+            grader_name='structure',
+            passed=False,
+            score=0.0,
+            details={'error': 'No golden workflow to compare against'},
+            golden_id=golden_id
+        )
+    comparison = compare(workflow, golden_workflow)
+    score, edits = comparison['score'], comparison['edits']
+    details = {
+        'distance': round(comparison['distance'], 4),
+        'edit_count': len(edits),
+        'edits': edits[:MAX_SCRIPT],
+    }
+    if comparison['method'] != 'exact':
+        # Too large for the exact distance: an upper bound, so the score may be low
+        details['approximate'] = True
+        details['method'] = comparison['method']
+    if comparison['truncated']:
+        details['truncated'] = True
+    return EvalResult(
+        trace_id=trace_id,
+        grader_name='structure',
+        passed=bool(score >= PASS_THRESHOLD),
+        score=round(score, 4),
+        details=details,
+        golden_id=golden_id
+    )
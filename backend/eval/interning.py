@@ -0,0 +1,94 @@
+"""Compact storage form of trace records.
+
+Long strings repeated across traces (system prompts, re-run user
+messages, identical model outputs) are stored once in a content-addressed
+blob store and replaced by their key under '_refs'. With TRACE_RAW_RESPONSE=metadata, the message
+content of a parsed response, which parsed_workflow already holds, is
+dropped as well, keeping ids, finish reasons and usage. hydrate() gives
+back the full record on read.
+"""
+import hashlib
+import json
+import os
+
+INTERNED_FIELDS = ('system_prompt', 'user_message')
+# Shorter strings are stored inline: a ref would not save much
+INTERN_MIN_CHARS = int(os.environ.get('TRACE_INTERN_MIN_CHARS', 256))
+# "full" keeps raw responses as received, "metadata" drops content that parsed_workflow holds
+RAW_RESPONSE_MODE = os.environ.get('TRACE_RAW_RESPONSE', 'full').lower()
+
+
+def blob_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _strip_content(raw_response):
+    if not isinstance(raw_response, dict) or not raw_response.get('choices'):
+        return raw_response
+    choices = [
+        {**choice, 'message': {k: v for k, v in (choice.get('message') or {}).items() if k != 'content'}}
+        for choice in raw_response['choices']
+    ]
+    return {**raw_response, 'choices': choices, 'content_stripped': True}
+
+
+def _content(record):
+    try:
+        return record['raw_response']['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _internable(value):
+    return isinstance(value, str) and len(value) >= INTERN_MIN_CHARS
+
+
+def compact_many(records, blobs):
+    """Storage form of trace records; the records passed in are not modified."""
+    compacted = []
+    slots = []  # (record, field) with the text to intern
+    texts = []
+    for record in records:
+        record = dict(record)
+        if RAW_RESPONSE_MODE == 'metadata' and record.get('parse_success'):
+            record['raw_response'] = _strip_content(record.get('raw_response'))
+        elif _internable(_content(record)):
+            # Identical outputs (reruns, replayed cassettes) share one copy
+            slots.append((record, 'content'))
+            texts.append(_content(record))
+        for name in INTERNED_FIELDS:
+            if _internable(record.get(name)):
+                slots.append((record, name))
+                texts.append(record[name])
+        compacted.append(record)
+    for (record, name), key in zip(slots, blobs.add_many(texts) if texts else ()):
+        record['_refs'] = {**record.get('_refs', {}), name: key}
+        if name == 'content':
+            record['raw_response'] = _strip_content(record['raw_response'])
+            del record['raw_response']['content_stripped']
+        else:
+            del record[name]
+    return compacted
+
+
+def hydrate(record, blobs):
+    """Full form of a stored trace record (restored in place); returns it.
+
+    Stripped response content is rebuilt from parsed_workflow and keeps
+    the content_stripped flag.
+    """
+    if record is None:
+        return None
+    refs = record.pop('_refs', None)
+    if refs:
+        for name, key in refs.items():
+            if name == 'content':
+                record['raw_response']['choices'][0]['message']['content'] = blobs.get(key)
+            else:
+                record[name] = blobs.get(key)
+    raw_response = record.get('raw_response')
+    if isinstance(raw_response, dict) and raw_response.get('content_stripped'):
+        content = json.dumps(record.get('parsed_workflow'))
+        for choice in raw_response.get('choices') or []:
+            choice.setdefault('message', {}).setdefault('content', content)
+    return record
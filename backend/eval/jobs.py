@@ -0,0 +1,178 @@
+"""Background eval runs.
+
+POST a run and get its id back immediately; a small worker pool executes
+it. Each finished item (trace, golden or pass@k attempt) is checkpointed
+with its events, so a run interrupted by a worker restart resumes where it
+stopped instead of regenerating finished goldens.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from .models import EvalRun
+from .results import get_results, save_results
+from .storage import DATA_DIR, use_sqlite, get_database
+from . import runner
+
+RUNS_DIR = os.path.join(DATA_DIR, 'runs')
+
+logger = logging.getLogger(__name__)
+
+# Runs executed at the same time by this process
+JOB_WORKERS = int(os.environ.get('EVAL_JOB_WORKERS', 2))
+# A running run whose owner has not checkpointed for this long is considered abandoned
+STALE_SECONDS = float(os.environ.get('EVAL_JOB_STALE_SECONDS', 300))
+
+OWNER = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+if use_sqlite():
+    from .sqlite_store import SQLiteRunStore
+    _store = SQLiteRunStore(get_database())
+else:
+    from .json_store import JSONRunStore
+    _store = JSONRunStore(RUNS_DIR)
+
+_lock = threading.Lock()
+_executor = None
+_active = set()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='eval-job')
+        return _executor
+
+
+def submit(kind, config):
+    """Queue a run and return its record. Raises ValueError for an invalid request."""
+    config, total = runner.plan_run(kind, config)
+    run = EvalRun(kind=kind, config=config, total=total).to_dict()
+    _store.put(run)
+    _schedule(run['id'])
+    return run
+
+
+def _schedule(run_id):
+    with _lock:
+        if run_id in _active:
+            return False
+        _active.add(run_id)
+    _get_executor().submit(_execute, run_id)
+    return True
+
+
+def resume(run_id):
+    """Continue an interrupted or failed run from its last checkpoint.
+
+    Returns the run record, or None if it does not exist.
+    """
+    run = _store.get(run_id)
+    if run and run['status'] == 'failed':
+        run.update(status='queued', error=None, finished_at=None)
+        _store.put(run)
+    if run and run['status'] in ('queued', 'running'):
+        _schedule(run_id)
+    return run
+
+
+def resume_abandoned():
+    """Reschedule queued runs and running runs whose owner stopped checkpointing."""
+    stale_before = time.time() - STALE_SECONDS
+    candidates = []
+    for status in ('queued', 'running'):
+        offset = 0
+        while True:
+            runs, total = _store.list(status=status, limit=100, offset=offset)
+            candidates.extend(
+                run['id'] for run in runs
+                if run.get('owner') in (None, OWNER) or (run.get('heartbeat') or 0) < stale_before
+            )
+            offset += len(runs)
+            if not runs or offset >= total:
+                break
+    return [run_id for run_id in candidates if _schedule(run_id)]
+
+
+def get_run(run_id):
+    run = _store.get(run_id)
+    if run:
+        run['active'] = run_id in _active
+    return run
+
+
+def list_runs(status=None, limit=50, offset=0):
+    return _store.list(status=status, limit=limit, offset=offset)
+
+
+def _results(events):
+    return [r for event in events for r in runner.event_results(event)]
+
+
+def _resave_last(run_id, done):
+    """Save the last checkpointed item's results if the worker died before it could.
+
+    Items are checkpointed before their results are saved, so only the most
+    recent one can be missing, and if stored its results are the newest of the run.
+    """
+    results = _results(done[-1]['events']) if done else []
+    if not results:
+        return
+    stored, _ = get_results(run_id=run_id, limit=len(results))
+    last = (results[-1]['grader_name'], results[-1]['timestamp'])
+    if last not in {(r['grader_name'], r['timestamp']) for r in stored}:
+        save_results(results, run_id=run_id)
+
+
+def _fail(run_id, run, error):
+    """Mark a run failed, reloading it when the error came before it was claimed."""
+    try:
+        run = run or _store.get(run_id)
+        if run:
+            run.update(status='failed', error=error, finished_at=_now())
+            _store.put(run)
+    except Exception:
+        logger.exception('Could not mark run %s failed', run_id)
+
+
+def _execute(run_id):
+    run = None
+    try:
+        run = _store.claim(run_id, OWNER, time.time(), time.time() - STALE_SECONDS)
+        if run is None:
+            return  # finished, or another worker holds it
+
+        done = _store.items(run_id)
+        _resave_last(run_id, done)
+        events = [event for item in done for event in item['events']]
+        run.update(status='running', started_at=run['started_at'] or _now(), done=len(done),
+                   error=None, heartbeat=time.time())
+        _store.put(run)
+
+        items = runner.iter_run_items(run['kind'], run['config'], run_id,
+                                      skip={item['key'] for item in done})
+        for key, item_events in items:
+            # Checkpoint first: a resumed run then never re-runs an item whose results are saved
+            _store.add_item(run_id, key, item_events)
+            save_results(_results(item_events), run_id=run_id)
+            events.extend(item_events)
+            run.update(done=run['done'] + 1, heartbeat=time.time())
+            _store.put(run)
+        run.update(status='completed', summary=runner.summarize_run(run['kind'], run['config'], events))
+        run['finished_at'] = _now()
+        _store.put(run)
+    except Exception as e:
+        _fail(run_id, run, str(e))
+    finally:
+        with _lock:
+            _active.discard(run_id)
@@ -0,0 +1,345 @@
+import json
+import os
+import threading
+
+from .interning import blob_key
+from .locking import FileLock, atomic_write
+
+
+class CorruptFileError(RuntimeError):
+    """A store file exists but can't be parsed; refusing to treat it as empty."""
+
+
+class JSONGoldenStore:
+    """Goldens kept as a single JSON list, in insertion order.
+
+    The parsed list is cached with an id map and a tag -> ids inverted
+    index. The cache is dropped when the file's mtime, size or inode
+    changes (a write by another process) and updated in place by writes
+    through this store. Reads return shallow copies.
+
+    Writes hold a cross-process lock from reload to atomic replace, so
+    concurrent workers never lose each other's updates.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._write_lock = FileLock(path + '.lock')
+        self._stat = None
+        self._by_id = {}  # id -> record, in file order
+        self._position = {}  # id -> index in the file
+        self._by_tag = {}  # tag -> set of ids
+
+    def _ensure_file(self):
+        if not os.path.exists(self.path):
+            with self._write_lock:
+                if not os.path.exists(self.path):
+                    atomic_write(self.path, '[]')
+
+    def _file_stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load(self):
+        """Refresh the cache if the file changed since it was read."""
+        self._ensure_file()
+        stat = self._file_stat()
+        if stat == self._stat:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                goldens = json.load(f)
+        except FileNotFoundError:
+            goldens = []
+        except json.JSONDecodeError as e:
+            raise CorruptFileError(f'{self.path} is not valid JSON ({e}); restore it from a backup') from e
+        self._index(goldens)
+        self._stat = stat
+
+    def _index(self, goldens):
+        self._by_id, self._position, self._by_tag = {}, {}, {}
+        for g in goldens:
+            self._add(g)
+
+    def _add(self, record):
+        golden_id = record['id']
+        self._position.setdefault(golden_id, len(self._position))
+        self._by_id[golden_id] = record
+        for tag in record.get('tags', []):
+            self._by_tag.setdefault(tag, set()).add(golden_id)
+
+    def _unindex_tags(self, record):
+        for tag in record.get('tags', []):
+            ids = self._by_tag.get(tag)
+            if ids is not None:
+                ids.discard(record['id'])
+                if not ids:
+                    del self._by_tag[tag]
+
+    def _save(self):
+        atomic_write(self.path, json.dumps(list(self._by_id.values()), indent=2))
+        self._stat = self._file_stat()
+
+    def _copies(self, ids):
+        """Records for ids, in file order."""
+        return [dict(self._by_id[i]) for i in sorted(ids, key=self._position.__getitem__)]
+
+    def list(self, tags=None):
+        with self._lock:
+            self._load()
+            if not tags:
+                return [dict(g) for g in self._by_id.values()]
+            ids = set()
+            for tag in tags:
+                ids.update(self._by_tag.get(tag, ()))
+            return self._copies(ids)
+
+    def get(self, golden_id):
+        with self._lock:
+            self._load()
+            g = self._by_id.get(golden_id)
+            return dict(g) if g is not None else None
+
+    def get_many(self, golden_ids):
+        """Stored goldens among golden_ids, in dataset order."""
+        with self._lock:
+            self._load()
+            return self._copies({i for i in golden_ids if i in self._by_id})
+
+    def _put(self, record):
+        old = self._by_id.get(record['id'])
+        if old is not None:
+            self._unindex_tags(old)
+        self._add(dict(record))
+        self._save()
+
+    def put(self, record):
+        """Insert a golden, or replace it in place if the id exists."""
+        with self._lock, self._write_lock:
+            self._load()
+            self._put(record)
+        return record
+
+    def update(self, golden_id, apply):
+        """Apply apply(record) to a copy of a golden and store it, atomically across processes.
+
+        Returns the updated record, or None if the id doesn't exist.
+        """
+        with self._lock, self._write_lock:
+            self._load()
+            if golden_id not in self._by_id:
+                return None
+            record = dict(self._by_id[golden_id])
+            apply(record)
+            self._put(record)
+        return dict(record)
+
+    def delete(self, golden_id):
+        with self._lock, self._write_lock:
+            self._load()
+            old = self._by_id.pop(golden_id, None)
+            if old is None:
+                return False
+            self._unindex_tags(old)
+            # Later goldens move up one place in the file
+            self._position = {i: n for n, i in enumerate(self._by_id)}
+            self._save()
+        return True
+
+
+class JSONLResultStore:
+    """Eval results appended to a JSONL file, one result per line."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._write_lock = FileLock(path + '.lock')
+        self._by_fingerprint = {}
+        self._indexed_offset = 0
+
+    def append(self, results, run_id=None):
+        lines = ''.join(json.dumps({**r, 'run_id': run_id}) + '\n' for r in results)
+        with self._lock, self._write_lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+    def _iter(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def list(self, run_id=None, trace_id=None, limit=100, offset=0):
+        """Return (results newest first, total count) matching the filters."""
+        matches = [
+            r for r in self._iter()
+            if (not run_id or r.get('run_id') == run_id) and (not trace_id or r.get('trace_id') == trace_id)
+        ]
+        matches.reverse()
+        return matches[offset:offset + limit], len(matches)
+
+    def changes(self, cursor=0):
+        """Results appended since cursor (a byte offset), as (new cursor, results)."""
+        if not os.path.exists(self.path):
+            return 0, []
+        results = []
+        with open(self.path, 'rb') as f:
+            f.seek(cursor)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                cursor += len(line)
+                if line.strip():
+                    results.append(json.loads(line))
+        return cursor, results
+
+    def _index_new_lines(self):
+        """Fold lines appended since the last lookup (by any process) into the fingerprint index."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._indexed_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # partially written; picked up next time
+                self._indexed_offset += len(line)
+                if line.strip():
+                    result = json.loads(line)
+                    if result.get('fingerprint'):
+                        self._by_fingerprint[result['fingerprint']] = result
+
+    def latest_by_fingerprint(self, fingerprints):
+        """Map each known fingerprint to the most recent result stored under it."""
+        with self._lock:
+            self._index_new_lines()
+            return {fp: self._by_fingerprint[fp] for fp in set(fingerprints) if fp in self._by_fingerprint}
+
+
+class JSONRunStore:
+    """One JSON file per eval run, plus an append-only JSONL checkpoint of its finished items."""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._write_lock = FileLock(os.path.join(root, 'runs.lock'))
+
+    def _path(self, run_id, suffix='.json'):
+        return os.path.join(self.root, f'{run_id}{suffix}')
+
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return None
+
+    def put(self, record):
+        atomic_write(self._path(record['id']), json.dumps(record, indent=2))
+        return record
+
+    def get(self, run_id):
+        return self._read(self._path(run_id))
+
+    def list(self, status=None, limit=50, offset=0):
+        """Return (runs newest first, total count)."""
+        if not os.path.isdir(self.root):
+            return [], 0
+        runs = [
+            run for run in (self._read(os.path.join(self.root, name)) for name in os.listdir(self.root)
+                            if name.endswith('.json'))
+            if run and (not status or run['status'] == status)
+        ]
+        runs.sort(key=lambda r: r['created_at'], reverse=True)
+        return runs[offset:offset + limit], len(runs)
+
+    def claim(self, run_id, owner, now, stale_before):
+        """Take ownership of an unfinished run that nobody else is actively working on."""
+        with self._lock, self._write_lock:
+            run = self.get(run_id)
+            if not run or run['status'] not in ('queued', 'running'):
+                return None
+            if run.get('owner') not in (None, owner) and (run.get('heartbeat') or 0) >= stale_before:
+                return None
+            run.update(owner=owner, heartbeat=now)
+            return self.put(run)
+
+    def add_item(self, run_id, key, events):
+        line = json.dumps({'key': key, 'events': events}) + '\n'
+        with self._lock, self._write_lock, open(self._path(run_id, '.items.jsonl'), 'a') as f:
+            f.write(line)
+
+    def items(self, run_id):
+        items = {}
+        try:
+            with open(self._path(run_id, '.items.jsonl'), 'r') as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write from an interrupted worker
+                    items[item['key']] = item
+        except FileNotFoundError:
+            pass
+        return list(items.values())
+
+
+class JSONLBlobStore:
+    """Content-addressed strings in an append-only JSONL file.
+
+    Blobs never change, so each process keeps them all in memory and
+    rereads the file's tail only on a miss (e.g. a blob another process
+    just wrote).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._write_lock = FileLock(path + '.lock')
+        self._blobs = {}
+        self._pos = 0
+
+    def _refresh(self):
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._pos)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._pos += len(line)
+                entry = json.loads(line)
+                self._blobs[entry['key']] = entry['text']
+
+    def add_many(self, texts):
+        """Store the texts not stored yet; returns the key of every text, in order."""
+        keys = [blob_key(text) for text in texts]
+        with self._lock:
+            missing = {key: text for key, text in zip(keys, texts) if key not in self._blobs}
+            if missing:
+                self._refresh()
+                missing = {key: text for key, text in missing.items() if key not in self._blobs}
+            if missing:
+                data = ''.join(json.dumps({'key': key, 'text': text}) + '\n' for key, text in missing.items())
+                with self._write_lock, open(self.path, 'ab') as f:
+                    f.write(data.encode('utf-8'))
+                self._blobs.update(missing)
+        return keys
+
+    def get(self, key):
+        with self._lock:
+            text = self._blobs.get(key)
+            if text is None:
+                self._refresh()
+                text = self._blobs.get(key)
+        return text
+
+    def iter_blobs(self):
+        """Yield every (key, text) pair."""
+        with self._lock:
+            self._refresh()
+            blobs = list(self._blobs.items())
+        yield from blobs
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from .sqlite_store import Database
+from .storage import DATA_DIR
+
+JUDGE_CACHE_PATH = os.environ.get('JUDGE_CACHE_PATH') or os.path.join(DATA_DIR, 'judge_cache.db')
+JUDGE_CACHE_MAX_ENTRIES = int(os.environ.get('JUDGE_CACHE_MAX_ENTRIES', 10000))
+JUDGE_CACHE_ENABLED = os.environ.get('JUDGE_CACHE_ENABLED', '1') != '0'
+# Entries evicted at once when the cap is passed, so puts don't scan the table every time
+EVICT_BATCH = max(1, JUDGE_CACHE_MAX_ENTRIES // 10)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS judge_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_judge_cache_last_used ON judge_cache(last_used);
+"""
+
+_db = None
+_lock = threading.Lock()  # guards _counters and _entries
+_counters = {'hits': 0, 'misses': 0}
+_entries = None  # row count, read on the first insert and after each eviction, then tracked
+
+
+def _conn():
+    global _db
+    if _db is None:
+        _db = Database(JUDGE_CACHE_PATH, schema=SCHEMA)
+    return _db.connect()
+
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def make_key(**parts):
+    """Content hash of everything that can change a judge verdict."""
+    return hashlib.sha256(canonical_json(parts).encode('utf-8')).hexdigest()
+
+
+def get(key):
+    """Return the cached verdict for key (refreshing its LRU position), or None."""
+    if not JUDGE_CACHE_ENABLED:
+        return None
+    conn = _conn()
+    row = conn.execute('SELECT value FROM judge_cache WHERE key = ?', (key,)).fetchone()
+    with _lock:
+        _counters['misses' if row is None else 'hits'] += 1
+    if row is None:
+        return None
+    with conn:
+        conn.execute('UPDATE judge_cache SET last_used = ? WHERE key = ?', (time.time(), key))
+    return json.loads(row['value'])
+
+
+def put(key, value):
+    """Store a verdict; once past the size cap, evict a batch of least recently used entries."""
+    global _entries
+    if not JUDGE_CACHE_ENABLED:
+        return
+    conn = _conn()
+    value, now = json.dumps(value), time.time()
+    with conn:
+        added = conn.execute('INSERT OR IGNORE INTO judge_cache (key, value, last_used) VALUES (?, ?, ?)',
+                             (key, value, now)).rowcount
+        if not added:
+            conn.execute('UPDATE judge_cache SET value = ?, last_used = ? WHERE key = ?', (value, now, key))
+            return
+    with _lock:
+        _entries = _count_entries(conn) if _entries is None else _entries + 1
+        if _entries <= JUDGE_CACHE_MAX_ENTRIES:
+            return
+        with conn:
+            conn.execute(
+                'DELETE FROM judge_cache WHERE key IN (SELECT key FROM judge_cache ORDER BY last_used LIMIT ?)',
+                (_entries - max(JUDGE_CACHE_MAX_ENTRIES - EVICT_BATCH, 0),)
+            )
+        # Other processes may share the cache file, so re-read rather than trust the tally
+        _entries = _count_entries(conn)
+
+
+def _count_entries(conn):
+    return conn.execute('SELECT COUNT(*) FROM judge_cache').fetchone()[0]
+
+
+def stats():
+    conn = _conn()
+    with _lock:
+        counters = dict(_counters)
+    return {
+        'enabled': JUDGE_CACHE_ENABLED,
+        'entries': _count_entries(conn),
+        'max_entries': JUDGE_CACHE_MAX_ENTRIES,
+        **counters
+    }
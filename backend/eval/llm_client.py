@@ -0,0 +1,211 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .rate_limiter import RateLimiter
+from . import replay
+
+GROQ_CHAT_URL = os.environ.get('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+DEFAULT_MODEL = 'llama-3.3-70b-versatile'
+
+CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', 60))
+MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 3))
+BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', 0.5))
+BACKOFF_MAX = float(os.environ.get('LLM_BACKOFF_MAX', 30))
+POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 10))
+MAX_SESSIONS = 32
+
+# Per-API-key quotas; 0 disables the limit
+GROQ_RPM = int(os.environ.get('GROQ_RPM', 0))
+GROQ_TPM = int(os.environ.get('GROQ_TPM', 0))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def _get_client(api_key):
+    """Return (keep-alive session, rate limiter) for this API key (LRU-capped)."""
+    with _sessions_lock:
+        client = _sessions.get(api_key)
+        if client is not None:
+            _sessions.move_to_end(api_key)
+            return client
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        })
+        client = (session, RateLimiter(GROQ_RPM, GROQ_TPM))
+        _sessions[api_key] = client
+        while len(_sessions) > MAX_SESSIONS:
+            _, (evicted, _) = _sessions.popitem(last=False)
+            evicted.close()
+        return client
+
+
+def _estimate_tokens(messages, max_tokens):
+    """Upper bound on tokens a request can consume (~4 characters per prompt token)."""
+    return sum(len(m.get('content') or '') for m in messages) // 4 + max_tokens
+
+
+def _retry_delay(attempt, response=None):
+    """Seconds to wait before the next attempt: retry-after if given, else jittered backoff."""
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0), BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def chat_completion(api_key, messages, temperature, max_tokens, model=DEFAULT_MODEL, json_mode=True):
+    """POST a Groq chat completion, retrying 429/5xx responses and connection errors.
+
+    Returns the final requests.Response; callers check the status as before.
+    Raises requests.RequestException if every attempt failed to connect.
+    Honours LLM_REPLAY_MODE (see eval.replay) for offline record/replay.
+    """
+    payload = {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }
+    if json_mode:
+        payload['response_format'] = {'type': 'json_object'}
+
+    if replay.REPLAY_MODE == 'replay':
+        return replay.load(replay.request_key(payload), GROQ_CHAT_URL)
+
+    estimated = _estimate_tokens(messages, max_tokens)
+    response, _ = _send(api_key, payload, estimated)
+    return response
+
+
+def chat_completion_stream(api_key, messages, temperature, max_tokens, model=DEFAULT_MODEL, json_mode=True):
+    """Streamed chat_completion: returns (response, chunks).
+
+    Retries happen before anything is streamed, so response is final; check
+    its status as with chat_completion. For a 200, chunks yields the parsed
+    stream chunks as they arrive (see completion_from_chunks).
+    """
+    payload = {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'stream': True
+    }
+    if json_mode:
+        payload['response_format'] = {'type': 'json_object'}
+
+    if replay.REPLAY_MODE == 'replay':
+        response, limiter, estimated = replay.load(replay.request_key(payload), GROQ_CHAT_URL), None, 0
+    else:
+        estimated = _estimate_tokens(messages, max_tokens)
+        response, limiter = _send(api_key, payload, estimated, stream=True)
+    if response.status_code != 200:
+        return response, iter(())
+    return response, _iter_chunks(response, limiter, estimated)
+
+
+def _send(api_key, payload, estimated, stream=False):
+    """POST payload with retries; returns (final response, the key's rate limiter)."""
+    session, limiter = _get_client(api_key)
+    for attempt in range(MAX_RETRIES + 1):
+        last_attempt = attempt == MAX_RETRIES
+        limiter.acquire(estimated)
+        try:
+            response = session.post(GROQ_CHAT_URL, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                                     stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            limiter.reconcile(estimated, 0)
+            if last_attempt:
+                raise
+            time.sleep(_retry_delay(attempt))
+            continue
+        if not (stream and response.status_code == 200):
+            # A streamed body reports its usage at the end (see _iter_chunks)
+            limiter.reconcile(estimated, _used_tokens(response))
+        if response.status_code not in RETRY_STATUSES or last_attempt:
+            if replay.REPLAY_MODE == 'record':
+                # Reads a streamed body to the end, so recording gives up incremental delivery
+                replay.record(replay.request_key(payload), payload, response)
+            return response, limiter
+        response.close()
+        time.sleep(_retry_delay(attempt, response))
+
+
+def _iter_chunks(response, limiter, estimated):
+    usage = None
+    try:
+        for line in response.iter_lines():
+            if not line.startswith(b'data:'):
+                continue
+            data = line[len(b'data:'):].strip()
+            if data == b'[DONE]':
+                break
+            chunk = json.loads(data)
+            usage = _chunk_usage(chunk) or usage
+            yield chunk
+    finally:
+        response.close()
+        if limiter is not None:
+            limiter.reconcile(estimated, (usage or {}).get('total_tokens'))
+
+
+def _chunk_usage(chunk):
+    # OpenAI-style streams put usage on the last chunk; Groq nests it under x_groq
+    return chunk.get('usage') or (chunk.get('x_groq') or {}).get('usage')
+
+
+def chunk_content(chunk):
+    """Text delta carried by one stream chunk."""
+    choices = chunk.get('choices') or [{}]
+    return (choices[0].get('delta') or {}).get('content') or ''
+
+
+def completion_from_chunks(chunks):
+    """Rebuild the non-streamed response body from a completion's stream chunks."""
+    first = chunks[0] if chunks else {}
+    finish_reason = next((c['choices'][0].get('finish_reason') for c in reversed(chunks)
+                          if c.get('choices') and c['choices'][0].get('finish_reason')), None)
+    return {
+        'id': first.get('id'),
+        'object': 'chat.completion',
+        'created': first.get('created'),
+        'model': first.get('model'),
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(map(chunk_content, chunks))},
+                     'finish_reason': finish_reason}],
+        'usage': next(filter(None, map(_chunk_usage, reversed(chunks))), None)
+    }
+
+
+def _used_tokens(response):
+    if response.status_code != 200:
+        return 0
+    try:
+        return (usage_from_response(response.json()) or {}).get('total_tokens')
+    except ValueError:
+        return None
+
+
+def usage_from_response(response_data):
+    """Token usage block from a chat completion response, if present."""
+    if not isinstance(response_data, dict):
+        return None
+    return response_data.get('usage')
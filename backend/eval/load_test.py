@@ -0,0 +1,127 @@
+"""Offline load test of the generate -> parse -> save -> grade pipeline.
+
+Starts the Groq stub server in-process (or uses LLM_REPLAY_MODE=replay
+cassettes with --replay), sends generation requests through the Flask app,
+then grades the captured traces and optionally runs the golden eval:
+
+    python -m eval.load_test --requests 200 --concurrency 8 --latency-ms 300
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROMPTS = [
+    'Send a Slack message every morning at 9am',
+    'When a webhook fires, filter for high priority items and send an email alert',
+    'Every hour fetch the orders API and notify #ops on Slack if anything failed',
+    'Handle customer support tickets with categorization, resolution lookup, and notification',
+    'Wait 10 minutes after a signup, then send a welcome email',
+]
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _latency_summary(values):
+    return {
+        'count': len(values),
+        'p50_ms': _percentile(values, 50),
+        'p90_ms': _percentile(values, 90),
+        'p99_ms': _percentile(values, 99),
+        'max_ms': max(values) if values else 0,
+    }
+
+
+def _start_stub(args):
+    from werkzeug.serving import make_server
+    from .stub_server import create_app
+    server = make_server('127.0.0.1', 0, create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.seed),
+                         threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/openai/v1/chat/completions'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--graders', default='schema,intent')
+    parser.add_argument('--goldens', action='store_true', help='also run the golden eval')
+    parser.add_argument('--replay', action='store_true', help='serve recorded cassettes instead of the stub')
+    parser.add_argument('--keep-data', action='store_true', help='keep the temporary data directory')
+    args = parser.parse_args()
+
+    # Isolate all stores in a scratch data dir, seeded with the repo goldens
+    data_dir = tempfile.mkdtemp(prefix='eval-load-')
+    repo_goldens = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'goldens.json')
+    shutil.copy(repo_goldens, os.path.join(data_dir, 'goldens.json'))
+    os.environ['EVAL_DATA_DIR'] = data_dir
+    os.environ.setdefault('GROQ_API_KEY', 'stub')
+    if args.replay:
+        os.environ['LLM_REPLAY_MODE'] = 'replay'
+
+    from . import llm_client
+    server = None
+    if not args.replay:
+        server, llm_client.GROQ_CHAT_URL = _start_stub(args)
+
+    from app import app
+    from . import runner
+    from .trace_writer import get_writer
+    client = app.test_client()
+
+    def generate(i):
+        start = time.perf_counter()
+        response = client.post('/api/generate-workflow', json={'message': PROMPTS[i % len(PROMPTS)], 'apiKey': 'stub'})
+        return response.status_code, int((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(generate, range(args.requests)))
+    generate_seconds = time.perf_counter() - started
+    get_writer().flush()
+
+    graders = [g for g in args.graders.split(',') if g]
+    started = time.perf_counter()
+    graded = runner.run_eval(graders, limit=args.requests, concurrency=args.concurrency)
+    grade_seconds = time.perf_counter() - started
+
+    report = {
+        'generate': {
+            **_latency_summary([ms for status, ms in outcomes if status == 200]),
+            'errors': sum(1 for status, _ in outcomes if status != 200),
+            'throughput_rps': round(args.requests / generate_seconds, 1) if generate_seconds else None,
+        },
+        'trace_writer': get_writer().metrics(),
+        'grade': {'seconds': round(grade_seconds, 2), 'summary': graded['summary']},
+    }
+    if args.goldens:
+        started = time.perf_counter()
+        golden_run = runner.run_golden_eval(graders, concurrency=args.concurrency)
+        report['golden_eval'] = {'seconds': round(time.perf_counter() - started, 2),
+                                 'summary': golden_run.get('summary', golden_run)}
+
+    print(json.dumps(report, indent=2))
+    if server is not None:
+        server.shutdown()
+    if args.keep_data:
+        print(f'Data kept in {data_dir}')
+    else:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Cross-process file locks and atomic file replacement for the file-backed stores.
+
+Several gunicorn workers may share backend/data/: every read-modify-write
+and every append goes through a FileLock on a sidecar .lock file, and
+whole-file rewrites go to a temp file that is fsynced and renamed over the
+original, so readers see either the old or the new file, never a torn one.
+"""
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only serialize threads of this process
+    fcntl = None
+
+
+class FileLock:
+    """flock on a lock file, re-entrant within a thread.
+
+    shared=True takes a shared lock: any number of shared holders, or one
+    exclusive holder. Each FileLock opens its own descriptor, so two
+    instances on the same path also exclude each other within a process.
+    """
+
+    def __init__(self, path, shared=False):
+        self.path = path
+        self.shared = shared
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            os.close(self._fd)  # releases the flock
+            self._fd = None
+        self._thread_lock.release()
+
+
+def atomic_write(path, data):
+    """Replace path with data (str or bytes) via an fsynced temp file in the same directory."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode('utf-8') if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -37,6 +37,7 @@ class Trace:
     parse_success: bool
     latency_ms: int
     error: Optional[str] = None
+    usage: Optional[dict] = None
     id: str = field(default_factory=_new_id)
     timestamp: str = field(default_factory=_now)
     annotations: list = field(default_factory=list)
@@ -58,6 +59,7 @@ class GoldenExample:
     expected_workflow: dict
     tags: list = field(default_factory=list)
     notes: str = ""
+    source_trace_id: Optional[str] = None
     id: str = field(default_factory=_new_id)
 
     def to_dict(self):
@@ -84,3 +86,27 @@ class EvalResult:
     @classmethod
     def from_dict(cls, d):
         return cls(**d)
+
+
+@dataclass
+class EvalRun:
+    kind: str  # "eval" | "golden" | "pass_at_k" | "compare"
+    config: dict
+    total: int = 0
+    done: int = 0
+    status: str = "queued"  # "queued" | "running" | "completed" | "failed"
+    summary: Optional[dict] = None
+    error: Optional[str] = None
+    owner: Optional[str] = None
+    heartbeat: Optional[float] = None
+    id: str = field(default_factory=_new_id)
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**d)
@@ -0,0 +1,135 @@
+"""Micro-benchmark and fuzz corpus for workflow extraction.
+
+Builds model-output variants around the golden workflows (prose, code
+fences, stray braces, several objects, truncation at random points, no
+JSON at all) and reports the success rate and per-call cost of
+workflow_parser.extract_workflow next to the old greedy-regex parser:
+
+    python -m eval.parser_bench --variants 200 --repeat 5
+    python -m eval.parser_bench --dump corpus.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from .workflow_parser import extract_workflow, looks_like_workflow
+
+GOLDENS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'goldens.json')
+
+FALLBACK_WORKFLOW = {
+    'name': 'Daily digest',
+    'trigger': {'type': 'schedule', 'config': {'cron': '0 9 * * *'}},
+    'steps': [{'id': 'step_1', 'type': 'slack_message', 'name': 'Post digest', 'config': {'channel': '#general'}}],
+}
+
+
+def regex_parse(content):
+    """The previous parser: greedy regex from the first '{' to the last '}', then json.loads."""
+    match = re.search(r'\{[\s\S]*\}', content)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+
+
+def _workflows():
+    try:
+        with open(GOLDENS_FILE) as f:
+            workflows = [g['expected_workflow'] for g in json.load(f) if g.get('expected_workflow')]
+    except (OSError, json.JSONDecodeError):
+        workflows = []
+    return workflows or [FALLBACK_WORKFLOW]
+
+
+def _case(kind, content, expect, workflow=None):
+    return {'kind': kind, 'content': content, 'expect': expect, 'workflow': workflow}
+
+
+def build_corpus(variants=100, seed=0):
+    """Fuzz cases: {'kind', 'content', 'expect': 'exact'|'workflow'|'none', 'workflow'}."""
+    rng = random.Random(seed)
+    workflows = _workflows()
+    cases = []
+    for _ in range(variants):
+        workflow = rng.choice(workflows)
+        other = rng.choice(workflows)
+        compact = json.dumps(workflow)
+        pretty = json.dumps(workflow, indent=2)
+        text = rng.choice([compact, pretty])
+        cases += [
+            _case('clean', text, 'exact', workflow),
+            _case('fenced', f'```json\n{text}\n```', 'exact', workflow),
+            _case('prose', f'Here is the workflow you asked for:\n\n{text}\n\nLet me know if you need changes.',
+                  'exact', workflow),
+            _case('trailing_brace', f'{text}\n\nNote: use {{channel}} placeholders for the Slack step.',
+                  'exact', workflow),
+            _case('leading_brace', f'Using the {{trigger}} you described:\n{text}', 'exact', workflow),
+            _case('leading_object', f'{{"note": "draft"}}\n{text}', 'exact', workflow),
+            _case('two_workflows', f'{text}\n\nAlternatively:\n{json.dumps(other)}', 'exact', workflow),
+            _case('truncated', text[:rng.randint(len(text) // 2, len(text) - 1)], 'workflow', workflow),
+            _case('no_json', rng.choice(['I cannot help with that.', 'Sorry, {this} is not supported',
+                                          'Error: rate limited']), 'none'),
+        ]
+    return cases
+
+
+def _succeeded(case, parsed):
+    if case['expect'] == 'none':
+        return parsed is None
+    if case['expect'] == 'exact':
+        return parsed == case['workflow']
+    return looks_like_workflow(parsed) and parsed.get('name', case['workflow']['name']) == case['workflow']['name']
+
+
+def _bench(parse, corpus, repeat):
+    by_kind = {}
+    for case in corpus:
+        stats = by_kind.setdefault(case['kind'], {'cases': 0, 'succeeded': 0})
+        stats['cases'] += 1
+        stats['succeeded'] += 1 if _succeeded(case, parse(case['content'])) else 0
+    contents = [case['content'] for case in corpus]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for content in contents:
+            parse(content)
+    elapsed = time.perf_counter() - started
+    cases = len(corpus)
+    succeeded = sum(stats['succeeded'] for stats in by_kind.values())
+    return {
+        'success_rate': round(succeeded / cases, 4),
+        'us_per_call': round(elapsed / (cases * repeat) * 1e6, 2),
+        'by_kind': {kind: round(stats['succeeded'] / stats['cases'], 4) for kind, stats in by_kind.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variants', type=int, default=100, help='cases generated per output variant kind')
+    parser.add_argument('--repeat', type=int, default=5, help='timing passes over the corpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dump', help='write the corpus as JSONL and exit')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.variants, args.seed)
+    if args.dump:
+        with open(args.dump, 'w') as f:
+            for case in corpus:
+                f.write(json.dumps(case) + '\n')
+        print(f'Wrote {len(corpus)} cases to {args.dump}')
+        return
+
+    report = {
+        'cases': len(corpus),
+        'extract_workflow': _bench(lambda content: extract_workflow(content)[0], corpus, args.repeat),
+        'regex': _bench(regex_parse, corpus, args.repeat),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously up to `capacity` per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, amount):
+        """Take `amount` tokens if available; otherwise return seconds to wait."""
+        with self._lock:
+            self._refill()
+            # Requests larger than the whole bucket go through once it is full
+            needed = min(amount, self.capacity)
+            if self._tokens >= needed:
+                self._tokens -= amount
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def give_back(self, amount):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits; a limit of 0 disables it."""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, estimated_tokens=0):
+        """Block until one request and `estimated_tokens` tokens fit in the quotas."""
+        while self.requests is not None:
+            wait = self.requests.try_take(1)
+            if not wait:
+                break
+            time.sleep(wait)
+        while self.tokens is not None:
+            wait = self.tokens.try_take(estimated_tokens)
+            if not wait:
+                break
+            time.sleep(wait)
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        """Return over-reserved tokens once the real usage is known."""
+        if self.tokens is not None and actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.tokens.give_back(estimated_tokens - actual_tokens)
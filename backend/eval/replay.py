@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .locking import FileLock, atomic_write
+from .storage import DATA_DIR
+
+# "off", "record" (store every Groq response) or "replay" (serve stored responses only)
+REPLAY_MODE = os.environ.get('LLM_REPLAY_MODE', 'off').lower()
+CASSETTE_DIR = os.environ.get('LLM_CASSETTE_DIR') or os.path.join(DATA_DIR, 'cassettes')
+
+_KEPT_HEADERS = ('content-type', 'retry-after')
+
+_lock = threading.Lock()
+_record_lock = FileLock(os.path.join(CASSETTE_DIR, '.record.lock'))
+_replayed = {}  # key -> number of times served in this process
+
+
+def request_key(payload):
+    """Stable hash of a chat completion request body (the API key is not part of it)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CASSETTE_DIR, f'{key}.json')
+
+
+def _read(key):
+    try:
+        with open(_path(key), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def record(key, payload, response):
+    """Append a response to the cassette for key; repeated requests keep every response."""
+    with _lock, _record_lock:
+        entry = _read(key) or {'request': payload, 'responses': []}
+        entry['responses'].append({
+            'status_code': response.status_code,
+            'headers': {h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers},
+            'body': response.text
+        })
+        atomic_write(_path(key), json.dumps(entry, indent=2))
+
+
+def load(key, url):
+    """Rebuild a recorded requests.Response for key.
+
+    Repeated requests cycle through the recorded responses in order. Raises
+    requests.ConnectionError when nothing was recorded, so callers fail the
+    same way as when Groq is unreachable.
+    """
+    entry = _read(key)
+    if not entry or not entry['responses']:
+        raise requests.ConnectionError(f'No recorded LLM response for request {key}')
+    with _lock:
+        n = _replayed.get(key, 0)
+        _replayed[key] = n + 1
+    recorded = entry['responses'][n % len(entry['responses'])]
+
+    response = requests.Response()
+    response.status_code = recorded['status_code']
+    response.headers = CaseInsensitiveDict(recorded.get('headers', {}))
+    response._content = recorded['body'].encode('utf-8')
+    response._content_consumed = True  # lets iter_lines() serve a recorded stream
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
@@ -0,0 +1,37 @@
+import os
+import uuid
+from .json_store import JSONLResultStore
+from .storage import DATA_DIR, use_sqlite, get_database
+
+RESULTS_FILE = os.path.join(DATA_DIR, 'results.jsonl')
+
+if use_sqlite():
+    from .sqlite_store import SQLiteResultStore
+    _store = SQLiteResultStore(get_database())
+else:
+    _store = JSONLResultStore(RESULTS_FILE)
+
+
+def new_run_id():
+    return str(uuid.uuid4())
+
+
+def save_results(results, run_id=None):
+    """Persist a batch of EvalResult dicts under a run id."""
+    if results:
+        _store.append(results, run_id=run_id)
+    return run_id
+
+
+def get_results(run_id=None, trace_id=None, limit=100, offset=0):
+    return _store.list(run_id=run_id, trace_id=trace_id, limit=limit, offset=offset)
+
+
+def get_result_changes(cursor=0):
+    """(cursor, results) for results saved since cursor."""
+    return _store.changes(cursor)
+
+
+def get_latest_by_fingerprint(fingerprints):
+    """Most recent stored result for each fingerprint that has one."""
+    return _store.latest_by_fingerprint(fingerprints)
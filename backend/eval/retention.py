@@ -0,0 +1,149 @@
+"""Trace retention.
+
+Traces past the configured age, count or size budget are moved, oldest
+first, to the compressed archive (still readable through get_trace) and the
+live store is compacted once enough of it is garbage. Annotated traces and
+traces promoted to goldens are pinned: they are never expired and do not
+count against the budgets.
+
+Runs every TRACE_RETENTION_INTERVAL_SECONDS in the app process when any
+budget is set, or on demand via POST /api/eval/traces/retention.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from . import traces
+
+# Budgets; 0 disables each one
+MAX_AGE_DAYS = float(os.environ.get('TRACE_RETENTION_MAX_AGE_DAYS', 0))
+MAX_COUNT = int(os.environ.get('TRACE_RETENTION_MAX_COUNT', 0))
+MAX_BYTES = int(os.environ.get('TRACE_RETENTION_MAX_BYTES', 0))
+INTERVAL_SECONDS = float(os.environ.get('TRACE_RETENTION_INTERVAL_SECONDS', 3600))
+# Compact when at least this fraction of the live store's disk space is garbage
+COMPACT_MIN_GARBAGE = float(os.environ.get('TRACE_COMPACT_MIN_GARBAGE', 0.5))
+
+# Goldens promoted before source_trace_id existed only name their trace in the notes
+_PROMOTED_NOTE = re.compile(r'Promoted from trace (\S+)')
+
+logger = logging.getLogger(__name__)
+
+_thread = None
+_run_lock = threading.Lock()
+
+
+def pinned_trace_ids():
+    """Ids of traces promoted to goldens."""
+    from .golden_dataset import get_goldens
+    pinned = set()
+    for golden in get_goldens():
+        if golden.get('source_trace_id'):
+            pinned.add(golden['source_trace_id'])
+        else:
+            match = _PROMOTED_NOTE.search(golden.get('notes') or '')
+            if match:
+                pinned.add(match.group(1))
+    return pinned
+
+
+def _parse_time(timestamp):
+    try:
+        value = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def select_expired(metas, pinned, max_age_days=0, max_count=0, max_bytes=0, now=None):
+    """Ids to expire from (id, timestamp, size, annotated) tuples in storage order, oldest first.
+
+    Age expires every unpinned trace older than the cutoff; count and bytes
+    then expire the oldest remaining unpinned traces until the rest fits.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=max_age_days) if max_age_days else None
+    candidates = []
+    for trace_id, timestamp, size, annotated in metas:
+        if annotated or trace_id in pinned:
+            continue
+        ts = _parse_time(timestamp)
+        candidates.append((ts or now, trace_id, size))
+    # Storage order is write order; sort by timestamp in case traces were imported out of order
+    candidates.sort(key=lambda c: c[0])
+
+    expired = []
+    start = 0
+    if cutoff is not None:
+        while start < len(candidates) and candidates[start][0] < cutoff:
+            expired.append(candidates[start][1])
+            start += 1
+    remaining = candidates[start:]
+    count = len(remaining)
+    size = sum(c[2] for c in remaining)
+    for _, trace_id, trace_size in remaining:
+        if (not max_count or count <= max_count) and (not max_bytes or size <= max_bytes):
+            break
+        expired.append(trace_id)
+        count -= 1
+        size -= trace_size
+    return expired
+
+
+def run(dry_run=False, compact=None, max_age_days=None, max_count=None, max_bytes=None):
+    """Apply the retention budgets once; returns what was (or, for a dry run, would be) done.
+
+    compact=None compacts only past COMPACT_MIN_GARBAGE; True or False forces it.
+    """
+    max_age_days = MAX_AGE_DAYS if max_age_days is None else max_age_days
+    max_count = MAX_COUNT if max_count is None else max_count
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    started = time.perf_counter()
+    with _run_lock:
+        pinned = pinned_trace_ids()
+        metas = list(traces.iter_trace_meta())
+        expired = select_expired(metas, pinned, max_age_days, max_count, max_bytes)
+        summary = {
+            'dry_run': dry_run,
+            'traces': len(metas),
+            'pinned': sum(1 for trace_id, _, _, annotated in metas if annotated or trace_id in pinned),
+            'expired': len(expired),
+            'archived': 0,
+            'compacted': False,
+            'bytes_reclaimed': 0,
+        }
+        if dry_run:
+            summary['expired_ids'] = expired
+        else:
+            summary['archived'] = traces.archive_traces(expired)
+            stats = traces.storage_stats()['live']
+            garbage = stats['garbage_bytes'] / stats['disk_bytes'] if stats['disk_bytes'] else 0
+            if compact or (compact is None and garbage >= COMPACT_MIN_GARBAGE):
+                summary['compacted'] = True
+                summary['bytes_reclaimed'] = traces.compact_traces()
+    summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return summary
+
+
+def _loop():
+    while True:
+        time.sleep(INTERVAL_SECONDS)
+        try:
+            summary = run()
+            if summary['archived'] or summary['compacted']:
+                logger.info('Trace retention: %s', summary)
+        except Exception:
+            logger.exception('Trace retention failed')
+
+
+def start():
+    """Start the periodic retention thread if any budget is configured; returns whether it runs."""
+    global _thread
+    if not (MAX_AGE_DAYS or MAX_COUNT or MAX_BYTES) or INTERVAL_SECONDS <= 0:
+        return False
+    if _thread is None:
+        _thread = threading.Thread(target=_loop, name='trace-retention', daemon=True)
+        _thread.start()
+    return True
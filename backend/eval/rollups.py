@@ -0,0 +1,214 @@
+"""Trace rollups maintained at write time.
+
+Every saved trace updates one bucket per granularity (minute, hour, day)
+and model with its count, errors, parse failures, latency sum/min/max and
+a latency sketch, so dashboards read O(buckets) instead of scanning traces.
+
+The sketch is a sparse log-scale histogram: bucket i holds latencies in
+(GAMMA**(i-1), GAMMA**i] ms. Sketches merge by adding counts, and quantiles
+read from them are within ~2% of the exact value.
+"""
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .locking import FileLock, atomic_write
+
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+# Minute buckets older than this are dropped; hour and day buckets are kept
+MINUTE_RETENTION_SECONDS = float(os.environ.get('ROLLUP_MINUTE_RETENTION_HOURS', 72)) * 3600
+# The file backend rewrites its delta log as a snapshot past this size
+COMPACT_BYTES = int(os.environ.get('ROLLUP_COMPACT_BYTES', 4 * 1024 * 1024))
+
+SKETCH_GAMMA = 1.04
+QUANTILES = (50, 90, 99)
+
+
+def _empty():
+    return {'count': 0, 'errors': 0, 'parse_failures': 0, 'latency_sum': 0,
+            'latency_min': None, 'latency_max': None, 'sketch': {}}
+
+
+def _sketch_index(latency_ms):
+    if latency_ms <= 1:
+        return '0'
+    return str(math.ceil(math.log(latency_ms) / math.log(SKETCH_GAMMA)))
+
+
+def _sketch_quantile(sketch, pct):
+    total = sum(sketch.values())
+    if not total:
+        return None
+    rank = round(pct / 100 * (total - 1))
+    seen = 0
+    for index in sorted(sketch, key=int):
+        seen += sketch[index]
+        if seen > rank:
+            # Midpoint of the bucket in relative terms
+            return round(2 * SKETCH_GAMMA ** int(index) / (SKETCH_GAMMA + 1), 1)
+
+
+def merge(into, bucket):
+    """Add bucket's counters and sketch into `into` (in place) and return it."""
+    for key in ('count', 'errors', 'parse_failures', 'latency_sum'):
+        into[key] += bucket[key]
+    if bucket['latency_min'] is not None:
+        if into['latency_min'] is None or bucket['latency_min'] < into['latency_min']:
+            into['latency_min'] = bucket['latency_min']
+        if into['latency_max'] is None or bucket['latency_max'] > into['latency_max']:
+            into['latency_max'] = bucket['latency_max']
+    for index, count in bucket['sketch'].items():
+        into['sketch'][index] = into['sketch'].get(index, 0) + count
+    return into
+
+
+def _epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def deltas(records):
+    """Bucket updates for a batch of trace records: {(granularity, start, model): bucket}."""
+    updates = {}
+    for record in records:
+        ts = _epoch(record.get('timestamp'))
+        latency = record.get('latency_ms') or 0
+        for granularity, seconds in GRANULARITIES.items():
+            key = (granularity, int(ts // seconds * seconds), record.get('model') or 'unknown')
+            bucket = updates.setdefault(key, _empty())
+            merge(bucket, {
+                'count': 1,
+                'errors': 1 if record.get('error') else 0,
+                'parse_failures': 0 if record.get('parse_success') else 1,
+                'latency_sum': latency,
+                'latency_min': latency,
+                'latency_max': latency,
+                'sketch': {_sketch_index(latency): 1},
+            })
+    return updates
+
+
+def minute_cutoff():
+    return int(time.time() - MINUTE_RETENTION_SECONDS)
+
+
+def summarize(start, bucket, model=None):
+    """API view of a bucket."""
+    count = bucket['count']
+    summary = {'start': datetime.fromtimestamp(start, timezone.utc).isoformat()}
+    if model is not None:
+        summary['model'] = model
+    summary.update({
+        'count': count,
+        'errors': bucket['errors'],
+        'parse_failures': bucket['parse_failures'],
+        'error_rate': round(bucket['errors'] / count, 4) if count else None,
+        'parse_failure_rate': round(bucket['parse_failures'] / count, 4) if count else None,
+        'latency_ms': {
+            'mean': round(bucket['latency_sum'] / count, 1) if count else None,
+            'min': bucket['latency_min'],
+            'max': bucket['latency_max'],
+            **{f'p{p}': _sketch_quantile(bucket['sketch'], p) for p in QUANTILES},
+        },
+    })
+    return summary
+
+
+def query(rows, by_model=True):
+    """Format (start, model, bucket) rows sorted by start; merges models unless by_model."""
+    if by_model:
+        return [summarize(start, bucket, model) for start, model, bucket in rows]
+    merged = {}
+    for start, _, bucket in rows:
+        merge(merged.setdefault(start, _empty()), bucket)
+    return [summarize(start, bucket) for start, bucket in sorted(merged.items())]
+
+
+class FileRollupStore:
+    """Rollup deltas appended to a JSONL log and folded into memory.
+
+    Each write appends one line of bucket deltas; readers (in any process)
+    tail the log. When the log outgrows COMPACT_BYTES it is replaced by a
+    single snapshot line. A missing log is rebuilt from source(), an
+    iterable of every stored trace.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self._lock = threading.Lock()
+        self._write_lock = FileLock(path + '.lock')
+        self._buckets = {}
+        self._pos = 0
+        self._inode = None
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            with self._write_lock:
+                if not os.path.exists(self.path):
+                    self._write_snapshot(deltas(self.source()))
+        self._refresh()
+
+    def _refresh(self):
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode or stat.st_size < self._pos:
+            # Replaced by a compaction: reload from the start
+            self._buckets, self._pos, self._inode = {}, 0, stat.st_ino
+        if stat.st_size == self._pos:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._pos)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._pos += len(line)
+                self._apply(json.loads(line))
+
+    def _apply(self, entry):
+        for granularity, start, model, bucket in entry['buckets']:
+            merge(self._buckets.setdefault((granularity, start, model), _empty()), bucket)
+
+    @staticmethod
+    def _line(updates):
+        return (json.dumps({'buckets': [[*key, bucket] for key, bucket in updates.items()]},
+                           separators=(',', ':')) + '\n').encode('utf-8')
+
+    def _write_snapshot(self, buckets):
+        cutoff = minute_cutoff()
+        kept = {key: bucket for key, bucket in buckets.items() if key[0] != 'minute' or key[1] >= cutoff}
+        atomic_write(self.path, self._line(kept))
+
+    def add(self, records):
+        updates = deltas(records)
+        if not updates:
+            return
+        with self._lock:
+            self._open()
+            line = self._line(updates)
+            with self._write_lock:
+                with open(self.path, 'ab') as f:
+                    f.write(line)
+                # Snapshot under the lock so no other process appends to the file being replaced
+                self._refresh()
+                if self._pos > COMPACT_BYTES:
+                    self._write_snapshot(self._buckets)
+                    self._refresh()
+
+    def rows(self, granularity, since=None, until=None, model=None):
+        """(start, model, bucket) rows for one granularity, oldest first."""
+        with self._lock:
+            self._open()
+            rows = [
+                (start, bucket_model, bucket) for (g, start, bucket_model), bucket in self._buckets.items()
+                if g == granularity and (since is None or start >= since) and (until is None or start < until)
+                and (model is None or bucket_model == model)
+            ]
+        if granularity == 'minute':
+            cutoff = minute_cutoff()
+            rows = [row for row in rows if row[0] >= cutoff]
+        return sorted(rows, key=lambda row: (row[0], row[1]))
@@ -1,11 +1,17 @@
 import os
 import time
 import json
+import hashlib
+import itertools
 import requests
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from .models import Trace, EvalResult
-from .traces import get_traces, get_trace, save_trace, parse_workflow_from_response
-from .golden_dataset import get_goldens, get_golden
-from .graders import schema_grader, intent_grader
+from .traces import get_traces, get_trace, iter_traces, save_trace, parse_workflow_from_response
+from .golden_dataset import get_goldens, get_golden, get_goldens_by_ids
+from .graders import schema_grader, intent_grader, structure_grader
+from . import cascade
+from .results import new_run_id, save_results, get_latest_by_fingerprint
+from .llm_client import chat_completion, usage_from_response, DEFAULT_MODEL
 
 SYSTEM_PROMPT = '''You MUST respond with ONLY valid JSON. No markdown, no code blocks, no explanations.
 
@@ -19,6 +25,16 @@ IMPORTANT: For complex requests with multiple phases, ALWAYS use sub_workflow to
 Every step must have: id (string), type (string), name (string), config (object).
 For sub_workflow steps, include a "steps" array with nested steps.'''
 
+SYSTEM_PROMPT_HASH = hashlib.sha256(SYSTEM_PROMPT.encode('utf-8')).hexdigest()
+
+
+# Max goldens/traces processed in parallel by the eval runners
+EVAL_CONCURRENCY = int(os.environ.get('EVAL_CONCURRENCY', 4))
+# Workflows packed into one LLM judge request by run_eval / run_golden_eval (1 = unbatched)
+JUDGE_BATCH_SIZE = int(os.environ.get('JUDGE_BATCH_SIZE', 1))
+# Stored traces read, schema-graded and saved together by run_schema_bulk
+SCHEMA_BULK_CHUNK = int(os.environ.get('SCHEMA_BULK_CHUNK', 5000))
+
 
 def _get_api_key():
     return os.environ.get('GROQ_API_KEY')
@@ -31,22 +47,14 @@ def _generate_workflow(user_message, api_key, temperature=0.5):
     response_data = None
 
     try:
-        response = requests.post(
-            'https://api.groq.com/openai/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama-3.3-70b-versatile',
-                'messages': [
-                    {'role': 'system', 'content': SYSTEM_PROMPT},
-                    {'role': 'user', 'content': user_message}
-                ],
-                'response_format': {'type': 'json_object'},
-                'temperature': temperature,
-                'max_tokens': 2000
-            }
+        response = chat_completion(
+            api_key,
+            messages=[
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': user_message}
+            ],
+            temperature=temperature,
+            max_tokens=2000
         )
         response.raise_for_status()
         response_data = response.json()
@@ -68,7 +76,8 @@ def _generate_workflow(user_message, api_key, temperature=0.5):
         parsed_workflow=parsed_workflow,
         parse_success=parse_success,
         latency_ms=latency_ms,
-        error=error
+        error=error,
+        usage=usage_from_response(response_data)
     )
 
     return trace
@@ -94,171 +103,672 @@ def run_grader(grader_name, trace_data, golden_data=None):
             golden_workflow=golden_data.get('expected_workflow') if golden_data else None,
             golden_id=golden_data['id'] if golden_data else None
         )
+    elif grader_name == 'structure':
+        return structure_grader.grade(
+            trace_id=trace_data['id'],
+            workflow=workflow,
+            golden_workflow=golden_data.get('expected_workflow') if golden_data else None,
+            golden_id=golden_data['id'] if golden_data else None
+        )
     else:
         return EvalResult(
             trace_id=trace_data['id'],
             grader_name=grader_name,
             passed=False,
             score=0.0,
-            details={'error': f'Unknown grader: {grader_name}'}
+            details={'error': f'Unknown grader: {grader_name}'},
+            golden_id=golden_data['id'] if golden_data else None
         )
 
 
-def run_eval(graders, limit=50):
-    """Run specified graders against recent traces."""
-    traces, total = get_traces(limit=limit)
-    results = []
+def _grader_version(grader_name):
+    if grader_name == 'schema':
+        return schema_grader.VERSION
+    elif grader_name == 'intent':
+        return [intent_grader.VERSION, intent_grader.JUDGE_MODEL]
+    elif grader_name == 'structure':
+        return structure_grader.VERSION
+    return None
+
+
+def _fingerprint(grader_name, trace_data, golden_data=None, rules=()):
+    """Hash of everything an eval result depends on, so incremental runs can reuse it.
+
+    Golden evals generate a fresh trace every time, so the generation inputs
+    (golden content, system prompt, model) stand in for the trace. Intent
+    verdicts also depend on the cascade rules (and the graders they consult),
+    so changing the rules sends stored verdicts back to the judge.
+    """
+    if golden_data:
+        subject = {
+            'golden': {'user_message': golden_data['user_message'],
+                       'expected_workflow': golden_data.get('expected_workflow')},
+            'system_prompt': SYSTEM_PROMPT_HASH,
+            'model': DEFAULT_MODEL
+        }
+    else:
+        subject = {
+            'trace_id': trace_data['id'],
+            'user_message': trace_data.get('user_message'),
+            'workflow': trace_data.get('parsed_workflow'),
+            'system_prompt': hashlib.sha256((trace_data.get('system_prompt') or '').encode('utf-8')).hexdigest()
+        }
+    basis = {**subject, 'grader': grader_name, 'version': _grader_version(grader_name)}
+    if grader_name == 'intent' and rules:
+        basis['cascade'] = [list(rules), _grader_version('schema'), _grader_version('structure')]
+    return hashlib.sha256(json.dumps(basis, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def _fingerprinted(result, grader_name, trace_data, golden_data=None, rules=()):
+    """Attach a fingerprint to results that are safe to reuse (not caused by a failed LLM call)."""
+    failed_call = 'error' in result['details'] or (golden_data and trace_data.get('error'))
+    if not failed_call:
+        result['fingerprint'] = _fingerprint(grader_name, trace_data, golden_data, rules)
+    return result
+
+
+def _split_reusable(indexed_items, fingerprint_for, graders):
+    """Split (index, item) pairs into stored (index, result) pairs to reuse and pairs still to grade.
+
+    An item is reused only when every grader has a stored result with a
+    matching fingerprint.
+    """
+    fingerprints = {index: [fingerprint_for(item, g) for g in graders] for index, item in indexed_items}
+    stored = get_latest_by_fingerprint([fp for fps in fingerprints.values() for fp in fps])
+    reused, pending = [], []
+    for index, item in indexed_items:
+        if all(fp in stored for fp in fingerprints[index]):
+            for fp in fingerprints[index]:
+                result = dict(stored[fp])
+                original_run = result.pop('run_id', None)
+                result.setdefault('reused_from', original_run)
+                reused.append((index, result))
+        else:
+            pending.append((index, item))
+    return reused, pending
+
+
+def _map_concurrent(fn, items, concurrency=None):
+    """Apply fn to each item on a bounded thread pool, returning results in input order."""
+    items = list(items)
+    workers = min(concurrency or EVAL_CONCURRENCY, len(items))
+    if workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fn, items))
+
+
+def _iter_concurrent(fn, items, concurrency=None):
+    """Apply fn to each item on a bounded thread pool, yielding (index, result) as each finishes."""
+    items = list(items)
+    workers = min(concurrency or EVAL_CONCURRENCY, len(items))
+    if workers <= 1:
+        for index, item in enumerate(items):
+            yield index, fn(item)
+        return
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(fn, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # Stop queued work if the consumer (e.g. a streaming client) goes away
+        executor.shutdown(wait=True, cancel_futures=True)
 
-    for trace_data in traces:
-        for grader_name in graders:
-            result = run_grader(grader_name, trace_data)
-            results.append(result.to_dict())
 
-    summary = _compute_summary(results, graders)
-    return {'results': results, 'summary': summary}
+def _generate_and_save(user_message, api_key, temperature=0.5):
+    trace = _generate_workflow(user_message, api_key, temperature=temperature)
+    return save_trace(trace).to_dict()
 
 
-def run_golden_eval(graders, golden_ids=None):
-    """Re-generate workflows for goldens and grade against expected."""
+def _run_intent_batch(pairs):
+    return intent_grader.grade_batch(
+        [{
+            'trace_id': trace_data['id'],
+            'user_message': trace_data['user_message'],
+            'workflow': trace_data.get('parsed_workflow'),
+            'golden_workflow': golden_data.get('expected_workflow') if golden_data else None,
+            'golden_id': golden_data['id'] if golden_data else None
+        } for trace_data, golden_data in pairs],
+        api_key=_get_api_key()
+    )
+
+
+def _grade_pairs(pairs, graders, judge_batch_size=1, rules=()):
+    """Grade (trace, golden) pairs; returns a flat list of result dicts in pair, then grader, order.
+
+    The deterministic graders run first; cascade rules (see cascade.py)
+    then settle the intent verdict of some pairs without the LLM judge.
+    With a judge batch size above 1 the intent grader packs the remaining
+    pairs into one judge request instead of one request per trace.
+    """
+    graded = [{g: run_grader(g, trace_data, golden_data) for g in graders if g != 'intent'}
+              for trace_data, golden_data in pairs]
+    if 'intent' in graders:
+        to_judge = []
+        for index, ((trace_data, golden_data), by_grader) in enumerate(zip(pairs, graded)):
+            decision = cascade.decide(rules, trace_data, golden_data, by_grader) if rules else None
+            if decision:
+                golden_id = golden_data['id'] if golden_data else None
+                by_grader['intent'] = cascade.skipped_result(trace_data['id'], golden_id, *decision)
+            else:
+                to_judge.append(index)
+        judge_pairs = [pairs[index] for index in to_judge]
+        if judge_batch_size > 1 and judge_pairs:
+            verdicts = _run_intent_batch(judge_pairs)
+        else:
+            verdicts = [run_grader('intent', trace_data, golden_data) for trace_data, golden_data in judge_pairs]
+        for index, verdict in zip(to_judge, verdicts):
+            graded[index]['intent'] = verdict
+
+    return [
+        _fingerprinted(by_grader[g].to_dict(), g, trace_data, golden_data, rules)
+        for (trace_data, golden_data), by_grader in zip(pairs, graded) for g in graders
+    ]
+
+
+def _pending(items, key, skip=None):
+    """(index, item) pairs for items whose key is not in skip; indexes stay those of the full list."""
+    skip = skip or ()
+    return [(index, item) for index, item in enumerate(items) if key(item) not in skip]
+
+
+def _iter_graded(indexed_items, make_pair, graders, concurrency=None, judge_batch_size=None, rules=()):
+    """Grade (index, item) pairs on the worker pool, yielding (item index, result) as results complete.
+
+    make_pair(item) returns the (trace, golden) pair to grade, generating a
+    trace if needed. Items are processed in chunks of the judge batch size
+    so each chunk needs at most one intent judge request.
+    """
+    indexed_items = list(indexed_items)
+    size = judge_batch_size or JUDGE_BATCH_SIZE
+    size = size if 'intent' in graders and size > 1 else 1
+    chunks = [indexed_items[i:i + size] for i in range(0, len(indexed_items), size)]
+
+    def grade_chunk(chunk):
+        return _grade_pairs([make_pair(item) for _, item in chunk], graders, judge_batch_size=size, rules=rules)
+
+    for chunk_index, results in _iter_concurrent(grade_chunk, chunks, concurrency):
+        chunk = chunks[chunk_index]
+        for position, result in enumerate(results):
+            yield chunk[position // len(graders)][0], result
+
+
+def _filter_goldens(golden_ids):
+    if golden_ids:
+        return get_goldens_by_ids(golden_ids)
+    return get_goldens()
+
+
+def _collect_results(events):
+    """Drain a result event stream; returns (results in item order, summary event)."""
+    indexed, final = [], None
+    for event in events:
+        if event['event'] == 'result':
+            indexed.append((event['index'], event['result']))
+        elif event['event'] in ('summary', 'error'):
+            final = event
+    indexed.sort(key=lambda pair: pair[0])  # stable: keeps grader order within an item
+    return [result for _, result in indexed], final
+
+
+def _iter_results(indexed_results, graders, run_id=None, persist=True, flush_every=50, rules=()):
+    """Turn (index, result) pairs into result events plus a final summary event.
+
+    Results are persisted in small batches as they arrive so memory stays
+    flat however large the run is. Background jobs pass persist=False and
+    save results themselves as each item is checkpointed.
+    """
+    run_id = run_id or new_run_id()
+    summary = SummaryAccumulator(graders, rules)
+    pending = []
+    for index, result in indexed_results:
+        summary.add(result)
+        pending.append(result)
+        if persist and len(pending) >= flush_every:
+            save_results(pending, run_id=run_id)
+            pending = []
+        yield {'event': 'result', 'index': index, 'result': result}
+    if persist:
+        save_results(pending, run_id=run_id)
+    yield {'event': 'summary', 'run_id': run_id, 'summary': summary.result()}
+
+
+def iter_eval(graders, limit=50, concurrency=None, judge_batch_size=None, incremental=False,
+              trace_ids=None, skip=None, run_id=None, persist=True, cascade_rules=None):
+    """Streaming run_eval: yields a result event per EvalResult as it completes, then a summary event.
+
+    trace_ids pins the traces to grade instead of the latest `limit`; skip
+    holds trace ids that are already graded. With incremental=True, traces
+    whose stored results still match their fingerprint are not re-graded.
+    cascade_rules is a cascade spec (see cascade.parse_rules; None for the
+    default rules).
+    """
+    rules = cascade.parse_rules(cascade_rules)
+    if trace_ids is not None:
+        traces = [t for t in (get_trace(trace_id) for trace_id in trace_ids) if t]
+    else:
+        traces, total = get_traces(limit=limit)
+    pending = _pending(traces, lambda t: t['id'], skip)
+    reused = []
+    if incremental:
+        reused, pending = _split_reusable(pending, lambda t, g: _fingerprint(g, t, rules=rules), graders)
+    graded = _iter_graded(pending, lambda t: (t, None), graders, concurrency, judge_batch_size, rules)
+    yield from _iter_results(itertools.chain(reused, graded), graders, run_id=run_id, persist=persist, rules=rules)
+
+
+def run_eval(graders, limit=50, concurrency=None, judge_batch_size=None, incremental=False, cascade_rules=None):
+    """Run specified graders against recent traces."""
+    results, final = _collect_results(iter_eval(graders, limit, concurrency, judge_batch_size, incremental,
+                                                cascade_rules=cascade_rules))
+    summary = _compute_summary(results, graders, cascade.parse_rules(cascade_rules))
+    return {'run_id': final['run_id'], 'results': results, 'summary': summary}
+
+
+def _chunked(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_schema_bulk(trace_ids=None, workers=None, persist=True):
+    """Schema-grade stored traces in bulk: all of them, or just trace_ids.
+
+    Traces stream from the store in chunks, so memory stays flat; with
+    workers > 1 the checks run on a process pool. Results are saved under
+    one run id and only the summary is returned.
+    """
+    started = time.time()
+    run_id = new_run_id() if persist else None
+    summary = SummaryAccumulator(['schema'])
+    traces = (t for t in map(get_trace, trace_ids) if t) if trace_ids is not None else iter_traces()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        for chunk in _chunked(traces, SCHEMA_BULK_CHUNK):
+            graded = schema_grader.grade_many([(t['id'], t.get('parsed_workflow'), None) for t in chunk],
+                                              executor=executor)
+            results = [_fingerprinted(r, 'schema', t) for r, t in zip(graded, chunk)]
+            for result in results:
+                summary.add(result)
+            if persist:
+                save_results(results, run_id=run_id)
+    finally:
+        if executor:
+            executor.shutdown()
+    elapsed = time.time() - started
+    summary = summary.result()
+    return {
+        'run_id': run_id,
+        'summary': summary,
+        'elapsed_ms': round(elapsed * 1000),
+        'traces_per_second': round(summary['total'] / elapsed) if elapsed else None
+    }
+
+
+def iter_golden_eval(graders, golden_ids=None, concurrency=None, judge_batch_size=None, incremental=False,
+                     skip=None, run_id=None, persist=True, cascade_rules=None):
+    """Streaming run_golden_eval: yields result events as goldens finish, then a summary event.
+
+    skip holds golden ids that are already graded. With incremental=True,
+    goldens whose content, grader versions and system prompt are unchanged
+    since a stored run are not regenerated. cascade_rules as in iter_eval.
+    """
+    rules = cascade.parse_rules(cascade_rules)
     api_key = _get_api_key()
     if not api_key:
-        return {'error': 'No API key available'}
+        yield {'event': 'error', 'error': 'No API key available'}
+        return
 
-    goldens = get_goldens()
-    if golden_ids:
-        goldens = [g for g in goldens if g['id'] in golden_ids]
+    goldens = _filter_goldens(golden_ids)
 
-    results = []
-    for golden_data in goldens:
+    def make_pair(golden_data):
         # Generate a new workflow
-        trace = _generate_workflow(golden_data['user_message'], api_key)
-        saved_trace = save_trace(trace)
-        trace_data = saved_trace.to_dict()
+        return _generate_and_save(golden_data['user_message'], api_key), golden_data
+
+    pending = _pending(goldens, lambda g: g['id'], skip)
+    reused = []
+    if incremental:
+        reused, pending = _split_reusable(pending, lambda g, grader: _fingerprint(grader, None, g, rules), graders)
+    graded = _iter_graded(pending, make_pair, graders, concurrency, judge_batch_size, rules)
+    yield from _iter_results(itertools.chain(reused, graded), graders, run_id=run_id, persist=persist, rules=rules)
 
-        for grader_name in graders:
-            result = run_grader(grader_name, trace_data, golden_data)
-            results.append(result.to_dict())
 
-    summary = _compute_summary(results, graders)
-    return {'results': results, 'summary': summary}
+def run_golden_eval(graders, golden_ids=None, concurrency=None, judge_batch_size=None, incremental=False,
+                    cascade_rules=None):
+    """Re-generate workflows for goldens and grade against expected."""
+    results, final = _collect_results(iter_golden_eval(graders, golden_ids, concurrency, judge_batch_size,
+                                                       incremental, cascade_rules=cascade_rules))
+    if final['event'] == 'error':
+        return {'error': final['error']}
+    summary = _compute_summary(results, graders, cascade.parse_rules(cascade_rules))
+    return {'run_id': final['run_id'], 'results': results, 'summary': summary}
 
 
-def run_pass_at_k(golden_id, k=5):
-    """Generate K times for same prompt, report pass rates."""
+def _pass_at_k_summary(attempts, k):
+    schema_passes = sum(1 for a in attempts if a['schema']['passed'])
+    intent_passes = sum(1 for a in attempts if a['intent']['passed'])
+    return {
+        'pass_at_k': {
+            'schema': schema_passes / k,
+            'intent': intent_passes / k
+        },
+        'pass_hat_at_k': {
+            'schema': 1.0 if schema_passes == k else 0.0,
+            'intent': 1.0 if intent_passes == k else 0.0
+        }
+    }
+
+
+def iter_pass_at_k(golden_id, k=5, concurrency=None, skip=None, run_id=None, persist=True):
+    """Streaming run_pass_at_k: yields an attempt event per generation, then a summary event.
+
+    skip holds attempt numbers that already ran.
+    """
     api_key = _get_api_key()
     if not api_key:
-        return {'error': 'No API key available'}
+        yield {'event': 'error', 'error': 'No API key available'}
+        return
 
     golden_data = get_golden(golden_id)
     if not golden_data:
-        return {'error': f'Golden {golden_id} not found'}
+        yield {'event': 'error', 'error': f'Golden {golden_id} not found'}
+        return
 
-    attempts = []
-    for i in range(k):
-        trace = _generate_workflow(golden_data['user_message'], api_key)
-        saved_trace = save_trace(trace)
-        trace_data = saved_trace.to_dict()
+    def attempt(i):
+        trace_data = _generate_and_save(golden_data['user_message'], api_key)
 
         schema_result = run_grader('schema', trace_data, golden_data)
         intent_result = run_grader('intent', trace_data, golden_data)
 
-        attempts.append({
+        return {
             'attempt': i + 1,
             'trace_id': trace_data['id'],
             'schema': schema_result.to_dict(),
             'intent': intent_result.to_dict()
-        })
+        }
 
-    schema_passes = sum(1 for a in attempts if a['schema']['passed'])
-    intent_passes = sum(1 for a in attempts if a['intent']['passed'])
+    run_id = run_id or new_run_id()
+    attempts = []
+    numbers = [i for _, i in _pending(range(k), lambda i: i + 1, skip)]
+    for _, result in _iter_concurrent(attempt, numbers, concurrency):
+        if persist:
+            save_results([result['schema'], result['intent']], run_id=run_id)
+        attempts.append(result)
+        yield {'event': 'attempt', 'attempt': result}
+
+    yield {
+        'event': 'summary',
+        'run_id': run_id,
+        'golden_id': golden_id,
+        'k': k,
+        **_pass_at_k_summary(attempts, k)
+    }
 
+
+def run_pass_at_k(golden_id, k=5, concurrency=None):
+    """Generate K times for same prompt, report pass rates."""
+    attempts, final = [], None
+    for event in iter_pass_at_k(golden_id, k, concurrency):
+        if event['event'] == 'attempt':
+            attempts.append(event['attempt'])
+        elif event['event'] in ('summary', 'error'):
+            final = event
+    if final['event'] == 'error':
+        return {'error': final['error']}
+
+    attempts.sort(key=lambda a: a['attempt'])
     return {
+        'run_id': final['run_id'],
         'golden_id': golden_id,
         'k': k,
         'attempts': attempts,
-        'pass_at_k': {
-            'schema': schema_passes / k,
-            'intent': intent_passes / k
-        },
-        'pass_hat_at_k': {
-            'schema': 1.0 if schema_passes == k else 0.0,
-            'intent': 1.0 if intent_passes == k else 0.0
-        }
+        'pass_at_k': final['pass_at_k'],
+        'pass_hat_at_k': final['pass_hat_at_k']
     }
 
 
-def run_comparison(config_a, config_b, golden_ids=None, graders=None):
-    """A/B test two configs against goldens."""
+def _tally_comparison(comparison, results_a, results_b):
+    for a, b in zip(results_a, results_b):
+        if a['score'] > b['score']:
+            comparison['a_wins'] += 1
+        elif b['score'] > a['score']:
+            comparison['b_wins'] += 1
+        else:
+            comparison['ties'] += 1
+    return comparison
+
+
+def iter_comparison(config_a, config_b, golden_ids=None, graders=None, concurrency=None,
+                    skip=None, run_id=None, persist=True):
+    """Streaming run_comparison: yields a result event per golden (both configs), then a summary event.
+
+    skip holds golden ids that are already compared.
+    """
     api_key = _get_api_key()
     if not api_key:
-        return {'error': 'No API key available'}
+        yield {'event': 'error', 'error': 'No API key available'}
+        return
 
     graders = graders or ['schema', 'intent']
-    goldens = get_goldens()
-    if golden_ids:
-        goldens = [g for g in goldens if g['id'] in golden_ids]
-
-    results_a = []
-    results_b = []
+    goldens = _filter_goldens(golden_ids)
 
-    for golden_data in goldens:
-        # Config A
-        trace_a = _generate_workflow(
+    def compare_golden(golden_data):
+        trace_a_data = _generate_and_save(
             golden_data['user_message'], api_key,
             temperature=config_a.get('temperature', 0.5)
         )
-        saved_a = save_trace(trace_a)
-        trace_a_data = saved_a.to_dict()
-
-        # Config B
-        trace_b = _generate_workflow(
+        trace_b_data = _generate_and_save(
             golden_data['user_message'], api_key,
             temperature=config_b.get('temperature', 0.5)
         )
-        saved_b = save_trace(trace_b)
-        trace_b_data = saved_b.to_dict()
+        return (
+            [run_grader(grader_name, trace_a_data, golden_data).to_dict() for grader_name in graders],
+            [run_grader(grader_name, trace_b_data, golden_data).to_dict() for grader_name in graders]
+        )
 
-        for grader_name in graders:
-            result_a = run_grader(grader_name, trace_a_data, golden_data)
-            result_b = run_grader(grader_name, trace_b_data, golden_data)
-            results_a.append(result_a.to_dict())
-            results_b.append(result_b.to_dict())
+    run_id = run_id or new_run_id()
+    comparison = {'a_wins': 0, 'b_wins': 0, 'ties': 0}
+    pending = _pending(goldens, lambda g: g['id'], skip)
+    for position, (batch_a, batch_b) in _iter_concurrent(compare_golden, [g for _, g in pending], concurrency):
+        index, golden_data = pending[position]
+        if persist:
+            save_results(batch_a + batch_b, run_id=run_id)
+        _tally_comparison(comparison, batch_a, batch_b)
+        yield {'event': 'result', 'index': index, 'golden_id': golden_data['id'],
+               'results_a': batch_a, 'results_b': batch_b}
+
+    yield {
+        'event': 'summary',
+        'run_id': run_id,
+        'config_a': config_a,
+        'config_b': config_b,
+        'comparison': comparison
+    }
 
-    a_wins = sum(1 for a, b in zip(results_a, results_b) if a['score'] > b['score'])
-    b_wins = sum(1 for a, b in zip(results_a, results_b) if b['score'] > a['score'])
-    ties = len(results_a) - a_wins - b_wins
 
+def run_comparison(config_a, config_b, golden_ids=None, graders=None, concurrency=None):
+    """A/B test two configs against goldens."""
+    pairs, final = [], None
+    for event in iter_comparison(config_a, config_b, golden_ids, graders, concurrency):
+        if event['event'] == 'result':
+            pairs.append((event['index'], event['results_a'], event['results_b']))
+        elif event['event'] in ('summary', 'error'):
+            final = event
+    if final['event'] == 'error':
+        return {'error': final['error']}
+
+    pairs.sort(key=lambda p: p[0])
     return {
+        'run_id': final['run_id'],
         'config_a': config_a,
         'config_b': config_b,
-        'results_a': results_a,
-        'results_b': results_b,
-        'comparison': {
-            'a_wins': a_wins,
-            'b_wins': b_wins,
-            'ties': ties
-        }
+        'results_a': [r for _, batch_a, _ in pairs for r in batch_a],
+        'results_b': [r for _, _, batch_b in pairs for r in batch_b],
+        'comparison': final['comparison']
     }
 
 
-def _compute_summary(results, graders):
-    """Compute aggregate statistics from eval results."""
-    summary = {
-        'total': len(results),
-        'passed': sum(1 for r in results if r['passed']),
-        'failed': sum(1 for r in results if not r['passed']),
-        'avg_score': sum(r['score'] for r in results) / len(results) if results else 0,
-        'by_grader': {}
-    }
+# --- Background runs (see jobs.py) ---
+
+RUN_KINDS = ('eval', 'golden', 'pass_at_k', 'compare')
+
+
+def plan_run(kind, config):
+    """Normalize a run request and pin the items it covers.
+
+    Returns (config, item count). Trace and golden ids are resolved up front
+    so a resumed run works through the same items. Raises ValueError for an
+    invalid request.
+    """
+    common = {'concurrency': config.get('concurrency')}
+    if kind in ('eval', 'golden'):
+        graders = config.get('graders') or (['schema'] if kind == 'eval' else ['schema', 'intent'])
+        common.update(graders=graders, judge_batch_size=config.get('judge_batch_size'),
+                      incremental=bool(config.get('incremental')),
+                      cascade_rules=cascade.parse_rules(config.get('cascade')))
+        if kind == 'eval':
+            trace_ids = config.get('trace_ids') or [t['id'] for t in get_traces(limit=config.get('limit', 50))[0]]
+            return {**common, 'trace_ids': trace_ids}, len(trace_ids)
+        golden_ids = [g['id'] for g in _filter_goldens(config.get('golden_ids'))]
+        return {**common, 'golden_ids': golden_ids}, len(golden_ids)
+    if kind == 'pass_at_k':
+        golden_id = config.get('golden_id')
+        if not golden_id:
+            raise ValueError('golden_id is required')
+        if not get_golden(golden_id):
+            raise ValueError(f'Golden {golden_id} not found')
+        k = int(config.get('k', 5))
+        return {**common, 'golden_id': golden_id, 'k': k}, k
+    if kind == 'compare':
+        golden_ids = [g['id'] for g in _filter_goldens(config.get('golden_ids'))]
+        return {**common, 'config_a': config.get('config_a', {}), 'config_b': config.get('config_b', {}),
+                'graders': config.get('graders') or ['schema', 'intent'], 'golden_ids': golden_ids}, len(golden_ids)
+    raise ValueError(f'Unknown run kind: {kind}')
+
+
+def iter_run_items(kind, config, run_id, skip=None):
+    """Execute a planned run, yielding (item key, events) as each item completes.
+
+    Items are traces (eval), goldens (golden, compare) or attempt numbers
+    (pass_at_k); keys in skip are not run again. Results are not saved here,
+    the caller persists them with its checkpoint. Raises RuntimeError if the
+    run cannot start.
+    """
+    common = {'concurrency': config.get('concurrency'), 'skip': skip, 'run_id': run_id, 'persist': False}
+    if kind == 'eval':
+        events = iter_eval(config['graders'], trace_ids=config['trace_ids'],
+                           judge_batch_size=config.get('judge_batch_size'),
+                           incremental=config.get('incremental', False),
+                           cascade_rules=config.get('cascade_rules'), **common)
+    elif kind == 'golden':
+        events = iter_golden_eval(config['graders'], golden_ids=config['golden_ids'],
+                                  judge_batch_size=config.get('judge_batch_size'),
+                                  incremental=config.get('incremental', False),
+                                  cascade_rules=config.get('cascade_rules'), **common)
+    elif kind == 'pass_at_k':
+        events = iter_pass_at_k(config['golden_id'], k=config['k'], **common)
+    else:
+        events = iter_comparison(config['config_a'], config['config_b'], config['golden_ids'], config['graders'],
+                                 **common)
+
+    partial = {}
+    for event in events:
+        if event['event'] == 'error':
+            raise RuntimeError(event['error'])
+        if event['event'] == 'attempt':
+            yield event['attempt']['attempt'], [event]
+        elif event['event'] == 'result' and kind == 'compare':
+            yield event['golden_id'], [event]
+        elif event['event'] == 'result':
+            # An eval item is done once every grader has reported for it
+            key = event['result']['trace_id' if kind == 'eval' else 'golden_id']
+            partial.setdefault(key, []).append(event)
+            if len(partial[key]) == len(config['graders']):
+                yield key, partial.pop(key)
+
+
+def event_results(event):
+    """EvalResult dicts carried by a runner event."""
+    if event['event'] == 'attempt':
+        return [event['attempt']['schema'], event['attempt']['intent']]
+    if 'results_a' in event:
+        return event['results_a'] + event['results_b']
+    return [event['result']]
+
+
+def summarize_run(kind, config, events):
+    """Summary of a run from the events of all its items, however many sessions it took."""
+    if kind in ('eval', 'golden'):
+        results, _ = _collect_results(events)
+        return _compute_summary(results, config['graders'], cascade.parse_rules(config.get('cascade_rules')))
+    if kind == 'pass_at_k':
+        return {'golden_id': config['golden_id'], 'k': config['k'],
+                **_pass_at_k_summary([e['attempt'] for e in events], config['k'])}
+    comparison = {'a_wins': 0, 'b_wins': 0, 'ties': 0}
+    for event in events:
+        _tally_comparison(comparison, event['results_a'], event['results_b'])
+    return {'config_a': config['config_a'], 'config_b': config['config_b'], 'comparison': comparison}
+
+
+def _compute_summary(results, graders, rules=()):
+    """Compute aggregate statistics from eval results in a single pass."""
+    summary = SummaryAccumulator(graders, rules)
+    for result in results:
+        summary.add(result)
+    return summary.result()
+
+
+class SummaryAccumulator:
+    """Incremental version of _compute_summary for streamed results."""
+
+    def __init__(self, graders, rules=()):
+        self.graders = list(graders)
+        # With cascade rules in play the summary reports the judge calls they saved, even when none
+        self.cascade = bool(rules) and 'intent' in self.graders
+        self.overall = {'total': 0, 'passed': 0, 'score': 0.0}
+        self.by_grader = {}
+        self.reused = 0
+        self.judged = 0
+        self.judge_skips = {}  # cascade rule -> intent verdicts it gave without the judge
+
+    def add(self, result):
+        if 'reused_from' in result:
+            self.reused += 1
+        elif result['grader_name'] == 'intent':
+            rule = result['details'].get('cascade', {}).get('rule')
+            if rule:
+                self.judge_skips[rule] = self.judge_skips.get(rule, 0) + 1
+            else:
+                self.judged += 1
+        for bucket in (self.overall, self.by_grader.setdefault(result['grader_name'],
+                                                               {'total': 0, 'passed': 0, 'score': 0.0})):
+            bucket['total'] += 1
+            bucket['passed'] += 1 if result['passed'] else 0
+            bucket['score'] += result['score']
+
+    @staticmethod
+    def _stats(bucket):
+        return {
+            'total': bucket['total'],
+            'passed': bucket['passed'],
+            'failed': bucket['total'] - bucket['passed'],
+            'avg_score': bucket['score'] / bucket['total'] if bucket['total'] else 0
+        }
 
-    for grader in graders:
-        grader_results = [r for r in results if r['grader_name'] == grader]
-        if grader_results:
-            summary['by_grader'][grader] = {
-                'total': len(grader_results),
-                'passed': sum(1 for r in grader_results if r['passed']),
-                'failed': sum(1 for r in grader_results if not r['passed']),
-                'avg_score': sum(r['score'] for r in grader_results) / len(grader_results)
+    def result(self):
+        summary = {**self._stats(self.overall), 'by_grader': {}}
+        if self.reused:
+            summary['reused'] = self.reused
+        if self.cascade or self.judge_skips:
+            summary['cascade'] = {
+                'judged': self.judged,
+                'judge_calls_saved': sum(self.judge_skips.values()),
+                'by_rule': dict(self.judge_skips),
             }
-
-    return summary
+        for grader in self.graders:
+            if self.by_grader.get(grader, {}).get('total'):
+                summary['by_grader'][grader] = self._stats(self.by_grader[grader])
+        return summary
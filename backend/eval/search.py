@@ -0,0 +1,245 @@
+"""Full-text search over traces and goldens.
+
+Indexes user messages, workflow and step names, and annotation / golden
+notes. The index is updated on every trace and golden write, and search
+ranks hits with BM25, reading only the postings of the query terms. SQLite
+uses an FTS5 table; the file backend keeps postings in memory, fed by a
+JSONL delta log that every process tails.
+"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from .locking import FileLock
+from .storage import DATA_DIR, use_sqlite, get_database
+
+SEARCH_FILE = os.path.join(DATA_DIR, 'search_index.jsonl')
+# The file backend rewrites its delta log as a snapshot once it is this much larger than the live index
+COMPACT_RATIO = 2
+COMPACT_MIN_BYTES = 1024 * 1024
+
+KINDS = ('trace', 'golden')
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _workflow_names(workflow):
+    if not isinstance(workflow, dict):
+        return []
+    names = [workflow.get('name')]
+    stack = [workflow.get('steps')]
+    while stack:
+        steps = stack.pop()
+        if not isinstance(steps, list):
+            continue
+        for step in steps:
+            if isinstance(step, dict):
+                names.append(step.get('name'))
+                stack.append(step.get('steps'))
+    return [name for name in names if isinstance(name, str)]
+
+
+def document_terms(kind, record):
+    """Term frequencies for a trace or golden record."""
+    if kind == 'trace':
+        texts = [record.get('user_message')] + _workflow_names(record.get('parsed_workflow'))
+        texts += [a.get('notes') for a in record.get('annotations') or [] if isinstance(a, dict)]
+    else:
+        texts = [record.get('user_message'), record.get('notes')] + _workflow_names(record.get('expected_workflow'))
+    return Counter(tokenize(' '.join(text for text in texts if isinstance(text, str))))
+
+
+def _key(kind, record_id):
+    return f'{kind}:{record_id}'
+
+
+def bm25(tf, df, doc_len, docs, avg_len):
+    idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len))
+
+
+class FileSearchIndex:
+    """Postings held in memory and rebuilt from a JSONL log of document updates.
+
+    Each write appends one line ({'docs': [[key, {term: tf} or null], ...]});
+    readers in any process tail the log, and it is replaced by a snapshot
+    once it outgrows the live index. A missing log is rebuilt from source(),
+    an iterable of (key, terms) for every stored document.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self._lock = threading.Lock()
+        self._write_lock = FileLock(path + '.lock')
+        self._reset()
+        self._pos = 0
+        self._inode = None
+
+    def _reset(self):
+        self._postings = {}  # term -> {key: tf}
+        self._docs = {}  # key -> (terms, length, approximate log bytes)
+        self._total_len = 0
+        self._live_bytes = 0
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            with self._write_lock:
+                if not os.path.exists(self.path):
+                    self._write_snapshot(self.source())
+        self._refresh()
+
+    def _refresh(self):
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode or stat.st_size < self._pos:
+            # Replaced by a snapshot: reload from the start
+            self._reset()
+            self._pos, self._inode = 0, stat.st_ino
+        if stat.st_size == self._pos:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._pos)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._pos += len(line)
+                for key, terms in json.loads(line)['docs']:
+                    self._apply(key, terms)
+
+    def _apply(self, key, terms):
+        old = self._docs.pop(key, None)
+        if old is not None:
+            for term in old[0]:
+                postings = self._postings[term]
+                del postings[key]
+                if not postings:
+                    del self._postings[term]
+            self._total_len -= old[1]
+            self._live_bytes -= old[2]
+        if terms:
+            length = sum(terms.values())
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[key] = tf
+            size = len(key) + sum(len(term) + 4 for term in terms)
+            self._docs[key] = (terms, length, size)
+            self._total_len += length
+            self._live_bytes += size
+
+    @staticmethod
+    def _line(docs):
+        return (json.dumps({'docs': docs}, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def _write_snapshot(self, docs, batch=1000):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pending = []
+            for key, terms in docs:
+                pending.append([key, terms])
+                if len(pending) >= batch:
+                    f.write(self._line(pending))
+                    pending = []
+            if pending:
+                f.write(self._line(pending))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def update(self, docs):
+        """Index (key, terms) pairs; empty terms or None remove the document."""
+        if not docs:
+            return
+        docs = [[key, dict(terms) if terms else None] for key, terms in docs]
+        with self._lock:
+            self._open()
+            with self._write_lock:
+                with open(self.path, 'ab') as f:
+                    f.write(self._line(docs))
+                self._refresh()
+                if self._pos > max(COMPACT_MIN_BYTES, COMPACT_RATIO * self._live_bytes):
+                    self._write_snapshot([(key, doc[0]) for key, doc in self._docs.items()])
+                    self._refresh()
+
+    def search(self, terms, kind=None, limit=20, offset=0):
+        """([(key, score)] best first, total hits) for documents containing any of terms."""
+        with self._lock:
+            self._open()
+            docs = len(self._docs)
+            if not docs:
+                return [], 0
+            avg_len = self._total_len / docs
+            prefix = f'{kind}:' if kind else ''
+            scores = {}
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                for key, tf in postings.items():
+                    if prefix and not key.startswith(prefix):
+                        continue
+                    scores[key] = scores.get(key, 0) + bm25(tf, df, self._docs[key][1], docs, avg_len)
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+        return top[offset:], len(scores)
+
+
+def _documents():
+    """(key, terms) for every stored trace and golden; used to build a missing index."""
+    from .traces import iter_traces
+    from .golden_dataset import get_goldens
+    for record in iter_traces():
+        yield _key('trace', record['id']), document_terms('trace', record)
+    for record in get_goldens():
+        yield _key('golden', record['id']), document_terms('golden', record)
+
+
+if use_sqlite():
+    from .sqlite_store import SQLiteSearchIndex
+    _index = SQLiteSearchIndex(get_database(), legacy=_documents)
+else:
+    _index = FileSearchIndex(SEARCH_FILE, source=_documents)
+
+
+def index_records(kind, records):
+    """Add or refresh the search entries of trace or golden records."""
+    _index.update([(_key(kind, record['id']), document_terms(kind, record)) for record in records])
+
+
+def remove_records(kind, record_ids):
+    _index.update([(_key(kind, record_id), None) for record_id in record_ids])
+
+
+def search(query, kind=None, limit=20, offset=0):
+    """BM25-ranked traces and goldens matching any query term. Raises ValueError.
+
+    Each hit carries its kind, id, score and the record itself.
+    """
+    if kind is not None and kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    if limit < 1 or offset < 0:
+        raise ValueError('limit must be positive and offset not negative')
+    terms = tokenize(query or '')
+    if not terms:
+        raise ValueError('q must contain at least one word')
+    started = time.perf_counter()
+    ranked, total = _index.search(terms, kind=kind, limit=limit, offset=offset)
+
+    from .traces import get_trace
+    from .golden_dataset import get_golden
+    hits = []
+    for key, score in ranked:
+        hit_kind, record_id = key.split(':', 1)
+        record = get_trace(record_id) if hit_kind == 'trace' else get_golden(record_id)
+        if record is not None:
+            hits.append({'kind': hit_kind, 'id': record_id, 'score': round(score, 4), 'record': record})
+    return {'hits': hits, 'total': total, 'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)}
@@ -0,0 +1,667 @@
+import json
+import os
+import sqlite3
+import threading
+
+from . import rollups
+from .interning import blob_key
+from .trace_index import index_fields
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS traces (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    timestamp TEXT,
+    model TEXT,
+    parse_success INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_traces_timestamp ON traces(timestamp);
+CREATE INDEX IF NOT EXISTS idx_traces_model ON traces(model);
+CREATE INDEX IF NOT EXISTS idx_traces_parse_success ON traces(parse_success);
+CREATE INDEX IF NOT EXISTS idx_traces_keyset ON traces(timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_traces_model_keyset ON traces(model, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_traces_parse_keyset ON traces(parse_success, timestamp, id);
+
+CREATE TABLE IF NOT EXISTS goldens (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS golden_tags (
+    golden_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, golden_id)
+);
+CREATE INDEX IF NOT EXISTS idx_golden_tags_golden ON golden_tags(golden_id);
+
+CREATE TABLE IF NOT EXISTS eval_results (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT,
+    trace_id TEXT,
+    golden_id TEXT,
+    grader_name TEXT,
+    passed INTEGER,
+    score REAL,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eval_results_run ON eval_results(run_id);
+CREATE INDEX IF NOT EXISTS idx_eval_results_trace ON eval_results(trace_id);
+
+CREATE TABLE IF NOT EXISTS trace_rollups (
+    granularity TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (granularity, bucket_start, model)
+);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS search_docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(body);
+
+CREATE TABLE IF NOT EXISTS eval_runs (
+    id TEXT PRIMARY KEY,
+    kind TEXT,
+    status TEXT,
+    created_at TEXT,
+    owner TEXT,
+    heartbeat REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eval_runs_status ON eval_runs(status);
+CREATE INDEX IF NOT EXISTS idx_eval_runs_created ON eval_runs(created_at);
+
+CREATE TABLE IF NOT EXISTS eval_run_items (
+    run_id TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, item_key)
+);
+"""
+
+# Columns added after a table first shipped: (table, column, type, index statement, backfill statement)
+MIGRATIONS = [
+    ('eval_results', 'fingerprint', 'TEXT',
+     'CREATE INDEX IF NOT EXISTS idx_eval_results_fingerprint ON eval_results(fingerprint)', None),
+    ('traces', 'has_error', 'INTEGER',
+     'CREATE INDEX IF NOT EXISTS idx_traces_error_keyset ON traces(has_error, timestamp, id)',
+     "UPDATE traces SET has_error = COALESCE(json_extract(data, '$.error'), '') NOT IN ('', 0)"),
+    ('traces', 'verdict', 'TEXT',
+     'CREATE INDEX IF NOT EXISTS idx_traces_verdict_keyset ON traces(verdict, timestamp, id)',
+     "UPDATE traces SET verdict = json_extract(data, '$.annotations[#-1].verdict')"),
+    ('traces', 'latency_ms', 'INTEGER',
+     'CREATE INDEX IF NOT EXISTS idx_traces_latency ON traces(latency_ms)',
+     "UPDATE traces SET latency_ms = COALESCE(json_extract(data, '$.latency_ms'), 0)"),
+]
+
+
+class Database:
+    """SQLite database in WAL mode with one connection per thread."""
+
+    def __init__(self, path, schema=SCHEMA, migrations=None):
+        self.path = path
+        self.schema = schema
+        self.migrations = migrations if migrations is not None else (MIGRATIONS if schema is SCHEMA else [])
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(self.schema)
+                    self._migrate(conn)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        for table, column, column_type, index, backfill in self.migrations:
+            columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if column not in columns:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+                if backfill:
+                    conn.execute(backfill)
+            if index:
+                conn.execute(index)
+        conn.commit()
+
+    def get_meta(self, key):
+        row = self.connect().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, key, value):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                'INSERT INTO meta (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                (key, value)
+            )
+
+
+class _SeededStore:
+    """Imports records from the file-backed store the first time the table is used."""
+
+    meta_key = None
+
+    def __init__(self, db, legacy=None):
+        self.db = db
+        self.legacy = legacy
+        self._seeded = False
+        self._seed_lock = threading.Lock()
+
+    def _conn(self):
+        conn = self.db.connect()
+        if not self._seeded:
+            with self._seed_lock:
+                if not self._seeded:
+                    if self.legacy is not None and self.db.get_meta(self.meta_key) is None:
+                        with conn:
+                            for record in self._legacy_records():
+                                self._put(conn, record)
+                    self.db.set_meta(self.meta_key, '1')
+                    self._seeded = True
+        return conn
+
+    def _legacy_records(self):
+        raise NotImplementedError
+
+    def _put(self, conn, record):
+        raise NotImplementedError
+
+    def put(self, record):
+        conn = self._conn()
+        with conn:
+            self._put(conn, record)
+        return record
+
+    def put_many(self, records):
+        conn = self._conn()
+        with conn:
+            for record in records:
+                self._put(conn, record)
+        return records
+
+    def _update(self, table, record_id, apply):
+        """Read, apply(record) and write back in one write transaction; None if the id doesn't exist."""
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(f'SELECT data FROM {table} WHERE id = ?', (record_id,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row['data'])
+            apply(record)
+            self._put(conn, record)
+        return record
+
+
+class SQLiteTraceStore(_SeededStore):
+    meta_key = 'imported:traces'
+
+    def _legacy_records(self):
+        return self.legacy.iter_records()
+
+    def _put(self, conn, record):
+        timestamp, model, parse_success, has_error, verdict, latency_ms = index_fields(record)
+        conn.execute(
+            'INSERT INTO traces (id, timestamp, model, parse_success, has_error, verdict, latency_ms, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET timestamp = excluded.timestamp, model = excluded.model, '
+            'parse_success = excluded.parse_success, has_error = excluded.has_error, '
+            'verdict = excluded.verdict, latency_ms = excluded.latency_ms, data = excluded.data',
+            (record['id'], record.get('timestamp'), model, int(parse_success), int(has_error), verdict,
+             latency_ms, json.dumps(record))
+        )
+
+    def get(self, record_id):
+        row = self._conn().execute('SELECT data FROM traces WHERE id = ?', (record_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def delete(self, record_id):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute('DELETE FROM traces WHERE id = ?', (record_id,))
+        return cursor.rowcount > 0
+
+    def update(self, record_id, apply):
+        return self._update('traces', record_id, apply)
+
+    def delete_many(self, record_ids):
+        """Delete several ids in one transaction; returns how many existed."""
+        conn = self._conn()
+        with conn:
+            cursor = conn.executemany('DELETE FROM traces WHERE id = ?', [(i,) for i in set(record_ids)])
+        return cursor.rowcount
+
+    def stats(self):
+        """Live trace count and bytes, the database size, and its free pages (reclaimed by compact)."""
+        conn = self._conn()
+        count, live_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM traces').fetchone()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        disk_bytes = conn.execute('PRAGMA page_count').fetchone()[0] * page_size
+        garbage_bytes = conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size
+        return {'count': count, 'live_bytes': live_bytes, 'disk_bytes': disk_bytes, 'garbage_bytes': garbage_bytes}
+
+    def compact(self):
+        """Checkpoint the WAL and VACUUM the database; returns bytes reclaimed."""
+        conn = self._conn()
+        before = self.stats()['disk_bytes']
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+        return before - self.stats()['disk_bytes']
+
+    def list(self, limit=50, offset=0):
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT data FROM traces ORDER BY seq DESC LIMIT ? OFFSET ?', (limit, offset)
+        ).fetchall()
+        total = conn.execute('SELECT COUNT(*) FROM traces').fetchone()[0]
+        return [json.loads(row['data']) for row in rows], total
+
+    @staticmethod
+    def _where(filters, cursor=None):
+        """WHERE clause (empty without filters) and its parameters for normalized filters."""
+        clauses, params = [], []
+        for name in ('model', 'parse_success', 'has_error', 'verdict'):
+            if name not in filters:
+                continue
+            value = filters[name]
+            if value is None:
+                clauses.append(f'{name} IS NULL')
+            else:
+                clauses.append(f'{name} = ?')
+                params.append(int(value) if isinstance(value, bool) else value)
+        for name, column, op in (('min_latency_ms', 'latency_ms', '>='), ('max_latency_ms', 'latency_ms', '<='),
+                                 ('since', 'timestamp', '>='), ('until', 'timestamp', '<')):
+            if name in filters:
+                clauses.append(f'{column} {op} ?')
+                params.append(filters[name])
+        if cursor is not None:
+            clauses.append('(timestamp, id) < (?, ?)')
+            params.extend(cursor)
+        return (f"WHERE {' AND '.join(clauses)} " if clauses else ''), params
+
+    def query(self, filters, cursor=None, limit=50):
+        """(records newest first by (timestamp, id), next cursor) matching filters.
+
+        Every filter is a column with a (column, timestamp, id) index, so a
+        page is an index range scan from the cursor.
+        """
+        where, params = self._where(filters, cursor)
+        rows = self._conn().execute(
+            f'SELECT timestamp, id, data FROM traces {where}ORDER BY timestamp DESC, id DESC LIMIT ?',
+            (*params, limit + 1)
+        ).fetchall()
+        next_cursor = (rows[limit - 1]['timestamp'], rows[limit - 1]['id']) if len(rows) > limit else None
+        return [json.loads(row['data']) for row in rows[:limit]], next_cursor
+
+    def count(self, filters):
+        """How many traces match filters."""
+        where, params = self._where(filters)
+        return self._conn().execute(f'SELECT COUNT(*) FROM traces {where}', params).fetchone()[0]
+
+    def iter_records(self):
+        """Yield every trace, oldest first."""
+        for row in self._conn().execute('SELECT data FROM traces ORDER BY seq'):
+            yield json.loads(row['data'])
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM traces').fetchone()[0]
+
+    def changes(self, cursor=0):
+        """Traces inserted since cursor (a seq), as (new cursor, records, deleted ids, live count).
+
+        Deleted ids are not tracked; callers reload when the live count
+        disagrees with what they hold.
+        """
+        conn = self._conn()
+        rows = conn.execute('SELECT seq, data FROM traces WHERE seq > ? ORDER BY seq', (cursor,)).fetchall()
+        total = conn.execute('SELECT COUNT(*) FROM traces').fetchone()[0]
+        return (rows[-1]['seq'] if rows else cursor), [json.loads(row['data']) for row in rows], [], total
+
+
+class SQLiteBlobStore(_SeededStore):
+    """Content-addressed strings; blobs never change, so reads are cached per process."""
+
+    meta_key = 'imported:blobs'
+
+    def __init__(self, db, legacy=None):
+        super().__init__(db, legacy)
+        self._cache = {}
+
+    def _legacy_records(self):
+        return self.legacy.iter_blobs()
+
+    def _put(self, conn, item):
+        conn.execute('INSERT OR IGNORE INTO blobs (key, text) VALUES (?, ?)', item)
+
+    def add_many(self, texts):
+        """Store the texts not stored yet; returns the key of every text, in order."""
+        keys = [blob_key(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in self._cache}
+        if missing:
+            conn = self._conn()
+            with conn:
+                for item in missing.items():
+                    self._put(conn, item)
+            self._cache.update(missing)
+        return keys
+
+    def get(self, key):
+        text = self._cache.get(key)
+        if text is None:
+            row = self._conn().execute('SELECT text FROM blobs WHERE key = ?', (key,)).fetchone()
+            if row:
+                text = self._cache[key] = row['text']
+        return text
+
+
+class SQLiteSearchIndex(_SeededStore):
+    """Search documents in an FTS5 table ranked with its bm25(); the first use indexes every stored document.
+
+    Documents are stored as their space-joined tokens, so FTS5 matches the
+    same terms as the file backend's index.
+    """
+
+    meta_key = 'built:search_index'
+
+    def _legacy_records(self):
+        return self.legacy()
+
+    def _put(self, conn, item):
+        key, terms = item
+        row = conn.execute('SELECT id FROM search_docs WHERE doc = ?', (key,)).fetchone()
+        if row:
+            conn.execute('DELETE FROM search_fts WHERE rowid = ?', (row['id'],))
+            if not terms:
+                conn.execute('DELETE FROM search_docs WHERE id = ?', (row['id'],))
+                return
+            doc_id = row['id']
+        elif not terms:
+            return
+        else:
+            doc_id = conn.execute('INSERT INTO search_docs (doc) VALUES (?)', (key,)).lastrowid
+        body = ' '.join(term for term, tf in terms.items() for _ in range(tf))
+        conn.execute('INSERT INTO search_fts (rowid, body) VALUES (?, ?)', (doc_id, body))
+
+    def update(self, docs):
+        """Index (key, terms) pairs; empty terms or None remove the document."""
+        if docs:
+            self.put_many(docs)
+
+    def search(self, terms, kind=None, limit=20, offset=0):
+        """([(key, score)] best first, total hits) for documents containing any of terms."""
+        match = ' OR '.join('"{}"'.format(term.replace('"', '""')) for term in dict.fromkeys(terms))
+        kind_clause = ' AND d.doc >= ? AND d.doc < ?' if kind else ''
+        kind_params = (f'{kind}:', f'{kind};') if kind else ()
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT d.doc, -bm25(search_fts) AS score FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid '
+            f'WHERE search_fts MATCH ?{kind_clause} ORDER BY bm25(search_fts) LIMIT ? OFFSET ?',
+            (match, *kind_params, limit, offset)
+        ).fetchall()
+        total = conn.execute(
+            'SELECT COUNT(*) FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid '
+            f'WHERE search_fts MATCH ?{kind_clause}',
+            (match, *kind_params)
+        ).fetchone()[0]
+        return [(row['doc'], row['score']) for row in rows], total
+
+
+class SQLiteRollupStore(_SeededStore):
+    """Trace rollup buckets, merged in place; the first use rolls up every stored trace."""
+
+    meta_key = 'built:trace_rollups'
+
+    def _legacy_records(self):
+        return rollups.deltas(self.legacy.iter_records()).items()
+
+    def _put(self, conn, item):
+        (granularity, start, model), bucket = item
+        row = conn.execute(
+            'SELECT data FROM trace_rollups WHERE granularity = ? AND bucket_start = ? AND model = ?',
+            (granularity, start, model)
+        ).fetchone()
+        if row:
+            bucket = rollups.merge(json.loads(row['data']), bucket)
+        conn.execute(
+            'INSERT OR REPLACE INTO trace_rollups (granularity, bucket_start, model, data) VALUES (?, ?, ?, ?)',
+            (granularity, start, model, json.dumps(bucket))
+        )
+
+    def add(self, records):
+        updates = rollups.deltas(records)
+        if not updates:
+            return
+        conn = self._conn()
+        with conn:
+            # Read-modify-write: take the write lock before reading
+            conn.execute('BEGIN IMMEDIATE')
+            for item in updates.items():
+                self._put(conn, item)
+            conn.execute("DELETE FROM trace_rollups WHERE granularity = 'minute' AND bucket_start < ?",
+                         (rollups.minute_cutoff(),))
+
+    def rows(self, granularity, since=None, until=None, model=None):
+        """(start, model, bucket) rows for one granularity, oldest first."""
+        clauses, params = ['granularity = ?'], [granularity]
+        if granularity == 'minute':
+            since = max(since or 0, rollups.minute_cutoff())
+        if since is not None:
+            clauses.append('bucket_start >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('bucket_start < ?')
+            params.append(until)
+        if model:
+            clauses.append('model = ?')
+            params.append(model)
+        rows = self._conn().execute(
+            f"SELECT bucket_start, model, data FROM trace_rollups WHERE {' AND '.join(clauses)} "
+            'ORDER BY bucket_start, model',
+            params
+        ).fetchall()
+        return [(row['bucket_start'], row['model'], json.loads(row['data'])) for row in rows]
+
+
+class SQLiteGoldenStore(_SeededStore):
+    meta_key = 'imported:goldens'
+
+    def _legacy_records(self):
+        return self.legacy.list()
+
+    def list(self, tags=None):
+        conn = self._conn()
+        if tags:
+            placeholders = ','.join('?' for _ in tags)
+            rows = conn.execute(
+                'SELECT data FROM goldens WHERE id IN '
+                f'(SELECT golden_id FROM golden_tags WHERE tag IN ({placeholders})) ORDER BY seq',
+                list(tags)
+            ).fetchall()
+        else:
+            rows = conn.execute('SELECT data FROM goldens ORDER BY seq').fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def get(self, golden_id):
+        row = self._conn().execute('SELECT data FROM goldens WHERE id = ?', (golden_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def get_many(self, golden_ids, chunk_size=500):
+        """Stored goldens among golden_ids, in dataset order."""
+        conn = self._conn()
+        ids = list(dict.fromkeys(golden_ids))
+        rows = []
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            placeholders = ','.join('?' for _ in chunk)
+            rows += conn.execute(f'SELECT seq, data FROM goldens WHERE id IN ({placeholders})', chunk).fetchall()
+        return [json.loads(row['data']) for row in sorted(rows, key=lambda row: row['seq'])]
+
+    def _put(self, conn, record):
+        conn.execute(
+            'INSERT INTO goldens (id, data) VALUES (?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET data = excluded.data',
+            (record['id'], json.dumps(record))
+        )
+        conn.execute('DELETE FROM golden_tags WHERE golden_id = ?', (record['id'],))
+        conn.executemany(
+            'INSERT OR IGNORE INTO golden_tags (golden_id, tag) VALUES (?, ?)',
+            [(record['id'], tag) for tag in record.get('tags', [])]
+        )
+
+    def update(self, golden_id, apply):
+        return self._update('goldens', golden_id, apply)
+
+    def delete(self, golden_id):
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute('DELETE FROM goldens WHERE id = ?', (golden_id,))
+            conn.execute('DELETE FROM golden_tags WHERE golden_id = ?', (golden_id,))
+        return cursor.rowcount > 0
+
+
+class SQLiteResultStore:
+    def __init__(self, db):
+        self.db = db
+
+    def append(self, results, run_id=None):
+        conn = self.db.connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO eval_results (run_id, trace_id, golden_id, grader_name, passed, score, timestamp, '
+                'fingerprint, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, r.get('trace_id'), r.get('golden_id'), r.get('grader_name'),
+                  int(bool(r.get('passed'))), r.get('score'), r.get('timestamp'), r.get('fingerprint'),
+                  json.dumps({**r, 'run_id': run_id})) for r in results]
+            )
+
+    def list(self, run_id=None, trace_id=None, limit=100, offset=0):
+        """Return (results newest first, total count) matching the filters."""
+        clauses, params = [], []
+        if run_id:
+            clauses.append('run_id = ?')
+            params.append(run_id)
+        if trace_id:
+            clauses.append('trace_id = ?')
+            params.append(trace_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self.db.connect()
+        rows = conn.execute(
+            f'SELECT data FROM eval_results {where} ORDER BY seq DESC LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        total = conn.execute(f'SELECT COUNT(*) FROM eval_results {where}', params).fetchone()[0]
+        return [json.loads(row['data']) for row in rows], total
+
+    def changes(self, cursor=0):
+        """Results appended since cursor (a seq), as (new cursor, results)."""
+        rows = self.db.connect().execute(
+            'SELECT seq, data FROM eval_results WHERE seq > ? ORDER BY seq', (cursor,)
+        ).fetchall()
+        return (rows[-1]['seq'] if rows else cursor), [json.loads(row['data']) for row in rows]
+
+    def latest_by_fingerprint(self, fingerprints):
+        """Map each known fingerprint to the most recent result stored under it."""
+        fingerprints = list(set(fingerprints))
+        conn = self.db.connect()
+        latest = {}
+        for i in range(0, len(fingerprints), 500):
+            chunk = fingerprints[i:i + 500]
+            placeholders = ','.join('?' for _ in chunk)
+            rows = conn.execute(
+                'SELECT fingerprint, data FROM eval_results WHERE seq IN '
+                f'(SELECT MAX(seq) FROM eval_results WHERE fingerprint IN ({placeholders}) GROUP BY fingerprint)',
+                chunk
+            ).fetchall()
+            latest.update((row['fingerprint'], json.loads(row['data'])) for row in rows)
+        return latest
+
+
+class SQLiteRunStore:
+    """Eval run records plus the checkpointed events of each finished item."""
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def _record(row):
+        return {**json.loads(row['data']), 'owner': row['owner'], 'heartbeat': row['heartbeat']}
+
+    def put(self, record):
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'INSERT INTO eval_runs (id, kind, status, created_at, owner, heartbeat, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET status = excluded.status, owner = excluded.owner, '
+                'heartbeat = excluded.heartbeat, data = excluded.data',
+                (record['id'], record['kind'], record['status'], record['created_at'],
+                 record.get('owner'), record.get('heartbeat'), json.dumps(record))
+            )
+        return record
+
+    def get(self, run_id):
+        row = self.db.connect().execute('SELECT * FROM eval_runs WHERE id = ?', (run_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def list(self, status=None, limit=50, offset=0):
+        """Return (runs newest first, total count)."""
+        where, params = ('WHERE status = ?', [status]) if status else ('', [])
+        conn = self.db.connect()
+        rows = conn.execute(
+            f'SELECT * FROM eval_runs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        total = conn.execute(f'SELECT COUNT(*) FROM eval_runs {where}', params).fetchone()[0]
+        return [self._record(row) for row in rows], total
+
+    def claim(self, run_id, owner, now, stale_before):
+        """Take ownership of an unfinished run that nobody else is actively working on."""
+        conn = self.db.connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE eval_runs SET owner = ?, heartbeat = ? WHERE id = ? AND status IN ('queued', 'running') "
+                'AND (owner IS NULL OR owner = ? OR heartbeat IS NULL OR heartbeat < ?)',
+                (owner, now, run_id, owner, stale_before)
+            )
+        return self.get(run_id) if cursor.rowcount else None
+
+    def add_item(self, run_id, key, events):
+        conn = self.db.connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO eval_run_items (run_id, item_key, data) VALUES (?, ?, ?)',
+                (run_id, str(key), json.dumps({'key': key, 'events': events}))
+            )
+
+    def items(self, run_id):
+        rows = self.db.connect().execute(
+            'SELECT data FROM eval_run_items WHERE run_id = ? ORDER BY rowid', (run_id,)
+        ).fetchall()
+        return [json.loads(row['data']) for row in rows]
@@ -0,0 +1,22 @@
+import os
+
+DATA_DIR = os.environ.get('EVAL_DATA_DIR') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+
+# "file" (JSON/JSONL files under data/) or "sqlite"
+STORAGE_BACKEND = os.environ.get('EVAL_STORAGE_BACKEND', 'file').lower()
+DB_PATH = os.environ.get('EVAL_DB_PATH') or os.path.join(DATA_DIR, 'eval.db')
+
+_database = None
+
+
+def use_sqlite():
+    return STORAGE_BACKEND == 'sqlite'
+
+
+def get_database():
+    """Return the shared SQLite database, creating it on first use."""
+    global _database
+    if _database is None:
+        from .sqlite_store import Database
+        _database = Database(DB_PATH)
+    return _database
@@ -0,0 +1,141 @@
+"""Local OpenAI-compatible stand-in for the Groq chat completions API.
+
+Run with:  python -m eval.stub_server --port 8001 --latency-ms 300 --error-rate 0.05
+then point the backend at it with GROQ_API_URL=http://localhost:8001/openai/v1/chat/completions
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+
+from flask import Flask, Response, request, jsonify
+
+TRIGGER_KEYWORDS = [
+    ('schedule', ('every', 'daily', 'weekly', 'hourly', 'morning', 'night', 'schedule')),
+    ('webhook', ('when', 'webhook', 'whenever', 'new ', 'receive')),
+]
+STEP_KEYWORDS = [
+    ('filter', ('filter', 'if ', 'only', 'priority', 'check')),
+    ('http_request', ('api', 'http', 'fetch', 'lookup', 'sync')),
+    ('delay', ('wait', 'delay', 'after')),
+    ('email', ('email', 'mail')),
+    ('slack_message', ('slack', 'notify', 'alert')),
+]
+
+
+def _workflow_for(message):
+    """Deterministic, schema-valid workflow derived from keywords in the prompt."""
+    text = message.lower()
+    trigger = next((t for t, words in TRIGGER_KEYWORDS if any(w in text for w in words)), 'manual')
+    types = [t for t, words in STEP_KEYWORDS if any(w in text for w in words)] or ['http_request']
+    steps = [
+        {'id': f'step{i}', 'type': t, 'name': f'{t.replace("_", " ").title()} step', 'config': {}, 'steps': []}
+        for i, t in enumerate(types, start=1)
+    ]
+    if len(steps) > 2:
+        steps = [{'id': 'step1', 'type': 'sub_workflow', 'name': 'Main phase', 'config': {}, 'steps': steps}]
+    return {'name': message[:40].strip().title() or 'Workflow', 'trigger': {'type': trigger, 'config': {}},
+            'steps': steps}
+
+
+def _judge_verdict(prompt):
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    keys = ['intent_match', 'step_completeness', 'step_types', 'trigger_match', 'structure']
+    scores = {k: 1 if digest[i] % 5 else 0 for i, k in enumerate(keys)}
+    return {'scores': scores, 'reasoning': 'Stub judge verdict'}
+
+
+def _content_for(messages):
+    user = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+    if user.startswith('You are evaluating'):
+        return _judge_verdict(user)
+    if user.startswith('Generate ') and 'workflow examples' in user:
+        return {'examples': [
+            {'user_message': 'Send a Slack alert every morning', 'expected_workflow': _workflow_for('slack every morning'),
+             'tags': ['simple']},
+        ]}
+    return _workflow_for(user)
+
+
+def _stream_chunks(completion_id, model, content, usage, delay, chunk_chars=16):
+    """Groq-style SSE chunks for content, spreading the latency over the chunks."""
+    pieces = [content[i:i + chunk_chars] for i in range(0, len(content), chunk_chars)]
+    base = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model}
+    for i, piece in enumerate(pieces):
+        time.sleep(delay / len(pieces))
+        delta = {'role': 'assistant', 'content': piece} if i == 0 else {'content': piece}
+        yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+    final = {**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'x_groq': {'usage': usage}}
+    yield f'data: {json.dumps(final)}\n\n'
+    yield 'data: [DONE]\n\n'
+
+
+def create_app(latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+    app = Flask(__name__)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    counters = {'requests': 0, 'errors': 0}
+
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.json or {}
+        with rng_lock:
+            counters['requests'] += 1
+            delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+            fail = rng.random() < error_rate
+            status = rng.choice([429, 500, 503])
+        stream = bool(body.get('stream'))
+        if not stream or fail:
+            time.sleep(delay)
+        if fail:
+            with rng_lock:
+                counters['errors'] += 1
+            response = jsonify({'error': {'message': 'Injected stub error', 'type': 'stub_error'}})
+            response.status_code = status
+            if status == 429:
+                response.headers['retry-after'] = '0'
+            return response
+
+        messages = body.get('messages', [])
+        content = json.dumps(_content_for(messages))
+        prompt_tokens = sum(len(m.get('content') or '') for m in messages) // 4
+        completion_tokens = len(content) // 4
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+        if stream:
+            return Response(_stream_chunks(f'stub-{counters["requests"]}', body.get('model', 'stub'), content,
+                                           usage, delay), mimetype='text/event-stream')
+        return jsonify({
+            'id': f'stub-{counters["requests"]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': usage
+        })
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify(counters)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible Groq stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from .locking import FileLock
+
+# Records per gzip member: the unit a lookup has to decompress
+MEMBER_RECORDS = 256
+# Decompressed members kept in memory for repeated lookups
+CACHED_MEMBERS = 8
+
+
+class TraceArchive:
+    """Expired trace records in gzip-compressed JSONL files, still readable by id.
+
+    Each archive file is a series of gzip members (a valid .jsonl.gz for
+    zcat and friends); index.jsonl maps ids to (file, member offset, member
+    length), so a lookup decompresses one member instead of the whole file.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._lock = threading.Lock()
+        self._index_lock = FileLock(os.path.join(root, 'index.lock'))
+        self._locations = {}
+        self._index_pos = 0
+        self._members = OrderedDict()
+
+    def _refresh(self):
+        try:
+            f = open(self.index_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._index_pos += len(line)
+                entry = json.loads(line)
+                if entry['op'] == 'put':
+                    self._locations[entry['id']] = (entry['file'], entry['offset'], entry['length'])
+                else:
+                    self._locations.pop(entry['id'], None)
+
+    def _append_index(self, entries):
+        with self._index_lock, open(self.index_path, 'ab') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8'))
+
+    def add(self, records):
+        """Write records to a new archive file; returns its name (None if there was nothing to write)."""
+        if not records:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        name = f'archive-{stamp}-{uuid.uuid4().hex[:6]}.jsonl.gz'
+        entries, offset = [], 0
+        with open(os.path.join(self.root, name), 'wb') as f:
+            for i in range(0, len(records), MEMBER_RECORDS):
+                batch = records[i:i + MEMBER_RECORDS]
+                data = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in batch).encode('utf-8')
+                member = gzip.compress(data)
+                f.write(member)
+                entries += [{'op': 'put', 'id': r['id'], 'file': name, 'offset': offset, 'length': len(member)}
+                            for r in batch]
+                offset += len(member)
+            f.flush()
+            os.fsync(f.fileno())
+        # Index only after the archive is on disk, so an id never points at missing data
+        with self._lock:
+            self._append_index(entries)
+        return name
+
+    def _member(self, location):
+        member = self._members.get(location)
+        if member is None:
+            name, offset, length = location
+            with open(os.path.join(self.root, name), 'rb') as f:
+                f.seek(offset)
+                lines = gzip.decompress(f.read(length)).splitlines()
+            member = {}
+            for line in lines:
+                record = json.loads(line)
+                member[record['id']] = record
+            self._members[location] = member
+            while len(self._members) > CACHED_MEMBERS:
+                self._members.popitem(last=False)
+        else:
+            self._members.move_to_end(location)
+        return member
+
+    def get(self, record_id):
+        with self._lock:
+            location = self._locations.get(record_id)
+            if location is None:
+                self._refresh()
+                location = self._locations.get(record_id)
+            if location is None:
+                return None
+            record = self._member(location).get(record_id)
+        return dict(record) if record else None
+
+    def delete(self, record_id):
+        with self._lock, self._index_lock:
+            self._refresh()
+            if record_id not in self._locations:
+                return False
+            self._append_index([{'op': 'del', 'id': record_id}])
+            self._locations.pop(record_id)
+        return True
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            names = {name for name, _, _ in self._locations.values()}
+            count = len(self._locations)
+        disk_bytes = sum(os.path.getsize(os.path.join(self.root, name)) for name in names)
+        return {'count': count, 'files': len(names), 'disk_bytes': disk_bytes}
@@ -0,0 +1,136 @@
+"""In-memory secondary indexes for filtered, keyset-paginated trace listing.
+
+Traces are keyed by (timestamp, id) and listed newest first. Every
+equality filter (model, parse_success, has_error, verdict) keeps a sorted
+key list per value and latency keeps a sorted (latency_ms, key) list, so a
+page starts from the smallest matching index, bisects to the cursor and
+checks the remaining filters only on the entries it walks.
+"""
+import bisect
+
+# Per-trace index fields, in tuple order
+FIELDS = ('timestamp', 'model', 'parse_success', 'has_error', 'verdict', 'latency_ms')
+EQUALITY_FIELDS = ('model', 'parse_success', 'has_error', 'verdict')
+
+_POSITION = {name: i for i, name in enumerate(FIELDS)}
+
+
+def index_fields(record):
+    """The indexed fields of a trace record, as a tuple in FIELDS order."""
+    annotations = record.get('annotations') or []
+    return (
+        record.get('timestamp') or '',
+        record.get('model'),
+        bool(record.get('parse_success')),
+        bool(record.get('error')),
+        annotations[-1].get('verdict') if annotations else None,
+        record.get('latency_ms') or 0,
+    )
+
+
+def matches(fields, filters):
+    """Whether index fields satisfy normalized filters (see traces.query_traces)."""
+    for name in EQUALITY_FIELDS:
+        if name in filters and fields[_POSITION[name]] != filters[name]:
+            return False
+    latency = fields[_POSITION['latency_ms']]
+    if 'min_latency_ms' in filters and latency < filters['min_latency_ms']:
+        return False
+    if 'max_latency_ms' in filters and latency > filters['max_latency_ms']:
+        return False
+    timestamp = fields[0]
+    if 'since' in filters and timestamp < filters['since']:
+        return False
+    if 'until' in filters and timestamp >= filters['until']:
+        return False
+    return True
+
+
+def _remove(items, item):
+    i = bisect.bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+
+class TraceIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.fields = {}  # id -> index fields
+        self.keys = []  # sorted (timestamp, id)
+        self.by_value = {name: {} for name in EQUALITY_FIELDS}  # field -> value -> sorted keys
+        self.latency = []  # sorted (latency_ms, (timestamp, id))
+
+    def add(self, record_id, fields):
+        if record_id in self.fields:
+            if self.fields[record_id] == fields:
+                return
+            self.remove(record_id)
+        self.fields[record_id] = fields
+        key = (fields[0], record_id)
+        bisect.insort(self.keys, key)
+        for name in EQUALITY_FIELDS:
+            bisect.insort(self.by_value[name].setdefault(fields[_POSITION[name]], []), key)
+        bisect.insort(self.latency, (fields[_POSITION['latency_ms']], key))
+
+    def remove(self, record_id):
+        fields = self.fields.pop(record_id, None)
+        if fields is None:
+            return
+        key = (fields[0], record_id)
+        _remove(self.keys, key)
+        for name in EQUALITY_FIELDS:
+            _remove(self.by_value[name].get(fields[_POSITION[name]], []), key)
+        _remove(self.latency, (fields[_POSITION['latency_ms']], key))
+
+    def __len__(self):
+        return len(self.fields)
+
+    @staticmethod
+    def _window(keys, filters, cursor):
+        lo = bisect.bisect_left(keys, (filters['since'],)) if 'since' in filters else 0
+        hi = bisect.bisect_left(keys, (filters['until'],)) if 'until' in filters else len(keys)
+        if cursor is not None:
+            hi = min(hi, bisect.bisect_left(keys, cursor))
+        return lo, hi
+
+    def _candidates(self, filters, cursor=None):
+        """(sorted keys, lo, hi): the smallest index range that holds every match before cursor."""
+        best, lo, hi = self.keys, *self._window(self.keys, filters, cursor)
+        for name in EQUALITY_FIELDS:
+            if name in filters:
+                keys = self.by_value[name].get(filters[name], [])
+                window = self._window(keys, filters, cursor)
+                if window[1] - window[0] < hi - lo:
+                    best, (lo, hi) = keys, window
+        if 'min_latency_ms' in filters or 'max_latency_ms' in filters:
+            start = bisect.bisect_left(self.latency, (filters.get('min_latency_ms', float('-inf')),))
+            end = bisect.bisect_left(self.latency, (filters.get('max_latency_ms', float('inf')), (chr(0x10FFFF),)))
+            if end - start < hi - lo:
+                best = sorted(key for _, key in self.latency[start:end])
+                lo, hi = self._window(best, filters, cursor)
+        return best, lo, hi
+
+    def query(self, filters, cursor=None, limit=50):
+        """Ids of up to limit matching traces before cursor, newest first, and the next cursor."""
+        best, lo, hi = self._candidates(filters, cursor)
+        ids = []
+        for i in range(hi - 1, lo - 1, -1):
+            key = best[i]
+            if matches(self.fields[key[1]], filters):
+                ids.append(key[1])
+                if len(ids) > limit:
+                    break
+        if len(ids) > limit:
+            ids = ids[:limit]
+            last = self.fields[ids[-1]]
+            return ids, (last[0], ids[-1])
+        return ids, None
+
+    def count(self, filters):
+        """How many traces match filters."""
+        best, lo, hi = self._candidates(filters)
+        if set(filters) <= {'since', 'until'}:
+            return hi - lo
+        return sum(1 for i in range(lo, hi) if matches(self.fields[best[i][1]], filters))
@@ -0,0 +1,455 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+from .json_store import CorruptFileError
+from .locking import FileLock, atomic_write
+from .trace_index import TraceIndex
+
+SEGMENT_MAX_BYTES = int(os.environ.get('TRACE_SEGMENT_MAX_BYTES', 8 * 1024 * 1024))
+# Each process appends to its own segments instead of taking turns on a shared one
+WORKER_SEGMENTS = os.environ.get('TRACE_WORKER_SEGMENTS', '0') != '0'
+
+
+def _segment_name(number):
+    # Shared segments are numbered; worker segments are named '<time_ns>-<pid>'
+    return f'segment-{number:06d}.jsonl' if isinstance(number, int) else f'segment-{number}.jsonl'
+
+
+class TraceLog:
+    """Append-only JSONL segments with a persistent id -> (segment, offset) index.
+
+    Every write appends one line to the active segment and one line to
+    index.jsonl. Re-writing an existing id (e.g. adding an annotation) keeps
+    its original position in the listing order; deletes are tombstones.
+    compact() rewrites the live records into fresh segments and a new index;
+    readers in other processes notice the new index and reload.
+
+    With fields (record -> tuple, see trace_index.index_fields) each index
+    entry also carries the record's filter fields, kept in a TraceIndex
+    for query().
+
+    Writers in different processes are serialized by an flock on
+    write.lock. With worker_segments, appends only take it shared: each
+    process writes its own segments and holds index.lock just long enough
+    to append its index lines, while update() and compact() still take
+    write.lock exclusively.
+    """
+
+    def __init__(self, root, legacy_file=None, fields=None, worker_segments=WORKER_SEGMENTS):
+        self.root = root
+        self.legacy_file = legacy_file
+        self.fields = fields
+        self.worker_segments = worker_segments
+        self._index = TraceIndex() if fields else None
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self._lock = threading.RLock()
+        self._write_lock = FileLock(os.path.join(root, 'write.lock'))
+        if worker_segments:
+            self._append_lock = FileLock(os.path.join(root, 'write.lock'), shared=True)
+            self._index_lock = FileLock(os.path.join(root, 'index.lock'))
+        else:
+            self._append_lock = self._write_lock
+            self._index_lock = contextlib.nullcontext()
+        # Insertion-ordered, oldest first: id -> (segment, offset, length)
+        self._locations = {}
+        self._index_pos = 0
+        self._index_inode = None
+        self._active_segment = None
+        self._worker_segment = None  # (pid, segment) this process appends to
+        self._opened = False
+
+    # --- Setup ---
+
+    def _open(self):
+        if self._opened:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with self._write_lock:
+            segments = self._segment_numbers()
+            self._active_segment = self._last_shared(segments)
+            self._opened = True
+            if not os.path.exists(self.index_path):
+                if segments:
+                    self._rebuild_index(segments)
+                else:
+                    open(self.index_path, 'a').close()
+                    self._migrate_legacy()
+        self._refresh()
+
+    def _segment_numbers(self):
+        """Shared segment numbers in order, then worker segment names in creation order."""
+        numbers, names = [], []
+        for name in os.listdir(self.root):
+            if name.startswith('segment-') and name.endswith('.jsonl'):
+                stem = name[len('segment-'):-len('.jsonl')]
+                if stem.isdigit():
+                    numbers.append(int(stem))
+                else:
+                    names.append(stem)
+        return sorted(numbers) + sorted(names)
+
+    @staticmethod
+    def _last_shared(segments):
+        numbers = [n for n in segments if isinstance(n, int)]
+        return numbers[-1] if numbers else 1
+
+    def _segment_path(self, number):
+        return os.path.join(self.root, _segment_name(number))
+
+    def _migrate_legacy(self):
+        """Import a pre-existing traces.json (newest first) into the log."""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy = json.load(f)
+        except json.JSONDecodeError as e:
+            raise CorruptFileError(f'{self.legacy_file} is not valid JSON ({e}); restore it from a backup') from e
+        records = [r for r in reversed(legacy) if isinstance(r, dict) and r.get('id')]
+        if records:
+            self._append_many(records)
+        os.replace(self.legacy_file, self.legacy_file + '.migrated')
+
+    def _rebuild_index(self, segments):
+        """Recreate index.jsonl by scanning every segment in order.
+
+        Worker segments are scanned one after another, so an id rewritten by
+        several workers keeps the version from the newest segment, not
+        necessarily the last write.
+        """
+        entries = []
+        for number in segments:
+            with open(self._segment_path(number), 'rb') as f:
+                offset = 0
+                for line in f:
+                    if line.endswith(b'\n'):
+                        record = json.loads(line)
+                        if record.get('_deleted'):
+                            entries.append({'op': 'del', 'id': record['id']})
+                        else:
+                            entries.append(self._put_entry(record, number, offset, len(line)))
+                    offset += len(line)
+        atomic_write(self.index_path, ''.join(json.dumps(entry) + '\n' for entry in entries))
+
+    def _refresh(self):
+        """Apply index entries written since the last refresh (possibly by another process)."""
+        stat = os.stat(self.index_path)
+        if stat.st_ino != self._index_inode or stat.st_size < self._index_pos:
+            if self._index_inode is not None:
+                # Replaced by a compaction: reload from the new index
+                self._locations = {}
+                self._index_pos = 0
+                if self._index is not None:
+                    self._index.clear()
+                self._active_segment = self._last_shared(self._segment_numbers())
+                self._worker_segment = None
+            self._index_inode = stat.st_ino
+        size = stat.st_size
+        if size == self._index_pos:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # partially written entry, pick it up next time
+                self._index_pos += len(line)
+                self._apply(json.loads(line))
+
+    def _put_entry(self, record, segment, offset, length):
+        entry = {'op': 'put', 'id': record['id'], 'segment': segment, 'offset': offset, 'length': length}
+        if self.fields:
+            entry['f'] = self.fields(record)
+        return entry
+
+    def _apply(self, entry):
+        if entry['op'] == 'put':
+            location = (entry['segment'], entry['offset'], entry['length'])
+            self._locations[entry['id']] = location
+            if self._index is not None:
+                fields = entry.get('f')
+                if fields is None:
+                    # Written before fields were indexed: read the record once
+                    try:
+                        fields = self.fields(self._read(location))
+                    except FileNotFoundError:
+                        return
+                self._index.add(entry['id'], tuple(fields))
+        elif entry['op'] == 'del':
+            self._locations.pop(entry['id'], None)
+            if self._index is not None:
+                self._index.remove(entry['id'])
+
+    # --- Low-level writes ---
+
+    def _write_segment(self, line):
+        if self.worker_segments:
+            return self._write_worker_segment(line)
+        path = self._segment_path(self._active_segment)
+        if os.path.exists(path) and os.path.getsize(path) >= SEGMENT_MAX_BYTES:
+            self._active_segment += 1
+            path = self._segment_path(self._active_segment)
+        with open(path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+        return self._active_segment, offset
+
+    def _write_worker_segment(self, line):
+        pid = os.getpid()
+        if self._worker_segment is None or self._worker_segment[0] != pid:
+            self._worker_segment = (pid, f'{time.time_ns()}-{pid}')
+        path = self._segment_path(self._worker_segment[1])
+        if os.path.exists(path) and os.path.getsize(path) >= SEGMENT_MAX_BYTES:
+            self._worker_segment = (pid, f'{time.time_ns()}-{pid}')
+            path = self._segment_path(self._worker_segment[1])
+        with open(path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+        return self._worker_segment[1], offset
+
+    def _write_index(self, entries):
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+        with self._index_lock:
+            # Other workers may have appended since our last refresh
+            self._refresh()
+            with open(self.index_path, 'ab') as f:
+                f.write(data)
+            self._index_pos += len(data)
+        for entry in entries:
+            self._apply(entry)
+
+    def _append(self, record):
+        self._append_many([record])
+
+    def _append_many(self, records):
+        lines = [(json.dumps(r, separators=(',', ':')) + '\n').encode('utf-8') for r in records]
+        segment, offset = self._write_segment(b''.join(lines))
+        entries = []
+        for record, line in zip(records, lines):
+            entries.append(self._put_entry(record, segment, offset, len(line)))
+            offset += len(line)
+        self._write_index(entries)
+
+    def _read_line(self, location):
+        segment, offset, length = location
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _read(self, location):
+        return json.loads(self._read_line(location))
+
+    def _read_id(self, record_id, location):
+        """Read a record, following it to its new location if a compaction moved it."""
+        try:
+            return self._read(location)
+        except FileNotFoundError:
+            with self._lock:
+                self._refresh()
+                location = self._locations.get(record_id)
+            return self._read(location) if location else None
+
+    # --- Public API ---
+
+    def put(self, record):
+        """Append a record; an existing id keeps its position in the listing."""
+        with self._lock:
+            self._open()
+            with self._append_lock:
+                self._refresh()
+                self._append(record)
+        return record
+
+    def put_many(self, records):
+        """Append several records with one write per file."""
+        if not records:
+            return records
+        with self._lock:
+            self._open()
+            with self._append_lock:
+                self._refresh()
+                self._append_many(records)
+        return records
+
+    def update(self, record_id, apply):
+        """Apply apply(record) to a record and append the result, atomically across processes.
+
+        Returns the updated record, or None if the id doesn't exist.
+        """
+        with self._lock:
+            self._open()
+            with self._write_lock:
+                self._refresh()
+                location = self._locations.get(record_id)
+                if location is None:
+                    return None
+                record = self._read(location)
+                apply(record)
+                self._append(record)
+        return record
+
+    def get(self, record_id):
+        with self._lock:
+            self._open()
+            self._refresh()
+            location = self._locations.get(record_id)
+        if location is None:
+            return None
+        return self._read_id(record_id, location)
+
+    def delete(self, record_id):
+        with self._lock:
+            self._open()
+            with self._append_lock:
+                self._refresh()
+                if record_id not in self._locations:
+                    return False
+                line = (json.dumps({'id': record_id, '_deleted': True}) + '\n').encode('utf-8')
+                self._write_segment(line)
+                self._write_index([{'op': 'del', 'id': record_id}])
+        return True
+
+    def delete_many(self, record_ids):
+        """Tombstone several ids with one write per file; returns how many existed."""
+        with self._lock:
+            self._open()
+            with self._append_lock:
+                self._refresh()
+                existing = [record_id for record_id in dict.fromkeys(record_ids) if record_id in self._locations]
+                if existing:
+                    lines = b''.join((json.dumps({'id': record_id, '_deleted': True}) + '\n').encode('utf-8')
+                                     for record_id in existing)
+                    self._write_segment(lines)
+                    self._write_index([{'op': 'del', 'id': record_id} for record_id in existing])
+        return len(existing)
+
+    def list(self, limit=50, offset=0):
+        """Return (records newest first, total count)."""
+        with self._lock:
+            self._open()
+            self._refresh()
+            total = len(self._locations)
+            page = []
+            for i, record_id in enumerate(reversed(self._locations)):
+                if i >= offset + limit:
+                    break
+                if i >= offset:
+                    page.append((record_id, self._locations[record_id]))
+        records = [self._read_id(record_id, location) for record_id, location in page]
+        return [r for r in records if r is not None], total
+
+    def query(self, filters, cursor=None, limit=50):
+        """(records newest first by (timestamp, id), next cursor) matching filters; see TraceIndex.query."""
+        with self._lock:
+            self._open()
+            self._refresh()
+            ids, next_cursor = self._index.query(filters, cursor=cursor, limit=limit)
+            page = [(record_id, self._locations[record_id]) for record_id in ids]
+        records = [self._read_id(record_id, location) for record_id, location in page]
+        return [r for r in records if r is not None], next_cursor
+
+    def count(self, filters):
+        """How many live records match filters; see TraceIndex.count."""
+        with self._lock:
+            self._open()
+            self._refresh()
+            return self._index.count(filters)
+
+    def iter_records(self):
+        """Yield every live record, oldest first."""
+        with self._lock:
+            self._open()
+            self._refresh()
+            locations = list(self._locations.items())
+        for record_id, location in locations:
+            record = self._read_id(record_id, location)
+            if record is not None:
+                yield record
+
+    def changes(self, cursor=0):
+        """Records written and ids deleted since cursor ((index inode, byte offset) from a previous call).
+
+        Returns (new cursor, records, deleted ids, live count); each id
+        appears once, in its latest state. Cursor 0 replays the whole log,
+        as does a cursor from before a compaction.
+        """
+        with self._lock:
+            self._open()
+            self._refresh()
+            inode, pos = cursor if cursor else (self._index_inode, 0)
+            if inode != self._index_inode or pos > self._index_pos:
+                pos = 0  # index was rebuilt or compacted
+            latest = {}
+            with open(self.index_path, 'rb') as f:
+                f.seek(pos)
+                data = f.read(self._index_pos - pos)
+            for line in data.splitlines():
+                entry = json.loads(line)
+                latest.pop(entry['id'], None)
+                if entry['op'] == 'put':
+                    latest[entry['id']] = (entry['segment'], entry['offset'], entry['length'])
+                else:
+                    latest[entry['id']] = None
+            total = len(self._locations)
+            cursor = (self._index_inode, self._index_pos)
+        records = [self._read_id(record_id, location) for record_id, location in latest.items() if location]
+        deleted = [record_id for record_id, location in latest.items() if location is None]
+        return cursor, [r for r in records if r is not None], deleted, total
+
+    def stats(self):
+        """Live record count and bytes, and bytes on disk (superseded versions and tombstones included)."""
+        with self._lock:
+            self._open()
+            self._refresh()
+            live_bytes = sum(length for _, _, length in self._locations.values())
+            count = len(self._locations)
+            disk_bytes = sum(os.path.getsize(self._segment_path(n)) for n in self._segment_numbers())
+        return {'count': count, 'live_bytes': live_bytes, 'disk_bytes': disk_bytes,
+                'garbage_bytes': disk_bytes - live_bytes}
+
+    def compact(self):
+        """Rewrite live records into new segments, in listing order; returns bytes reclaimed."""
+        with self._lock:
+            self._open()
+            with self._write_lock:
+                self._refresh()
+                old_segments = self._segment_numbers()
+                before = sum(os.path.getsize(self._segment_path(n)) for n in old_segments)
+                number = max((n for n in old_segments if isinstance(n, int)), default=0) + 1
+                entries, handles = [], {}
+                out, size = open(self._segment_path(number), 'wb'), 0
+                try:
+                    for record_id, (segment, offset, length) in self._locations.items():
+                        if segment not in handles:
+                            handles[segment] = open(self._segment_path(segment), 'rb')
+                        handles[segment].seek(offset)
+                        line = handles[segment].read(length)
+                        if size and size + length > SEGMENT_MAX_BYTES:
+                            out.close()
+                            number += 1
+                            out, size = open(self._segment_path(number), 'wb'), 0
+                        out.write(line)
+                        entry = {'op': 'put', 'id': record_id, 'segment': number, 'offset': size, 'length': length}
+                        if self._index is not None and record_id in self._index.fields:
+                            entry['f'] = self._index.fields[record_id]
+                        entries.append(entry)
+                        size += length
+                finally:
+                    out.close()
+                    for handle in handles.values():
+                        handle.close()
+
+                atomic_write(self.index_path, ''.join(json.dumps(entry) + '\n' for entry in entries))
+                for n in old_segments:
+                    os.remove(self._segment_path(n))
+                self._refresh()
+                after = sum(os.path.getsize(self._segment_path(n)) for n in self._segment_numbers())
+        return before - after
+
+    def __len__(self):
+        with self._lock:
+            self._open()
+            self._refresh()
+            return len(self._locations)
@@ -0,0 +1,139 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.environ.get('TRACE_WRITER_QUEUE_SIZE', 1000))
+BATCH_SIZE = int(os.environ.get('TRACE_WRITER_BATCH_SIZE', 50))
+FLUSH_INTERVAL = float(os.environ.get('TRACE_WRITER_FLUSH_INTERVAL', 1.0))
+
+
+class TraceWriter:
+    """Bounded write-behind queue that persists traces in batches on a background thread.
+
+    A batch is written once it reaches batch_size or flush_interval seconds
+    after its first trace arrived. When the queue is full new traces are
+    dropped (and counted) rather than blocking the request thread.
+    """
+
+    def __init__(self, write_batch, max_queue=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        self._write_batch = write_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, trace):
+        """Queue a trace for writing. Returns False if it was dropped."""
+        if self._closed.is_set():
+            self._count('dropped')
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('submitted')
+        return True
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._closed.is_set() else deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+            elif self._closed.is_set():
+                return
+
+    def _write(self, batch):
+        try:
+            self._write_batch(batch)
+            self._count('written', len(batch))
+            self._count('batches')
+        except Exception:
+            logger.exception('Failed to write %d traces', len(batch))
+            self._count('failed', len(batch))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued trace has been written (or failed)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self, timeout=10):
+        """Stop accepting traces and drain the queue."""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self):
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'submitted': self.submitted,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches,
+            }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the process-wide trace writer, flushed at interpreter exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from .traces import save_traces
+                _writer = TraceWriter(save_traces)
+                atexit.register(_writer.close)
+    return _writer
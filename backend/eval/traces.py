@@ -1,82 +1,227 @@
+import base64
 import json
 import os
-import re
+from datetime import datetime, timezone
 from .models import Trace, Annotation
-
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+from .trace_log import TraceLog
+from .trace_archive import TraceArchive
+from .trace_index import index_fields
+from .json_store import JSONLBlobStore
+from .interning import compact_many, hydrate
+from .workflow_parser import extract_workflow
+from .rollups import FileRollupStore, GRANULARITIES, query as query_rollups
+from .storage import DATA_DIR, use_sqlite, get_database
+from . import search
+
+TRACES_DIR = os.path.join(DATA_DIR, 'traces')
+# Legacy single-file store, imported into TRACES_DIR on first use
 TRACES_FILE = os.path.join(DATA_DIR, 'traces.json')
 
+BLOBS_FILE = os.path.join(TRACES_DIR, 'blobs.jsonl')
+ARCHIVE_DIR = os.path.join(TRACES_DIR, 'archive')
 
-def _ensure_data_dir():
-    os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(TRACES_FILE):
-        with open(TRACES_FILE, 'w') as f:
-            json.dump([], f)
-
+if use_sqlite():
+    from .sqlite_store import SQLiteTraceStore, SQLiteRollupStore, SQLiteBlobStore
+    _store = SQLiteTraceStore(get_database(), legacy=TraceLog(TRACES_DIR, legacy_file=TRACES_FILE))
+    _rollups = SQLiteRollupStore(get_database(), legacy=_store)
+    _blobs = SQLiteBlobStore(get_database(), legacy=JSONLBlobStore(BLOBS_FILE))
+else:
+    _store = TraceLog(TRACES_DIR, legacy_file=TRACES_FILE, fields=index_fields)
+    _rollups = FileRollupStore(os.path.join(TRACES_DIR, 'rollups.jsonl'), source=_store.iter_records)
+    _blobs = JSONLBlobStore(BLOBS_FILE)
 
-def _load_traces():
-    _ensure_data_dir()
-    try:
-        with open(TRACES_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+# Expired traces, shared by both backends
+_archive = TraceArchive(ARCHIVE_DIR)
 
 
-def _save_traces(traces):
-    _ensure_data_dir()
-    with open(TRACES_FILE, 'w') as f:
-        json.dump(traces, f, indent=2)
+def _hydrate(record):
+    return hydrate(record, _blobs)
 
 
 def save_trace(trace: Trace):
-    traces = _load_traces()
-    traces.insert(0, trace.to_dict())
-    _save_traces(traces)
+    record = trace.to_dict()
+    # Roll up first: a first-ever rollup is built from the stored traces, which must not include this one yet
+    _rollups.add([record])
+    _store.put(compact_many([record], _blobs)[0])
+    search.index_records('trace', [record])
     return trace
 
 
+def save_traces(trace_list):
+    """Persist several traces in one write (used by the background trace writer)."""
+    records = [t.to_dict() for t in trace_list]
+    _rollups.add(records)
+    _store.put_many(compact_many(records, _blobs))
+    search.index_records('trace', records)
+    return trace_list
+
+
 def get_traces(limit=50, offset=0):
-    traces = _load_traces()
-    return traces[offset:offset + limit], len(traces)
+    records, total = _store.list(limit=limit, offset=offset)
+    return [_hydrate(r) for r in records], total
+
+
+def _parse_bool(name, value):
+    lowered = str(value).lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+
+def _parse_number(name, value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+
+
+def _parse_time(name, value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an ISO timestamp')
+    # Stored timestamps are UTC isoformat strings, which compare in time order
+    return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).astimezone(timezone.utc).isoformat()
+
+
+def epoch_seconds(name, value):
+    """Epoch seconds of an ISO timestamp query parameter; naive ones are UTC. Raises ValueError."""
+    return datetime.fromisoformat(_parse_time(name, value)).timestamp()
+
+
+def _encode_cursor(cursor):
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        timestamp, trace_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, UnicodeEncodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(timestamp, str) or not isinstance(trace_id, str):
+        raise ValueError('invalid cursor')
+    return timestamp, trace_id
+
+
+def query_traces(limit=50, cursor=None, model=None, parse_success=None, has_error=None, verdict=None,
+                 min_latency_ms=None, max_latency_ms=None, since=None, until=None):
+    """One page of traces, newest first, as (traces, next cursor or None, total matching). Raises ValueError.
+
+    Filters are strings as they arrive in a query string; verdict 'none'
+    matches unannotated traces, since/until are ISO timestamps (until
+    exclusive). Pass the returned cursor back for the next page: pages
+    stay stable while new traces arrive. The total counts every trace the
+    filters match, on all pages.
+    """
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    filters = {}
+    if model:
+        filters['model'] = model
+    if parse_success is not None:
+        filters['parse_success'] = _parse_bool('parse_success', parse_success)
+    if has_error is not None:
+        filters['has_error'] = _parse_bool('has_error', has_error)
+    if verdict:
+        filters['verdict'] = None if verdict == 'none' else verdict
+    if min_latency_ms is not None:
+        filters['min_latency_ms'] = _parse_number('min_latency_ms', min_latency_ms)
+    if max_latency_ms is not None:
+        filters['max_latency_ms'] = _parse_number('max_latency_ms', max_latency_ms)
+    if since:
+        filters['since'] = _parse_time('since', since)
+    if until:
+        filters['until'] = _parse_time('until', until)
+    records, next_cursor = _store.query(filters, cursor=_decode_cursor(cursor) if cursor else None, limit=limit)
+    total = _store.count(filters) if filters else len(_store)
+    return [_hydrate(r) for r in records], _encode_cursor(next_cursor), total
 
 
 def get_trace(trace_id: str):
-    traces = _load_traces()
-    for t in traces:
-        if t['id'] == trace_id:
-            return t
-    return None
+    record = _store.get(trace_id)
+    if record is None:
+        record = _archive.get(trace_id)
+        if record is not None:
+            record['archived'] = True
+    return _hydrate(record)
+
+
+def iter_traces():
+    """Yield every stored trace, oldest first."""
+    return map(_hydrate, _store.iter_records())
+
+
+def iter_trace_meta():
+    """Yield (id, timestamp, stored size in bytes, annotated) for every stored trace, oldest first."""
+    for record in _store.iter_records():
+        size = len(json.dumps(record, separators=(',', ':')))
+        yield record['id'], record.get('timestamp'), size, bool(record.get('annotations'))
+
+
+def get_trace_changes(cursor=0):
+    """(cursor, records, deleted ids, live count) for traces written since cursor; see TraceLog.changes."""
+    cursor, records, deleted, total = _store.changes(cursor)
+    return cursor, [_hydrate(r) for r in records], deleted, total
+
+
+def get_rollups(granularity='hour', since=None, until=None, model=None, by_model=True):
+    """Write-time trace rollup buckets between ISO timestamps since/until. Raises ValueError."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    since = epoch_seconds('since', since) if since else None
+    until = epoch_seconds('until', until) if until else None
+    return query_rollups(_rollups.rows(granularity, since=since, until=until, model=model), by_model=by_model)
 
 
 def delete_trace(trace_id: str):
-    traces = _load_traces()
-    traces = [t for t in traces if t['id'] != trace_id]
-    _save_traces(traces)
+    _store.delete(trace_id)
+    _archive.delete(trace_id)
+    search.remove_records('trace', [trace_id])
     return True
 
 
+def archive_traces(trace_ids):
+    """Move traces to the compressed archive; get_trace still finds them. Returns how many moved."""
+    records = [r for r in map(_store.get, dict.fromkeys(trace_ids)) if r is not None]
+    # Archive before deleting, so a crash in between leaves a duplicate rather than a loss
+    _archive.add(records)
+    _store.delete_many([r['id'] for r in records])
+    return len(records)
+
+
+def compact_traces():
+    """Rewrite live traces to drop superseded versions and deletions; returns bytes reclaimed."""
+    return _store.compact()
+
+
+def storage_stats():
+    return {'live': _store.stats(), 'archive': _archive.stats()}
+
+
 def annotate_trace(trace_id: str, verdict: str, notes: str = ""):
-    traces = _load_traces()
-    for t in traces:
-        if t['id'] == trace_id:
-            annotation = Annotation(verdict=verdict, notes=notes)
-            if 'annotations' not in t:
-                t['annotations'] = []
-            t['annotations'].append(annotation.to_dict())
-            _save_traces(traces)
-            return t
-    return None
+    annotation = Annotation(verdict=verdict, notes=notes)
+
+    def apply(t):
+        t.setdefault('annotations', []).append(annotation.to_dict())
+
+    # Read-modify-write under the store's write lock, so concurrent annotations are all kept
+    t = _store.update(trace_id, apply)
+    if t is None:
+        return None
+    t = _hydrate(t)
+    search.index_records('trace', [t])
+    return t
 
 
 def parse_workflow_from_response(response_data):
     """Extract and parse workflow JSON from the Groq API response."""
     try:
         content = response_data['choices'][0]['message']['content']
-        json_match = re.search(r'\{[\s\S]*\}', content)
-        if json_match:
-            workflow = json.loads(json_match.group(0))
-            return workflow, True
-        return None, False
-    except (KeyError, IndexError, json.JSONDecodeError):
+    except (KeyError, IndexError, TypeError):
         return None, False
+    workflow, _ = extract_workflow(content or '')
+    return workflow, workflow is not None
@@ -0,0 +1,212 @@
+"""Workflow extraction from raw model output.
+
+Candidates are decoded in place with JSONDecoder.raw_decode starting at
+each '{', so surrounding prose, code fences, stray braces and extra JSON
+objects don't break parsing, and text after the first workflow is never
+scanned. Output cut off mid-object (e.g. by max_tokens) is repaired by
+closing it, or by dropping its last incomplete member.
+
+PartialWorkflowParser does the same for a token stream, reporting the
+name, trigger and each top-level step as soon as its JSON is complete.
+
+`python -m eval.parser_bench` measures cost and success rate on a fuzz corpus.
+"""
+import json
+import re
+
+_decoder = json.JSONDecoder()
+
+# Repair attempts made with the last complete members of a truncated object
+MAX_REPAIR_ATTEMPTS = 4
+
+_CLOSERS = {'{': '}', '[': ']'}
+_STRUCTURAL = re.compile(r'[{}\[\]",]')
+_STRING_END = re.compile(r'["\\]')
+
+
+def looks_like_workflow(value):
+    """A JSON object with a trigger, or steps that don't belong to a single step."""
+    return isinstance(value, dict) and ('trigger' in value or ('steps' in value and 'type' not in value))
+
+
+def _truncated(error, content):
+    if error.msg.startswith('Unterminated string'):
+        return True
+    return error.pos >= len(content.rstrip())
+
+
+def _close(prefix, stack):
+    return prefix + ''.join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def repair(fragment):
+    """Parse a truncated JSON object, or return None.
+
+    First tries closing the open string and brackets as they are, then
+    cuts back to the last few points that end on a complete member.
+    """
+    stack = []
+    in_string = escaped = False
+    # (prefix length, open brackets) just before a ',' or just after an opener
+    checkpoints = []
+    for i, ch in enumerate(fragment):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append(ch)
+            checkpoints.append((i + 1, tuple(stack)))
+        elif ch in '}]':
+            if not stack or _CLOSERS[stack.pop()] != ch:
+                return None
+            if not stack:
+                return None  # the object is complete, so it failed for another reason
+        elif ch == ',':
+            checkpoints.append((i, tuple(stack)))
+
+    tail = fragment.rstrip()
+    if in_string:
+        tail = (tail[:-1] if escaped else tail) + '"'
+    attempts = [_close(tail.rstrip(',:'), stack)]
+    attempts += [_close(fragment[:end], opened) for end, opened in reversed(checkpoints[-MAX_REPAIR_ATTEMPTS:])]
+    for attempt in attempts:
+        try:
+            value = json.loads(attempt)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def extract_workflow(content):
+    """Return (workflow, repaired) for the JSON object in content, or (None, False).
+
+    Prefers the first object that looks like a workflow (repaired if it was
+    truncated), falling back to the first complete object.
+    """
+    fallback = None
+    pos = content.find('{')
+    while pos != -1:
+        try:
+            value, end = _decoder.raw_decode(content, pos)
+        except json.JSONDecodeError as e:
+            if _truncated(e, content):
+                # Every later '{' is inside this object: repair it rather than decode its members
+                repaired = repair(content[pos:])
+                if looks_like_workflow(repaired):
+                    return repaired, True
+                break
+            pos = content.find('{', pos + 1)
+            continue
+        if looks_like_workflow(value):
+            return value, False
+        if fallback is None and isinstance(value, dict):
+            fallback = value
+        pos = content.find('{', end)
+    return fallback, False
+
+
+class PartialWorkflowParser:
+    """Incremental scanner over a streamed workflow object.
+
+    feed() takes the next piece of model output and returns events for the
+    parts completed by it: {'event': 'name'}, {'event': 'trigger'} and
+    {'event': 'step', 'index': i} (top-level steps, sub_workflow children
+    included). Only new text is scanned, skipping string bodies and scalars.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.done = False
+        self._pos = 0
+        self._stack = []  # [opener, start, key, expecting_key, element index]
+        self._string_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text, stack = self.text, self._stack
+        pos = self._pos
+        while not self.done:
+            if self._string_start is not None:
+                match = _STRING_END.search(text, pos)
+                if match is None:
+                    pos = max(pos, len(text))
+                    break
+                if match.group() == '\\':
+                    pos = match.end() + 1  # skip the escaped character, even if it hasn't arrived yet
+                    continue
+                pos = match.end()
+                self._end_string(self._string_start, pos, events)
+                self._string_start = None
+                continue
+            if not stack:
+                start = text.find('{', pos)
+                if start == -1:
+                    pos = len(text)
+                    break
+                stack.append(['{', start, None, True, 0])
+                pos = start + 1
+                continue
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                pos = len(text)
+                break
+            ch, i = match.group(), match.start()
+            pos = i + 1
+            if ch == '"':
+                self._string_start = i
+            elif ch in '{[':
+                stack.append([ch, i, None, True, 0])
+            elif ch == ',':
+                frame = stack[-1]
+                if frame[0] == '{':
+                    frame[3] = True
+                else:
+                    frame[4] += 1
+            else:
+                self._end_container(stack.pop(), pos, events)
+        self._pos = pos
+        return events
+
+    def _end_string(self, start, end, events):
+        frame = self._stack[-1]
+        if frame[0] != '{':
+            return
+        if frame[3]:
+            frame[2] = _loads(self.text[start:end])
+            frame[3] = False
+        elif len(self._stack) == 1 and frame[2] == 'name':
+            name = _loads(self.text[start:end])
+            if name is not None:
+                events.append({'event': 'name', 'name': name})
+
+    def _end_container(self, frame, end, events):
+        stack = self._stack
+        if not stack:
+            self.done = True
+            return
+        if frame[0] != '{':
+            return
+        if len(stack) == 1 and stack[0][2] == 'trigger':
+            trigger = _loads(self.text[frame[1]:end])
+            if trigger is not None:
+                events.append({'event': 'trigger', 'trigger': trigger})
+        elif len(stack) == 2 and stack[0][2] == 'steps' and stack[1][0] == '[':
+            step = _loads(self.text[frame[1]:end])
+            if step is not None:
+                events.append({'event': 'step', 'index': stack[1][4], 'step': step})
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
@@ -1,17 +1,103 @@
-from flask import Blueprint, request, jsonify
-from eval import traces, golden_dataset, runner
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from eval import traces, golden_dataset, runner, results as eval_results
+from eval.trace_writer import get_writer
+from eval import judge_cache, jobs, analytics, retention, search, cascade
+from eval.dedupe import DuplicateGoldenError
 
 eval_bp = Blueprint('eval', __name__, url_prefix='/api/eval')
 
 
+def _stream_format(data):
+    """'ndjson' or 'sse' when the client asked for a streamed response, else None."""
+    fmt = request.args.get('stream') or data.get('stream')
+    if fmt in ('ndjson', 'sse'):
+        return fmt
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+
+def _stream(events, fmt):
+    """Stream runner events as NDJSON lines or server-sent events."""
+    def generate():
+        for event in events:
+            if fmt == 'sse':
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if fmt == 'sse' else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 # --- Traces ---
 
 @eval_bp.route('/traces', methods=['GET'])
 def list_traces():
     limit = request.args.get('limit', 50, type=int)
-    offset = request.args.get('offset', 0, type=int)
-    trace_list, total = traces.get_traces(limit=limit, offset=offset)
-    return jsonify({'traces': trace_list, 'total': total})
+    if 'offset' in request.args:
+        offset = request.args.get('offset', 0, type=int)
+        trace_list, total = traces.get_traces(limit=limit, offset=offset)
+        return jsonify({'traces': trace_list, 'total': total})
+    try:
+        trace_list, next_cursor, total = traces.query_traces(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            **{name: request.args.get(name) for name in (
+                'model', 'parse_success', 'has_error', 'verdict',
+                'min_latency_ms', 'max_latency_ms', 'since', 'until'
+            )}
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'traces': trace_list, 'total': total, 'next_cursor': next_cursor})
+
+
+@eval_bp.route('/search', methods=['GET'])
+def search_records():
+    try:
+        result = search.search(
+            request.args.get('q', ''),
+            kind=request.args.get('kind') or None,
+            limit=request.args.get('limit', 20, type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
+@eval_bp.route('/trace-writer', methods=['GET'])
+def trace_writer_metrics():
+    return jsonify(get_writer().metrics())
+
+
+@eval_bp.route('/traces/storage', methods=['GET'])
+def trace_storage():
+    return jsonify(traces.storage_stats())
+
+
+@eval_bp.route('/traces/retention', methods=['POST'])
+def apply_retention():
+    data = request.json or {}
+    budgets = {}
+    for key, cast in (('max_age_days', float), ('max_count', int), ('max_bytes', int)):
+        if data.get(key) is not None:
+            try:
+                budgets[key] = cast(data[key])
+            except (TypeError, ValueError):
+                return jsonify({'error': f'{key} must be a number'}), 400
+            if budgets[key] < 0:
+                return jsonify({'error': f'{key} must not be negative'}), 400
+    summary = retention.run(dry_run=bool(data.get('dry_run')), compact=data.get('compact'), **budgets)
+    return jsonify(summary)
 
 
 @eval_bp.route('/traces/<trace_id>', methods=['GET'])
@@ -58,16 +144,139 @@ def grade_trace(trace_id):
     return jsonify(result.to_dict())
 
 
+@eval_bp.route('/grade-schema', methods=['POST'])
+def grade_schema_bulk():
+    data = request.json or {}
+    trace_ids = data.get('trace_ids')
+    workers = data.get('workers')
+    if trace_ids is not None and not isinstance(trace_ids, list):
+        return jsonify({'error': 'trace_ids must be a list'}), 400
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        return jsonify({'error': 'workers must be a positive integer'}), 400
+    return jsonify(runner.run_schema_bulk(trace_ids=trace_ids, workers=workers,
+                                          persist=data.get('persist', True)))
+
+
+@eval_bp.route('/judge-cache', methods=['GET'])
+def judge_cache_stats():
+    return jsonify(judge_cache.stats())
+
+
 @eval_bp.route('/run', methods=['POST'])
 def run_eval():
     data = request.json or {}
     graders = data.get('graders', ['schema'])
     limit = data.get('limit', 50)
+    try:
+        cascade_rules = cascade.parse_rules(data.get('cascade'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    kwargs = {'limit': limit, 'concurrency': data.get('concurrency'),
+              'judge_batch_size': data.get('judge_batch_size'), 'incremental': bool(data.get('incremental')),
+              'cascade_rules': cascade_rules}
 
-    results = runner.run_eval(graders, limit=limit)
+    fmt = _stream_format(data)
+    if fmt:
+        return _stream(runner.iter_eval(graders, **kwargs), fmt)
+
+    results = runner.run_eval(graders, **kwargs)
     return jsonify(results)
 
 
+@eval_bp.route('/results', methods=['GET'])
+def list_results():
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    result_list, total = eval_results.get_results(
+        run_id=request.args.get('run_id'),
+        trace_id=request.args.get('trace_id'),
+        limit=limit,
+        offset=offset
+    )
+    return jsonify({'results': result_list, 'total': total})
+
+
+@eval_bp.route('/analytics', methods=['GET'])
+def get_analytics():
+    try:
+        result = analytics.get_analytics(
+            window=request.args.get('window', 'day'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            model=request.args.get('model'),
+            by_model=request.args.get('by_model', 'true').lower() != 'false'
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
+@eval_bp.route('/rollups', methods=['GET'])
+def get_rollups():
+    granularity = request.args.get('granularity', 'hour')
+    try:
+        buckets = traces.get_rollups(
+            granularity,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            model=request.args.get('model'),
+            by_model=request.args.get('by_model', 'true').lower() != 'false'
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'granularity': granularity, 'buckets': buckets})
+
+
+# --- Background runs ---
+
+@eval_bp.route('/runs', methods=['POST'])
+def submit_run():
+    data = request.json or {}
+    kind = data.get('kind', 'golden')
+    if kind not in runner.RUN_KINDS:
+        return jsonify({'error': f"kind must be one of {', '.join(runner.RUN_KINDS)}"}), 400
+    try:
+        run = jobs.submit(kind, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(run), 202
+
+
+@eval_bp.route('/runs', methods=['GET'])
+def list_runs():
+    limit = request.args.get('limit', 50, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    run_list, total = jobs.list_runs(status=request.args.get('status'), limit=limit, offset=offset)
+    return jsonify({'runs': run_list, 'total': total})
+
+
+@eval_bp.route('/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    run = jobs.get_run(run_id)
+    if not run:
+        return jsonify({'error': 'Run not found'}), 404
+    return jsonify(run)
+
+
+@eval_bp.route('/runs/<run_id>/results', methods=['GET'])
+def get_run_results(run_id):
+    if not jobs.get_run(run_id):
+        return jsonify({'error': 'Run not found'}), 404
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    result_list, total = eval_results.get_results(run_id=run_id, limit=limit, offset=offset)
+    return jsonify({'results': result_list, 'total': total})
+
+
+@eval_bp.route('/runs/<run_id>/resume', methods=['POST'])
+def resume_run(run_id):
+    run = jobs.resume(run_id)
+    if not run:
+        return jsonify({'error': 'Run not found'}), 404
+    return jsonify(jobs.get_run(run_id)), 202
+
+
 # --- Goldens ---
 
 @eval_bp.route('/goldens', methods=['GET'])
@@ -86,15 +295,24 @@ def create_golden():
     if not user_message or not expected_workflow:
         return jsonify({'error': 'user_message and expected_workflow are required'}), 400
 
-    golden = golden_dataset.add_golden(
-        user_message=user_message,
-        expected_workflow=expected_workflow,
-        tags=data.get('tags', []),
-        notes=data.get('notes', '')
-    )
+    try:
+        golden = golden_dataset.add_golden(
+            user_message=user_message,
+            expected_workflow=expected_workflow,
+            tags=data.get('tags', []),
+            notes=data.get('notes', ''),
+            allow_duplicate=bool(data.get('allow_duplicate'))
+        )
+    except DuplicateGoldenError as e:
+        return jsonify({'error': str(e), 'near_duplicates': e.duplicates}), 409
     return jsonify(golden), 201
 
 
+@eval_bp.route('/goldens/duplicates', methods=['GET'])
+def golden_duplicates():
+    return jsonify(golden_dataset.duplicate_report())
+
+
 @eval_bp.route('/goldens/<golden_id>', methods=['PUT'])
 def update_golden(golden_id):
     data = request.json
@@ -117,11 +335,15 @@ def promote_trace():
     if not trace_id:
         return jsonify({'error': 'trace_id is required'}), 400
 
-    result = golden_dataset.promote_trace_to_golden(
-        trace_id,
-        tags=data.get('tags', []),
-        notes=data.get('notes', '')
-    )
+    try:
+        result = golden_dataset.promote_trace_to_golden(
+            trace_id,
+            tags=data.get('tags', []),
+            notes=data.get('notes', ''),
+            allow_duplicate=bool(data.get('allow_duplicate'))
+        )
+    except DuplicateGoldenError as e:
+        return jsonify({'error': str(e), 'near_duplicates': e.duplicates}), 409
     if not result:
         return jsonify({'error': 'Trace not found or has no parsed workflow'}), 404
     return jsonify(result), 201
@@ -151,8 +373,20 @@ def run_golden_eval():
     data = request.json or {}
     graders = data.get('graders', ['schema', 'intent'])
     golden_ids = data.get('golden_ids')
+    try:
+        cascade_rules = cascade.parse_rules(data.get('cascade'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    kwargs = {'golden_ids': golden_ids, 'concurrency': data.get('concurrency'),
+              'judge_batch_size': data.get('judge_batch_size'), 'incremental': bool(data.get('incremental')),
+              'cascade_rules': cascade_rules}
+
+    fmt = _stream_format(data)
+    if fmt:
+        return _stream(runner.iter_golden_eval(graders, **kwargs), fmt)
 
-    results = runner.run_golden_eval(graders, golden_ids=golden_ids)
+    results = runner.run_golden_eval(graders, **kwargs)
     if isinstance(results, dict) and 'error' in results:
         return jsonify(results), 500
     return jsonify(results)
@@ -167,7 +401,11 @@ def pass_at_k():
     if not golden_id:
         return jsonify({'error': 'golden_id is required'}), 400
 
-    results = runner.run_pass_at_k(golden_id, k=k)
+    fmt = _stream_format(data)
+    if fmt:
+        return _stream(runner.iter_pass_at_k(golden_id, k=k, concurrency=data.get('concurrency')), fmt)
+
+    results = runner.run_pass_at_k(golden_id, k=k, concurrency=data.get('concurrency'))
     if isinstance(results, dict) and 'error' in results:
         return jsonify(results), 500
     return jsonify(results)
@@ -181,7 +419,13 @@ def compare():
     golden_ids = data.get('golden_ids')
     graders = data.get('graders')
 
-    results = runner.run_comparison(config_a, config_b, golden_ids, graders)
+    fmt = _stream_format(data)
+    if fmt:
+        return _stream(runner.iter_comparison(config_a, config_b, golden_ids, graders,
+                                              concurrency=data.get('concurrency')), fmt)
+
+    results = runner.run_comparison(config_a, config_b, golden_ids, graders,
+                                    concurrency=data.get('concurrency'))
     if isinstance(results, dict) and 'error' in results:
         return jsonify(results), 500
     return jsonify(results)
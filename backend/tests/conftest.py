@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Keep the module-level stores away from backend/data; must happen before any eval import
+os.environ.setdefault('EVAL_DATA_DIR', tempfile.mkdtemp(prefix='eval-tests-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+import random
+from functools import lru_cache
+
+from eval.graders import structure_grader
+from eval.graders.structure_grader import _Distance, _Tree, _TopDown, _rename_costs
+
+TYPES = ['filter', 'slack_message', 'email', 'http_request', 'delay']
+KEYS = ['url', 'channel', 'to', 'subject']
+
+
+def _steps(rng, depth, count):
+    steps = []
+    for _ in range(count):
+        if depth < 2 and rng.random() < 0.3:
+            steps.append({'type': 'sub_workflow', 'config': {}, 'steps': _steps(rng, depth + 1, rng.randint(0, 3))})
+        else:
+            steps.append({'type': rng.choice(TYPES), 'config': {k: 1 for k in rng.sample(KEYS, rng.randint(0, 2))}})
+    return steps
+
+
+def _workflow(rng, count):
+    return {'trigger': {'type': rng.choice(['manual', 'webhook']), 'config': {}}, 'steps': _steps(rng, 0, count)}
+
+
+def _brute_force(a, b):
+    """Tree edit distance straight from the forest recursion, memoized on the forests themselves."""
+    rename = _rename_costs(a, b)
+
+    def subtree_cost(tree, forest):
+        return sum(tree.subtree_weights[node] for node in forest)
+
+    @lru_cache(maxsize=None)
+    def forest(f, g):
+        if not f or not g:
+            return subtree_cost(a, f) + subtree_cost(b, g)
+        v, w = f[-1], g[-1]
+        return min(
+            forest(f[:-1] + tuple(a.children[v]), g) + a.weights[v],
+            forest(f, g[:-1] + tuple(b.children[w])) + b.weights[w],
+            forest(f[:-1], g[:-1]) + forest(tuple(a.children[v]), tuple(b.children[w])) + rename[v, w],
+        )
+
+    return forest((len(a) - 1,), (len(b) - 1,))
+
+
+def _script_cost(result, a, b):
+    operations = result.script()
+    assert sorted(x for _, x, _ in operations if x is not None) == list(range(len(a)))
+    assert sorted(y for _, _, y in operations if y is not None) == list(range(len(b)))
+    return sum(a.weights[x] if op == 'delete' else b.weights[y] if op == 'insert' else result.relabel_cost(x, y)
+               for op, x, y in operations)
+
+
+def test_exact_distance_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(150):
+        a, b = _Tree(_workflow(rng, rng.randint(0, 5))), _Tree(_workflow(rng, rng.randint(0, 5)))
+        exact = _Distance(a, b)
+        expected = _brute_force(a, b)
+        assert abs(exact.distance - expected) < 1e-9
+        assert abs(_script_cost(exact, a, b) - expected) < 1e-9
+
+
+def test_top_down_is_a_valid_upper_bound():
+    rng = random.Random(11)
+    for _ in range(150):
+        a, b = _Tree(_workflow(rng, rng.randint(0, 8))), _Tree(_workflow(rng, rng.randint(0, 8)))
+        top_down = _TopDown(a, b)
+        assert abs(_script_cost(top_down, a, b) - top_down.distance) < 1e-9
+        assert top_down.distance >= _Distance(a, b).distance - 1e-9
+
+
+def test_small_workflows_are_exact():
+    rng = random.Random(3)
+    workflow, golden = _workflow(rng, 6), _workflow(rng, 6)
+    details = structure_grader.grade('t', workflow, golden).details
+    assert 'approximate' not in details and 'truncated' not in details
+    assert structure_grader.grade('t', golden, golden).score == 1.0
+
+
+def _nested(levels):
+    steps = []
+    for level in range(levels):
+        steps = [{'type': 'email', 'config': {'to': level}}, {'type': 'delay', 'config': {}},
+                 {'type': 'sub_workflow', 'config': {}, 'steps': steps}]
+    return {'trigger': {'type': 'manual', 'config': {}}, 'steps': steps}
+
+
+def test_deep_nesting_falls_back_to_approximate():
+    workflow, golden = _nested(100), _nested(95)
+    assert structure_grader._exact_work(_Tree(workflow), _Tree(golden)) > structure_grader.EXACT_MAX_WORK
+    result = structure_grader.grade('t', workflow, golden)
+    assert result.details['approximate'] is True
+    assert result.details['method'] == 'top_down'
+    assert 0.0 < result.score < 1.0
+
+
+def test_oversized_workflows_are_truncated():
+    steps = [{'type': 'email', 'config': {}} for _ in range(structure_grader.MAX_NODES + 50)]
+    result = structure_grader.grade('t', {'trigger': {'type': 'manual'}, 'steps': steps},
+                                    {'trigger': {'type': 'manual'}, 'steps': steps[:10]})
+    assert result.details['truncated'] is True
@@ -0,0 +1,103 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from eval import traces
+from eval.models import Trace
+from eval.sqlite_store import Database, SQLiteTraceStore
+from eval.trace_index import index_fields
+from eval.trace_log import TraceLog
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def store(request, tmp_path, monkeypatch):
+    if request.param == 'sqlite':
+        store = SQLiteTraceStore(Database(str(tmp_path / 'eval.db')))
+    else:
+        store = TraceLog(str(tmp_path / 'traces'), fields=index_fields)
+    monkeypatch.setattr(traces, '_store', store)
+    return store
+
+
+def _record(rng, minute):
+    trace = Trace(
+        user_message='m', system_prompt='s', model=rng.choice(['a', 'b']), temperature=0.5,
+        raw_response={}, parsed_workflow=None, parse_success=rng.random() < 0.5,
+        latency_ms=rng.randint(1, 500), error='boom' if rng.random() < 0.2 else None,
+        timestamp=(START + timedelta(minutes=minute)).isoformat()
+    )
+    return trace.to_dict()
+
+
+def _fill(store, count, seed=0, first_minute=0):
+    rng = random.Random(seed)
+    # Several traces share each timestamp, so ordering falls back to the id
+    records = [_record(rng, first_minute + i // 3) for i in range(count)]
+    store.put_many(records)
+    return records
+
+
+def _newest_first(records):
+    return [r['id'] for r in sorted(records, key=lambda r: (r['timestamp'], r['id']), reverse=True)]
+
+
+def _pages(limit, **filters):
+    """(ids in page order, totals reported on each page)."""
+    ids, totals, cursor = [], [], None
+    while True:
+        page, cursor, total = traces.query_traces(limit=limit, cursor=cursor, **filters)
+        ids += [t['id'] for t in page]
+        totals.append(total)
+        if cursor is None:
+            return ids, totals
+
+
+FILTERS = [
+    ({}, lambda r: True),
+    ({'model': 'a'}, lambda r: r['model'] == 'a'),
+    ({'model': 'b', 'has_error': 'true'}, lambda r: r['model'] == 'b' and r['error']),
+    ({'parse_success': 'false', 'min_latency_ms': '100', 'max_latency_ms': '300'},
+     lambda r: not r['parse_success'] and 100 <= r['latency_ms'] <= 300),
+    ({'since': (START + timedelta(minutes=10)).isoformat(), 'until': (START + timedelta(minutes=30)).isoformat()},
+     lambda r: START + timedelta(minutes=10) <= datetime.fromisoformat(r['timestamp']) < START + timedelta(minutes=30)),
+    ({'verdict': 'none', 'since': '2026-01-01T00:20:00'},
+     lambda r: datetime.fromisoformat(r['timestamp']) >= START + timedelta(minutes=20)),
+]
+
+
+@pytest.mark.parametrize('filters, keep', FILTERS)
+def test_filtered_pages_cover_every_match_once_newest_first(store, filters, keep):
+    records = _fill(store, 150)
+    expected = _newest_first([r for r in records if keep(r)])
+    ids, totals = _pages(7, **filters)
+    assert ids == expected
+    assert set(totals) == {len(expected)}
+
+
+def test_cursor_is_stable_while_traces_arrive(store):
+    records = _fill(store, 60)
+    expected = _newest_first([r for r in records if r['model'] == 'a'])
+    page, cursor, _ = traces.query_traces(limit=5, model='a')
+    ids = [t['id'] for t in page]
+    # Newer traces, some of them matching, land between page requests
+    arrived = _fill(store, 30, seed=1, first_minute=1000)
+    while cursor:
+        page, cursor, total = traces.query_traces(limit=5, cursor=cursor, model='a')
+        ids += [t['id'] for t in page]
+    assert ids == expected
+    assert total == len(expected) + sum(1 for r in arrived if r['model'] == 'a')
+
+
+def test_total_without_filters_is_the_store_size(store):
+    _fill(store, 40)
+    page, cursor, total = traces.query_traces(limit=10)
+    assert len(page) == 10 and cursor is not None and total == 40
+
+
+def test_invalid_query_raises_value_error(store):
+    for kwargs in ({'limit': 0}, {'cursor': 'not-a-cursor'}, {'since': 'yesterday'}, {'has_error': 'maybe'}):
+        with pytest.raises(ValueError):
+            traces.query_traces(**kwargs)
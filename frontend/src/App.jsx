@@ -3,6 +3,24 @@ import { Send, Play, Save, Loader, Zap, Clock, MessageSquare, Mail, Webhook, Set
 import { transformToN8n } from './utils/n8nTransformer';
 import EvalDashboard from './components/EvalDashboard';
 
+// Calls onEvent with each server-sent event of a streamed /api/generate-workflow response
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      const data = message.split('\n').find(line => line.startsWith('data: '));
+      if (data) onEvent(JSON.parse(data.slice(6)));
+    }
+  }
+};
+
 const WorkflowBuilder = () => {
   const [activeTab, setActiveTab] = useState('builder');
   const [chatMessages, setChatMessages] = useState([
@@ -41,8 +59,9 @@ const WorkflowBuilder = () => {
     setChatMessages(prev => [...prev, { role: 'user', content: userMessage }]);
 
     try {
+      // Streamed so the name, trigger and steps show up while the model is still generating
+      const requestBody = { message: userMessage, stream: true };
       // Only include apiKey if user has set one
-      const requestBody = { message: userMessage };
       if (groqApiKey) {
         requestBody.apiKey = groqApiKey;
       }
@@ -64,28 +83,53 @@ const WorkflowBuilder = () => {
         throw new Error(`Backend error (${response.status}): ${errorData.error || 'Unknown error'}`);
       }
 
-      const data = await response.json();
-      const aiResponse = data.choices[0].message.content;
-      
-      // Try to extract JSON from the response
-      let workflowData;
-      try {
-        // Remove markdown code blocks if present
-        const jsonMatch = aiResponse.match(/\{[\s\S]*\}/);
-        if (jsonMatch) {
-          workflowData = JSON.parse(jsonMatch[0]);
-        } else {
-          throw new Error('No JSON found');
+      let aiResponse = '';
+      let workflowData = null;
+      if ((response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+        const partial = { name: '', trigger: null, steps: [] };
+        await readEventStream(response, (event) => {
+          if (event.event === 'name') {
+            partial.name = event.name;
+          } else if (event.event === 'trigger') {
+            partial.trigger = { ...event.trigger, config: event.trigger.config || {} };
+          } else if (event.event === 'step') {
+            partial.steps = [...partial.steps, event.step];
+          } else if (event.event === 'done') {
+            workflowData = event.workflow;
+            aiResponse = event.response.choices[0].message.content;
+            return;
+          } else if (event.event === 'error') {
+            throw new Error(`Stream interrupted: ${event.error}`);
+          }
+          if (partial.trigger) {
+            setWorkflow({ ...partial });
+          }
+        });
+      } else {
+        const data = await response.json();
+        aiResponse = data.choices[0].message.content;
+      }
+
+      // Streamed responses arrive with the workflow already extracted by the backend
+      if (!workflowData) {
+        try {
+          // Remove markdown code blocks if present
+          const jsonMatch = aiResponse.match(/\{[\s\S]*\}/);
+          if (jsonMatch) {
+            workflowData = JSON.parse(jsonMatch[0]);
+          } else {
+            throw new Error('No JSON found');
+          }
+        } catch (e) {
+          // If parsing fails, create a default workflow
+          workflowData = {
+            name: 'Custom Workflow',
+            trigger: { type: 'manual', config: {} },
+            steps: [
+              { id: '1', type: 'action', name: 'Execute Action', config: { action: userMessage } }
+            ]
+          };
         }
-      } catch (e) {
-        // If parsing fails, create a default workflow
-        workflowData = {
-          name: 'Custom Workflow',
-          trigger: { type: 'manual', config: {} },
-          steps: [
-            { id: '1', type: 'action', name: 'Execute Action', config: { action: userMessage } }
-          ]
-        };
       }
 
       setWorkflow(workflowData);
@@ -9,22 +9,43 @@ const EvalDashboard = () => {
   const [activeSection, setActiveSection] = useState('traces');
   const [traces, setTraces] = useState([]);
   const [tracesTotal, setTracesTotal] = useState(0);
+  const [traceFilters, setTraceFilters] = useState({});
+  const [tracesCursor, setTracesCursor] = useState(null);
   const [goldens, setGoldens] = useState([]);
   const [goldensTotal, setGoldensTotal] = useState(0);
   const [loading, setLoading] = useState(false);
 
-  const fetchTraces = async () => {
+  const fetchTraces = async (filters = traceFilters) => {
     setLoading(true);
     try {
-      const data = await getTraces(100);
+      const data = await getTraces(100, filters);
       setTraces(data.traces);
       setTracesTotal(data.total);
+      setTracesCursor(data.next_cursor);
     } catch (err) {
       console.error('Failed to fetch traces:', err);
     }
     setLoading(false);
   };
 
+  const loadMoreTraces = async () => {
+    setLoading(true);
+    try {
+      const data = await getTraces(100, { ...traceFilters, cursor: tracesCursor });
+      setTraces(prev => [...prev, ...data.traces]);
+      setTracesTotal(data.total);
+      setTracesCursor(data.next_cursor);
+    } catch (err) {
+      console.error('Failed to fetch traces:', err);
+    }
+    setLoading(false);
+  };
+
+  const handleTraceFiltersChange = (filters) => {
+    setTraceFilters(filters);
+    fetchTraces(filters);
+  };
+
   const fetchGoldens = async () => {
     try {
       const data = await getGoldens();
@@ -105,6 +126,11 @@ const EvalDashboard = () => {
         {activeSection === 'traces' && (
           <TraceViewer
             traces={traces}
+            filters={traceFilters}
+            onFiltersChange={handleTraceFiltersChange}
+            hasMore={Boolean(tracesCursor)}
+            onLoadMore={loadMoreTraces}
+            loadingMore={loading}
             onRefresh={refreshAll}
             onPromoteToGolden={handlePromoteToGolden}
           />
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { Play, Loader, ChevronDown, ChevronRight } from 'lucide-react';
-import { runEval, runGoldenEval, runPassAtK } from '../utils/evalApi';
+import { streamEval, streamGoldenEval, runPassAtK } from '../utils/evalApi';
 
 const EvalRunResults = ({ goldens }) => {
   const [results, setResults] = useState(null);
@@ -11,7 +11,7 @@ const EvalRunResults = ({ goldens }) => {
 
   // Config
   const [useGoldens, setUseGoldens] = useState(false);
-  const [graders, setGraders] = useState({ schema: true, intent: false });
+  const [graders, setGraders] = useState({ schema: true, structure: false, intent: false });
   const [passAtK, setPassAtK] = useState(3);
   const [selectedGoldenId, setSelectedGoldenId] = useState('');
 
@@ -21,12 +21,22 @@ const EvalRunResults = ({ goldens }) => {
     setIsRunning(true);
     setResults(null);
     setSummary(null);
+    // Results are streamed in as each one completes; the summary arrives last
+    const onEvent = (event) => {
+      if (event.event === 'result') {
+        setResults(prev => [...(prev || []), event.result]);
+      } else if (event.event === 'summary') {
+        setSummary(event.summary);
+      } else if (event.event === 'error') {
+        console.error('Eval error:', event.error);
+      }
+    };
     try {
-      const data = useGoldens
-        ? await runGoldenEval(selectedGraders)
-        : await runEval(selectedGraders);
-      setResults(data.results);
-      setSummary(data.summary);
+      if (useGoldens) {
+        await streamGoldenEval(selectedGraders, null, onEvent);
+      } else {
+        await streamEval(selectedGraders, 50, onEvent);
+      }
     } catch (err) {
       console.error('Eval error:', err);
     }
@@ -63,6 +73,14 @@ const EvalRunResults = ({ goldens }) => {
               />
               Schema
             </label>
+            <label className="flex items-center gap-1 text-xs">
+              <input
+                type="checkbox"
+                checked={graders.structure}
+                onChange={(e) => setGraders(prev => ({ ...prev, structure: e.target.checked }))}
+              />
+              Structure (vs golden)
+            </label>
             <label className="flex items-center gap-1 text-xs">
               <input
                 type="checkbox"
@@ -146,6 +164,12 @@ const EvalRunResults = ({ goldens }) => {
               <p className="text-2xl font-bold">{(summary.avg_score * 100).toFixed(0)}%</p>
               <p className="text-xs text-gray-500">Avg Score</p>
             </div>
+            {summary.cascade && (
+              <div className="text-center px-4">
+                <p className="text-2xl font-bold text-purple-600">{summary.cascade.judge_calls_saved}</p>
+                <p className="text-xs text-gray-500">Judge Calls Saved</p>
+              </div>
+            )}
           </div>
 
           {/* Per-grader breakdown */}
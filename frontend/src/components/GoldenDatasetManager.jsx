@@ -206,6 +206,12 @@ const GoldenDatasetManager = ({ goldens, onRefresh }) => {
                       <span key={tag} className="text-xs bg-purple-100 text-purple-700 px-1.5 py-0.5 rounded">{tag}</span>
                     ))}
                   </div>
+                  {example.near_duplicates?.length > 0 && (
+                    <p className="text-xs text-amber-700 mt-1">
+                      Near-duplicate of {example.near_duplicates.length} {example.near_duplicates.length === 1 ? 'example' : 'examples'}
+                      {' '}({Math.round(example.near_duplicates[0].text_similarity * 100)}% prompt overlap)
+                    </p>
+                  )}
                 </div>
                 <button
                   onClick={() => handleSaveSynthetic(example)}
@@ -1,17 +1,39 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { ChevronDown, ChevronRight, Trash2, Award, Search } from 'lucide-react';
-import { gradeTrace, deleteTrace } from '../utils/evalApi';
+import { gradeTrace, deleteTrace, searchEval } from '../utils/evalApi';
 import AnnotationPanel from './AnnotationPanel';
 
-const TraceViewer = ({ traces, onRefresh, onPromoteToGolden }) => {
+const FILTER_OPTIONS = [
+  { key: 'parse_success', label: 'Any parse', options: [['true', 'Parsed'], ['false', 'Parse failed']] },
+  { key: 'has_error', label: 'Any error', options: [['true', 'Errored'], ['false', 'No error']] },
+  { key: 'verdict', label: 'Any verdict', options: [['correct', 'Correct'], ['incorrect', 'Incorrect'], ['partial', 'Partial'], ['none', 'Unannotated']] },
+];
+
+const TraceViewer = ({ traces, filters = {}, onFiltersChange, hasMore, onLoadMore, loadingMore, onRefresh, onPromoteToGolden }) => {
   const [expandedId, setExpandedId] = useState(null);
   const [gradeResults, setGradeResults] = useState({});
   const [loading, setLoading] = useState({});
   const [filter, setFilter] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
 
-  const filteredTraces = traces.filter(t =>
-    !filter || t.user_message.toLowerCase().includes(filter.toLowerCase())
-  );
+  // Full-text search runs server-side once typing pauses
+  useEffect(() => {
+    if (!filter.trim()) {
+      setSearchResults(null);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const data = await searchEval(filter, { kind: 'trace', limit: 100 });
+        setSearchResults(data.hits.map(hit => hit.record));
+      } catch (err) {
+        console.error('Search error:', err);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [filter]);
+
+  const filteredTraces = searchResults || traces;
 
   const handleGrade = async (traceId, grader) => {
     setLoading(prev => ({ ...prev, [`${traceId}-${grader}`]: true }));
@@ -44,9 +66,22 @@ const TraceViewer = ({ traces, onRefresh, onPromoteToGolden }) => {
           type="text"
           value={filter}
           onChange={(e) => setFilter(e.target.value)}
-          placeholder="Filter traces..."
+          placeholder="Search prompts, workflow and step names, notes..."
           className="flex-1 px-3 py-2 border rounded text-sm"
         />
+        {onFiltersChange && FILTER_OPTIONS.map(({ key, label, options }) => (
+          <select
+            key={key}
+            value={filters[key] || ''}
+            onChange={(e) => onFiltersChange({ ...filters, [key]: e.target.value })}
+            className="px-2 py-2 border rounded text-sm bg-white"
+          >
+            <option value="">{label}</option>
+            {options.map(([value, text]) => (
+              <option key={value} value={value}>{text}</option>
+            ))}
+          </select>
+        ))}
       </div>
 
       {filteredTraces.length === 0 ? (
@@ -178,6 +213,15 @@ const TraceViewer = ({ traces, onRefresh, onPromoteToGolden }) => {
               )}
             </div>
           ))}
+          {hasMore && !searchResults && (
+            <button
+              onClick={onLoadMore}
+              disabled={loadingMore}
+              className="w-full py-2 text-xs font-medium text-gray-600 bg-gray-100 rounded hover:bg-gray-200 disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -12,9 +12,48 @@ async function request(path, options = {}) {
   return response.json();
 }
 
+// Streams newline-delimited JSON events from a long-running eval endpoint
+async function stream(path, body, onEvent) {
+  const response = await fetch(`${BASE_URL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({ error: 'Request failed' }));
+    throw new Error(error.error || `HTTP ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
 // Traces
-export const getTraces = (limit = 50, offset = 0) =>
-  request(`/traces?limit=${limit}&offset=${offset}`);
+// Newest first; pass next_cursor from a response back as cursor for the next page
+export const getTraces = (limit = 50, { cursor, ...filters } = {}) => {
+  const params = new URLSearchParams({ limit });
+  if (cursor) params.set('cursor', cursor);
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') params.set(key, value);
+  });
+  return request(`/traces?${params}`);
+};
+
+// BM25-ranked traces and goldens; kind is 'trace', 'golden' or omitted for both
+export const searchEval = (q, { kind, limit = 20, offset = 0 } = {}) => {
+  const params = new URLSearchParams({ q, limit, offset });
+  if (kind) params.set('kind', kind);
+  return request(`/search?${params}`);
+};
 
 export const getTrace = (id) =>
   request(`/traces/${id}`);
@@ -41,6 +80,9 @@ export const runEval = (graders = ['schema'], limit = 50) =>
     body: JSON.stringify({ graders, limit }),
   });
 
+export const streamEval = (graders = ['schema'], limit = 50, onEvent) =>
+  stream('/run', { graders, limit }, onEvent);
+
 // Goldens
 export const getGoldens = () =>
   request('/goldens');
@@ -79,6 +121,9 @@ export const runGoldenEval = (graders = ['schema', 'intent'], goldenIds = null)
     body: JSON.stringify({ graders, golden_ids: goldenIds }),
   });
 
+export const streamGoldenEval = (graders = ['schema', 'intent'], goldenIds = null, onEvent) =>
+  stream('/run-goldens', { graders, golden_ids: goldenIds }, onEvent);
+
 export const runPassAtK = (goldenId, k = 5) =>
   request('/pass-at-k', {
     method: 'POST',